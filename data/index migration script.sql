@@ -0,0 +1,173 @@
+-- toyprj4 인덱스 마이그레이션 스크립트
+-- 1) policies: policy_id 중복 제거 + 기본키 + 날짜 비교용 DATE 생성 컬럼 + 신청 가능 여부 판별용 커버링 인덱스
+-- 2) 매핑 테이블: 중복/NULL 행 제거 후 (policy_id, 코드) 기본키 + (코드, policy_id) 역방향 인덱스
+-- 3) region_codes: sido/sigungu 조회용 인덱스
+-- 4) policy_load_state: policy_loader.py 증분 적재용 내용 해시 테이블
+-- 모든 테이블을 새 구조의 *_new 테이블로 옮긴 뒤 교체하므로 다시 실행해도 같은 결과가 됩니다.
+-- (MySQL은 ADD KEY/ADD COLUMN에 IF NOT EXISTS가 없어, 인덱스 추가는 information_schema를 확인한 뒤 실행합니다.)
+
+USE `toyprj4`;
+
+-- ---------------------------------------------------------------
+-- 1. policies (중복 policy_id는 신청 마감일이 가장 늦은 행 하나만 남김)
+-- ---------------------------------------------------------------
+DROP TABLE IF EXISTS `policies_new`, `policies_old`;
+CREATE TABLE `policies_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `policy_name` text,
+  `policy_summary` text,
+  `source_url` text,
+  `min_age` int DEFAULT NULL,
+  `max_age` int DEFAULT NULL,
+  `income_min` int DEFAULT NULL,
+  `income_max` int DEFAULT NULL,
+  `biz_start_date` datetime DEFAULT NULL,
+  `biz_end_date` datetime DEFAULT NULL,
+  `aply_start_date` datetime DEFAULT NULL,
+  `aply_end_date` datetime DEFAULT NULL,
+  `marriage_status` varchar(10) DEFAULT NULL,
+  `application_status` varchar(10) DEFAULT NULL,
+  -- DATE(...)로 감싸지 않고 비교할 수 있도록 미리 계산된 날짜 컬럼
+  `aply_start_day` date GENERATED ALWAYS AS (CAST(`aply_start_date` AS DATE)) STORED,
+  `aply_end_day` date GENERATED ALWAYS AS (CAST(`aply_end_date` AS DATE)) STORED,
+  `biz_end_day` date GENERATED ALWAYS AS (CAST(`biz_end_date` AS DATE)) STORED,
+  PRIMARY KEY (`policy_id`),
+  -- 신청 상태/기간 조건만으로 후보를 고를 때 테이블 본문을 읽지 않도록 하는 커버링 인덱스
+  KEY `idx_policies_active` (`application_status`, `aply_end_day`, `aply_start_day`, `biz_end_day`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+-- INSERT IGNORE는 같은 policy_id 중 먼저 들어간 행만 남기므로, 남길 행(마감일이 가장 늦은 행)이 먼저 오도록 정렬
+INSERT IGNORE INTO `policies_new` (policy_id, policy_name, policy_summary, source_url, min_age, max_age,
+                                   income_min, income_max, biz_start_date, biz_end_date,
+                                   aply_start_date, aply_end_date, marriage_status, application_status)
+  SELECT policy_id, policy_name, policy_summary, source_url, min_age, max_age,
+         income_min, income_max, biz_start_date, biz_end_date,
+         aply_start_date, aply_end_date, marriage_status, application_status
+  FROM `policies`
+  WHERE policy_id IS NOT NULL
+  ORDER BY policy_id, aply_end_date IS NULL, aply_end_date DESC;
+RENAME TABLE `policies` TO `policies_old`, `policies_new` TO `policies`;
+DROP TABLE `policies_old`;
+
+
+-- ---------------------------------------------------------------
+-- 2. 매핑 테이블 (새 테이블에 중복 없이 옮긴 뒤 교체)
+-- ---------------------------------------------------------------
+DROP TABLE IF EXISTS `policy_regions_new`, `policy_regions_old`;
+CREATE TABLE `policy_regions_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `region_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `region_code`),
+  KEY `idx_region_policy` (`region_code`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_regions_new` (policy_id, region_code)
+  SELECT policy_id, region_code FROM `policy_regions` WHERE policy_id IS NOT NULL AND region_code IS NOT NULL;
+RENAME TABLE `policy_regions` TO `policy_regions_old`, `policy_regions_new` TO `policy_regions`;
+DROP TABLE `policy_regions_old`;
+
+DROP TABLE IF EXISTS `policy_job_status_new`, `policy_job_status_old`;
+CREATE TABLE `policy_job_status_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `job_status_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `job_status_code`),
+  KEY `idx_job_status_policy` (`job_status_code`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_job_status_new` (policy_id, job_status_code)
+  SELECT policy_id, job_status_code FROM `policy_job_status` WHERE policy_id IS NOT NULL AND job_status_code IS NOT NULL;
+RENAME TABLE `policy_job_status` TO `policy_job_status_old`, `policy_job_status_new` TO `policy_job_status`;
+DROP TABLE `policy_job_status_old`;
+
+DROP TABLE IF EXISTS `policy_education_levels_new`, `policy_education_levels_old`;
+CREATE TABLE `policy_education_levels_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `education_level_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `education_level_code`),
+  KEY `idx_education_level_policy` (`education_level_code`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_education_levels_new` (policy_id, education_level_code)
+  SELECT policy_id, education_level_code FROM `policy_education_levels` WHERE policy_id IS NOT NULL AND education_level_code IS NOT NULL;
+RENAME TABLE `policy_education_levels` TO `policy_education_levels_old`, `policy_education_levels_new` TO `policy_education_levels`;
+DROP TABLE `policy_education_levels_old`;
+
+DROP TABLE IF EXISTS `policy_majors_new`, `policy_majors_old`;
+CREATE TABLE `policy_majors_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `major_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `major_code`),
+  KEY `idx_major_policy` (`major_code`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_majors_new` (policy_id, major_code)
+  SELECT policy_id, major_code FROM `policy_majors` WHERE policy_id IS NOT NULL AND major_code IS NOT NULL;
+RENAME TABLE `policy_majors` TO `policy_majors_old`, `policy_majors_new` TO `policy_majors`;
+DROP TABLE `policy_majors_old`;
+
+DROP TABLE IF EXISTS `policy_specializations_new`, `policy_specializations_old`;
+CREATE TABLE `policy_specializations_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `specialization_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `specialization_code`),
+  KEY `idx_specialization_policy` (`specialization_code`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_specializations_new` (policy_id, specialization_code)
+  SELECT policy_id, specialization_code FROM `policy_specializations` WHERE policy_id IS NOT NULL AND specialization_code IS NOT NULL;
+RENAME TABLE `policy_specializations` TO `policy_specializations_old`, `policy_specializations_new` TO `policy_specializations`;
+DROP TABLE `policy_specializations_old`;
+
+DROP TABLE IF EXISTS `policy_categories_new`, `policy_categories_old`;
+CREATE TABLE `policy_categories_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `category_name` varchar(50) NOT NULL,
+  PRIMARY KEY (`policy_id`, `category_name`),
+  KEY `idx_category_policy` (`category_name`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_categories_new` (policy_id, category_name)
+  SELECT policy_id, category_name FROM `policy_categories` WHERE policy_id IS NOT NULL AND category_name IS NOT NULL;
+RENAME TABLE `policy_categories` TO `policy_categories_old`, `policy_categories_new` TO `policy_categories`;
+DROP TABLE `policy_categories_old`;
+
+DROP TABLE IF EXISTS `policy_subcategories_new`, `policy_subcategories_old`;
+CREATE TABLE `policy_subcategories_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `subcategory_name` varchar(100) NOT NULL,
+  PRIMARY KEY (`policy_id`, `subcategory_name`),
+  KEY `idx_subcategory_policy` (`subcategory_name`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_subcategories_new` (policy_id, subcategory_name)
+  SELECT policy_id, subcategory_name FROM `policy_subcategories` WHERE policy_id IS NOT NULL AND subcategory_name IS NOT NULL;
+RENAME TABLE `policy_subcategories` TO `policy_subcategories_old`, `policy_subcategories_new` TO `policy_subcategories`;
+DROP TABLE `policy_subcategories_old`;
+
+DROP TABLE IF EXISTS `policy_keywords_new`, `policy_keywords_old`;
+CREATE TABLE `policy_keywords_new` (
+  `policy_id` varchar(50) NOT NULL,
+  `keyword_name` varchar(50) NOT NULL,
+  PRIMARY KEY (`policy_id`, `keyword_name`),
+  KEY `idx_keyword_policy` (`keyword_name`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT IGNORE INTO `policy_keywords_new` (policy_id, keyword_name)
+  SELECT policy_id, keyword_name FROM `policy_keywords` WHERE policy_id IS NOT NULL AND keyword_name IS NOT NULL;
+RENAME TABLE `policy_keywords` TO `policy_keywords_old`, `policy_keywords_new` TO `policy_keywords`;
+DROP TABLE `policy_keywords_old`;
+
+
+-- ---------------------------------------------------------------
+-- 3. region_codes
+-- ---------------------------------------------------------------
+SET @ddl = IF(
+  (SELECT COUNT(*) FROM information_schema.statistics
+   WHERE table_schema = 'toyprj4' AND table_name = 'region_codes' AND index_name = 'idx_region_sido') = 0,
+  'ALTER TABLE `region_codes` ADD KEY `idx_region_sido` (`sido`, `sigungu`)',
+  'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+
+-- ---------------------------------------------------------------
+-- 4. policy_load_state
+-- ---------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS `policy_load_state` (
+  `policy_id` varchar(50) NOT NULL,
+  `content_hash` bigint unsigned NOT NULL,
+  `loaded_at` datetime NOT NULL,
+  PRIMARY KEY (`policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
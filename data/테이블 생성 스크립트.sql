@@ -22,7 +22,7 @@ CREATE TABLE `major_codes` (
 
 
 CREATE TABLE `policies` (
-  `policy_id` varchar(50) DEFAULT NULL,
+  `policy_id` varchar(50) NOT NULL,
   `policy_name` text,
   `policy_summary` text,
   `source_url` text,
@@ -35,52 +35,82 @@ CREATE TABLE `policies` (
   `aply_start_date` datetime DEFAULT NULL,
   `aply_end_date` datetime DEFAULT NULL,
   `marriage_status` varchar(10) DEFAULT NULL,
-  `application_status` varchar(10) DEFAULT NULL
+  `application_status` varchar(10) DEFAULT NULL,
+  `aply_start_day` date GENERATED ALWAYS AS (CAST(`aply_start_date` AS DATE)) STORED,
+  `aply_end_day` date GENERATED ALWAYS AS (CAST(`aply_end_date` AS DATE)) STORED,
+  `biz_end_day` date GENERATED ALWAYS AS (CAST(`biz_end_date` AS DATE)) STORED,
+  PRIMARY KEY (`policy_id`),
+  KEY `idx_policies_active` (`application_status`, `aply_end_day`, `aply_start_day`, `biz_end_day`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 
 CREATE TABLE `policy_categories` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `category_name` varchar(50) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `category_name` varchar(50) NOT NULL,
+  PRIMARY KEY (`policy_id`, `category_name`),
+  KEY `idx_category_policy` (`category_name`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 
 CREATE TABLE `policy_education_levels` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `education_level_code` varchar(10) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `education_level_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `education_level_code`),
+  KEY `idx_education_level_policy` (`education_level_code`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 
 CREATE TABLE `policy_job_status` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `job_status_code` varchar(10) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `job_status_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `job_status_code`),
+  KEY `idx_job_status_policy` (`job_status_code`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 
 CREATE TABLE `policy_keywords` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `keyword_name` varchar(50) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `keyword_name` varchar(50) NOT NULL,
+  PRIMARY KEY (`policy_id`, `keyword_name`),
+  KEY `idx_keyword_policy` (`keyword_name`, `policy_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+
+-- policy_loader.py 증분 적재용 정책별 원본 내용 해시
+CREATE TABLE `policy_load_state` (
+  `policy_id` varchar(50) NOT NULL,
+  `content_hash` bigint unsigned NOT NULL,
+  `loaded_at` datetime NOT NULL,
+  PRIMARY KEY (`policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 
 CREATE TABLE `policy_majors` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `major_code` varchar(10) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `major_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `major_code`),
+  KEY `idx_major_policy` (`major_code`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 CREATE TABLE `policy_regions` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `region_code` varchar(10) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `region_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `region_code`),
+  KEY `idx_region_policy` (`region_code`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 CREATE TABLE `policy_specializations` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `specialization_code` varchar(10) DEFAULT NULL
+  `policy_id` varchar(50) NOT NULL,
+  `specialization_code` varchar(10) NOT NULL,
+  PRIMARY KEY (`policy_id`, `specialization_code`),
+  KEY `idx_specialization_policy` (`specialization_code`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 CREATE TABLE `policy_subcategories` (
-  `policy_id` varchar(50) DEFAULT NULL,
-  `subcategory_name` text
+  `policy_id` varchar(50) NOT NULL,
+  `subcategory_name` varchar(100) NOT NULL,
+  PRIMARY KEY (`policy_id`, `subcategory_name`),
+  KEY `idx_subcategory_policy` (`subcategory_name`, `policy_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 
@@ -88,7 +118,8 @@ CREATE TABLE `region_codes` (
   `code` varchar(10) NOT NULL,
   `sido` varchar(100) NOT NULL,
   `sigungu` varchar(100) DEFAULT NULL,
-  PRIMARY KEY (`code`)
+  PRIMARY KEY (`code`),
+  KEY `idx_region_sido` (`sido`, `sigungu`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 CREATE TABLE `specialization_codes` (
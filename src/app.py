@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 from config import PAGE_TITLE, PAGE_ICON, CHAT_TITLE
 from utils import load_code_table
 from chains import create_final_chain
+from chat_events import stream_with_events
 
 
 # --- 1. 앱 구성 요소 초기화 (캐싱 사용) ---
@@ -32,6 +33,47 @@ final_chain_with_memory = initialize_components()
 
 # --- 3. Streamlit UI 및 상호작용 로직 ---
 
+def render_policy_cards(policies: list):
+    """검색된 정책을 카드로 표시합니다. (답변 생성 전에 먼저 보여줌)"""
+    if not policies:
+        return
+    columns = st.columns(min(len(policies), 3))
+    for i, policy in enumerate(policies):
+        with columns[i % len(columns)].container(border=True):
+            st.markdown(f"**{policy.get('plcyNm') or '정책명 없음'}**")
+            if policy.get("aplyUrlAddr"):
+                st.link_button("신청하기", policy["aplyUrlAddr"])
+
+
+def describe_filters(filters: dict) -> str:
+    """추출된 필터 중 값이 있는 항목만 한 줄로 요약합니다."""
+    values = [
+        ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+        for value in (filters or {}).values() if value not in (None, "", [], {})
+    ]
+    return " / ".join(values)
+
+
+def answer_tokens(events, status_area, cards_area, message: dict):
+    """
+    체인 이벤트를 받아 필터/후보 수는 상태 줄에, 정책 카드는 카드 영역에 바로 그리고,
+    답변 토큰만 st.write_stream으로 넘깁니다.
+    """
+    for event in events:
+        if event["type"] == "token":
+            yield event["data"]
+        elif event["type"] == "filters":
+            summary = describe_filters(event["data"])
+            status_area.caption(f"🔎 검색 조건: {summary}" if summary else "🔎 조건 없이 검색 중")
+        elif event["type"] == "candidates":
+            status_area.caption(f"📋 조건에 맞는 정책 {event['data']['count']}건 중에서 찾는 중")
+        elif event["type"] == "policies":
+            message["policies"] = event["data"]["policies"]
+            with cards_area:
+                render_policy_cards(message["policies"])
+        elif event["type"] == "error":
+            st.error(f"답변 생성 중 오류가 발생했습니다: {event['data']}")
+
 # 세션 상태 초기화
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
@@ -42,6 +84,7 @@ if "messages" not in st.session_state:
 # 이전 대화 기록 표시
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
+        render_policy_cards(message.get("policies"))
         st.markdown(message["content"])
 
 # 사용자 입력 처리
@@ -50,12 +93,18 @@ if prompt := st.chat_input("어떤 청년 정책이 궁금하신가요?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # AI 응답 생성 및 표시
+    # AI 응답 생성 및 표시 (필터/후보 수/정책 카드를 먼저 보여주고 그 아래에 답변을 스트리밍)
+    assistant_message = {"role": "assistant", "content": "", "policies": []}
     with st.chat_message("assistant"):
-        response_stream = final_chain_with_memory.stream(
+        status_area = st.empty()
+        cards_area = st.container()
+        events = stream_with_events(
+            final_chain_with_memory,
             {"question": prompt},
-            config={"configurable": {"session_id": st.session_state.session_id}}
+            {"configurable": {"session_id": st.session_state.session_id}}
         )
-        full_response = st.write_stream(response_stream)
+        full_response = st.write_stream(answer_tokens(events, status_area, cards_area, assistant_message))
+        status_area.empty()
 
-    st.session_state.messages.append({"role": "assistant", "content": full_response})
\ No newline at end of file
+    assistant_message["content"] = full_response
+    st.session_state.messages.append(assistant_message)
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+대량 사용자 프로필 일괄 추천 스크립트
+
+대화형 체인을 거치지 않고, create_filter_from_query와 같은 스키마의 프로필
+(age, income, regions, job_status, education_levels, majors, specializations, ...)을
+한 번에 여러 개 받아 정책을 추천합니다.
+
+처리 순서:
+1. RDB의 policies/매핑 테이블을 한 번만 읽어 정책 x 코드 불리언 행렬로 변환
+2. 프로필 묶음(chunk)을 코드 one-hot 행렬로 만들고, 행렬곱으로 자격 충족 여부를 한 번에 계산
+3. 프로필 질의문을 배치 임베딩한 뒤, 저장된 정책 임베딩과 한 번의 행렬곱으로 유사도 계산
+4. 자격 미충족 정책을 제외한 상위 k개를 JSONL로 한 줄씩 출력
+
+입력/출력 모두 JSONL이며, 한 번에 chunk_size개 프로필만 메모리에 올립니다.
+
+사용법:
+    python batch_recommend.py profiles.jsonl recommendations.jsonl --top-k 5 --chunk-size 1024
+    (입력 한 줄 예: {"profile_id": "u1", "age": 25, "regions": ["서울특별시"], "job_status": ["미취업자"]})
+"""
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+from langchain_chroma import Chroma
+
+from config import VDB_DIRECTORY
+from database import get_db_connection, ACTIVE_POLICY_CONDITIONS
+from utils import normalize_code
+from index_lifecycle import get_active_collection_name
+
+# 프로필 필드 -> (매핑 테이블, 코드 컬럼, 코드 테이블)
+CODE_DIMENSIONS = {
+    "job_status": ("policy_job_status", "job_status_code", "job_status_codes"),
+    "education_levels": ("policy_education_levels", "education_level_code", "education_level_codes"),
+    "majors": ("policy_majors", "major_code", "major_codes"),
+    "specializations": ("policy_specializations", "specialization_code", "specialization_codes"),
+}
+UNRESTRICTED_NAME = "제한없음"
+
+
+class PolicyEligibilityIndex:
+    """
+    신청 가능한 정책 전체를 numpy 배열로 들고 있는 인메모리 인덱스입니다.
+
+    - 코드 차원(job_status 등)마다 (정책 수 x 코드 수) 불리언 행렬
+    - 지역은 (정책 수 x 지역 코드 수) 불리언 행렬
+    - 나이/소득 구간은 float 배열 (제한 없음 = NaN)
+    """
+
+    def __init__(self, db_connection):
+        cursor = db_connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT p.policy_id, p.min_age, p.max_age, p.income_min, p.income_max FROM policies p"
+                " WHERE (" + ") AND (".join(ACTIVE_POLICY_CONDITIONS) + ")"
+            )
+            rows = cursor.fetchall()
+            self.policy_ids = np.array([str(r[0]) for r in rows])
+            self.row_of = {pid: i for i, pid in enumerate(self.policy_ids)}
+
+            def as_float(values):
+                # NULL 또는 0은 제한 없음(NaN)으로 취급합니다.
+                return np.array([v if v else np.nan for v in values], dtype=np.float32)
+
+            self.min_age = as_float([r[1] for r in rows])
+            self.max_age = as_float([r[2] for r in rows])
+            self.income_min = as_float([r[3] for r in rows])
+            self.income_max = as_float([r[4] for r in rows])
+
+            # 코드 차원별 불리언 행렬
+            self.dimensions = {}
+            for field, (mapping_table, code_col, code_table) in CODE_DIMENSIONS.items():
+                cursor.execute(f"SELECT code, name FROM {code_table}")
+                name_to_code = {name: normalize_code(code) for code, name in cursor.fetchall()}
+                cursor.execute(f"SELECT policy_id, {code_col} FROM {mapping_table}")
+                self.dimensions[field] = self._build_matrix(
+                    cursor.fetchall(), name_to_code, name_to_code.get(UNRESTRICTED_NAME)
+                )
+
+            # 지역 행렬 (지역명 -> 관련 코드 목록은 region_codes 전체를 한 번 읽어 계산)
+            cursor.execute("SELECT code, sido, sigungu FROM region_codes")
+            self.region_table = [(str(c), s or "", g or "") for c, s, g in cursor.fetchall()]
+            self._region_name_cache = {}
+            cursor.execute("SELECT policy_id, region_code FROM policy_regions")
+            region_rows = cursor.fetchall()
+            region_codes = sorted({str(code) for _, code in region_rows if code})
+            self.region_col = {code: j for j, code in enumerate(region_codes)}
+            self.region_matrix = np.zeros((len(self.policy_ids), len(region_codes)), dtype=np.float32)
+            for pid, code in region_rows:
+                i = self.row_of.get(str(pid))
+                if i is not None and code:
+                    self.region_matrix[i, self.region_col[str(code)]] = 1.0
+        finally:
+            cursor.close()
+
+        print(f"✅ 자격 인덱스 생성 완료: 정책 {len(self.policy_ids)}개, 지역 코드 {len(self.region_col)}개")
+
+    def _build_matrix(self, rows, name_to_code: dict, unrestricted_code) -> dict:
+        codes = sorted(set(name_to_code.values()))
+        col = {code: j for j, code in enumerate(codes)}
+        matrix = np.zeros((len(self.policy_ids), len(codes)), dtype=np.float32)
+        for pid, code in rows:
+            i = self.row_of.get(str(pid))
+            j = col.get(normalize_code(code)) if code else None
+            if i is not None and j is not None:
+                matrix[i, j] = 1.0
+        unrestricted = matrix.sum(axis=1) == 0
+        if unrestricted_code in col:
+            unrestricted |= matrix[:, col[unrestricted_code]] > 0
+        return {"name_to_code": name_to_code, "col": col, "matrix": matrix, "unrestricted": unrestricted}
+
+    def _region_codes_for(self, name: str) -> list:
+        """database._get_all_related_region_codes와 같은 규칙(시/도 또는 시/군/구 부분 일치)을 메모리에서 수행합니다."""
+        if name not in self._region_name_cache:
+            self._region_name_cache[name] = [
+                code for code, sido, sigungu in self.region_table if name in sido or name in sigungu
+            ]
+        return self._region_name_cache[name]
+
+    def eligibility_mask(self, profiles: list) -> np.ndarray:
+        """
+        프로필 묶음에 대해 (프로필 수 x 정책 수) 자격 충족 불리언 행렬을 반환합니다.
+        프로필에 값이 없는 조건은 통과로 처리합니다.
+        """
+        n_profiles, n_policies = len(profiles), len(self.policy_ids)
+        mask = np.ones((n_profiles, n_policies), dtype=bool)
+
+        # 1. 나이/소득 구간
+        for key, low, high in (("age", self.min_age, self.max_age),
+                               ("income", self.income_min, self.income_max)):
+            values = np.array([p.get(key) if p.get(key) is not None else np.nan for p in profiles],
+                              dtype=np.float32)[:, None]
+            has_value = ~np.isnan(values)
+            in_range = ((np.isnan(low) | (values >= low)) & (np.isnan(high) | (values <= high)))
+            mask &= ~has_value | in_range
+
+        # 2. 코드 차원: 프로필 one-hot 행렬 @ 정책 코드 행렬^T > 0 이면 교집합 존재
+        for field, dim in self.dimensions.items():
+            query = np.zeros((n_profiles, len(dim["col"])), dtype=np.float32)
+            for r, profile in enumerate(profiles):
+                for name in profile.get(field) or []:
+                    code = dim["name_to_code"].get(name)
+                    if name != UNRESTRICTED_NAME and code in dim["col"]:
+                        query[r, dim["col"][code]] = 1.0
+            has_value = query.any(axis=1)[:, None]
+            overlap = (query @ dim["matrix"].T) > 0
+            mask &= ~has_value | overlap | dim["unrestricted"][None, :]
+
+        # 3. 지역
+        # 지역 이름이 코드로 하나도 풀리지 않으면 get_rdb_candidate_ids와 같이 지역 조건을 적용하지 않음
+        # 지역 조건이 있으면 policy_regions 매핑이 없는 정책은 SQL의 EXISTS와 같이 제외
+        query = np.zeros((n_profiles, len(self.region_col)), dtype=np.float32)
+        has_value = np.zeros((n_profiles, 1), dtype=bool)
+        for r, profile in enumerate(profiles):
+            for name in profile.get("regions") or []:
+                for code in self._region_codes_for(name):
+                    has_value[r, 0] = True
+                    j = self.region_col.get(code)
+                    if j is not None:
+                        query[r, j] = 1.0
+        overlap = (query @ self.region_matrix.T) > 0
+        mask &= ~has_value | overlap
+
+        return mask
+
+
+def load_policy_embeddings(policy_ids: np.ndarray, since: str = None):
+    """
+    Chroma 컬렉션에 저장된 정책 임베딩을 policy_ids 순서로 정렬해 L2 정규화된 행렬로 반환합니다.
+    since('YYYY-MM-DD')가 주어지면 그 이후 최초 등록된 정책만 추천 대상으로 남깁니다.
+    """
+    vectorstore = Chroma(collection_name=get_active_collection_name(), persist_directory=VDB_DIRECTORY)
+    stored = vectorstore._collection.get(include=["embeddings", "metadatas"])
+
+    dim = len(stored["embeddings"][0])
+    matrix = np.zeros((len(policy_ids), dim), dtype=np.float32)
+    available = np.zeros(len(policy_ids), dtype=bool)
+    row_of = {pid: i for i, pid in enumerate(policy_ids)}
+    for embedding, metadata in zip(stored["embeddings"], stored["metadatas"]):
+        i = row_of.get(str(metadata.get("plcyNo")))
+        if i is None:
+            continue
+        if since and str(metadata.get("frstRegDt", ""))[:10] < since:
+            continue
+        matrix[i] = embedding
+        available[i] = True
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    print(f"✅ 정책 임베딩 로드 완료: {available.sum()}/{len(policy_ids)}개 ({dim}차원)")
+    return matrix, available
+
+
+def build_profile_query(profile: dict) -> str:
+    """프로필을 임베딩용 자연어 질의문으로 바꿉니다."""
+    parts = []
+    if profile.get("age"):
+        parts.append(f"만 {profile['age']}세")
+    for key in ("regions", "job_status", "education_levels", "majors", "specializations"):
+        parts.extend(v for v in (profile.get(key) or []) if v != UNRESTRICTED_NAME)
+    parts.append("청년이 지원할 수 있는")
+    for key in ("categories", "subcategories", "keywords"):
+        parts.extend(profile.get(key) or [])
+    parts.append("정책")
+    return " ".join(parts)
+
+
+def embed_queries(embedding_model, queries: list) -> np.ndarray:
+    """같은 질의문은 한 번만 임베딩하고, 결과를 L2 정규화합니다."""
+    unique = list(dict.fromkeys(queries))
+    vectors = np.asarray(embedding_model.embed_documents(unique), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    position = {q: i for i, q in enumerate(unique)}
+    return vectors[[position[q] for q in queries]]
+
+
+def recommend_batch(index: PolicyEligibilityIndex, policy_matrix: np.ndarray, available: np.ndarray,
+                    embedding_model, profiles: list, top_k: int = 5) -> list:
+    """프로필 묶음 하나에 대해 추천 결과 리스트를 반환합니다."""
+    mask = index.eligibility_mask(profiles) & available[None, :]
+    query_vectors = embed_queries(embedding_model, [build_profile_query(p) for p in profiles])
+
+    # (프로필 수 x 차원) @ (차원 x 정책 수): 한 번의 행렬곱으로 전체 유사도 계산
+    scores = query_vectors @ policy_matrix.T
+    scores[~mask] = -np.inf
+
+    k = min(top_k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    results = []
+    for r, profile in enumerate(profiles):
+        recommendations = [
+            {"plcyNo": str(index.policy_ids[j]), "score": round(float(s), 4)}
+            for j, s in zip(top[r], top_scores[r]) if np.isfinite(s)
+        ]
+        results.append({
+            "profile_id": profile.get("profile_id", profile.get("session_id")),
+            "eligible_count": int(mask[r].sum()),
+            "recommendations": recommendations,
+        })
+    return results
+
+
+def iter_profiles(path: str):
+    """입력 JSONL을 한 줄씩 읽습니다."""
+    with open(path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def run_batch(input_path: str, output_path: str, top_k: int = 5, chunk_size: int = 1024, since: str = None):
+    """입력 프로필을 chunk_size 단위로 처리하여 결과를 JSONL로 기록하고, 처리량을 출력합니다."""
+    load_dotenv()
+    index = PolicyEligibilityIndex(get_db_connection())
+    policy_matrix, available = load_policy_embeddings(index.policy_ids, since=since)
+    embedding_model = OpenAIEmbeddings(model="text-embedding-3-large")
+
+    processed = 0
+    started = time.perf_counter()
+    profiles = iter_profiles(input_path)
+    with open(output_path, mode='w', encoding='utf-8') as out:
+        while True:
+            chunk = list(itertools.islice(profiles, chunk_size))
+            if not chunk:
+                break
+            for result in recommend_batch(index, policy_matrix, available, embedding_model, chunk, top_k):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            processed += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"{processed}개 프로필 처리 완료 ({processed / elapsed:.1f} profiles/s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ 일괄 추천 완료: {processed}개 프로필, {elapsed:.2f}s, {processed / max(elapsed, 1e-9):.1f} profiles/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--since", default=None, help="YYYY-MM-DD 이후 등록된 정책만 추천")
+    args = parser.parse_args()
+
+    run_batch(args.input_path, args.output_path, args.top_k, args.chunk_size, args.since)
@@ -0,0 +1,87 @@
+"""
+호출 정책(call_policy.py) 확인 스크립트 - 지연을 주입한 가짜 upstream 사용 (API 호출 없음)
+
+가짜 upstream은 로그정규 분포 지연에 더해 일정 비율로 긴 지연(stall)과 오류를 섞어 응답합니다.
+같은 요청 흐름을 세 가지 정책으로 보내고 단계 지연시간 분위수와 결과별 횟수를 비교합니다.
+1. 제한 시간만 (헤지 없음)
+2. 제한 시간 + p95 헤지
+3. upstream 장애(모든 요청 오류) -> 서킷이 열려 곧바로 대체 동작으로 넘어가는지
+
+사용법:
+    python bench_call_policy.py --requests 300 --concurrency 8 --stall-rate 0.05
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from call_policy import CallPolicy, CircuitBreaker, StageLatencyStats
+
+
+class FakeUpstream:
+    """median_ms 중심의 로그정규 지연 + stall_rate 비율의 stall_ms 지연 + error_rate 비율의 오류"""
+
+    def __init__(self, median_ms: float, stall_ms: float, stall_rate: float, error_rate: float = 0.0, seed: int = 0):
+        self.median_ms = median_ms
+        self.stall_ms = stall_ms
+        self.stall_rate = stall_rate
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            latency = self.median_ms * self._random.lognormvariate(0, 0.35)
+            stalled = self._random.random() < self.stall_rate
+            failed = self._random.random() < self.error_rate
+        time.sleep((self.stall_ms if stalled else latency) / 1000)
+        if failed:
+            raise ConnectionError("injected upstream error")
+        return {"filters": {}}
+
+
+def run_scenario(name: str, policy: CallPolicy, upstream: FakeUpstream, requests: int, concurrency: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: policy.call(upstream, fallback=dict, degraded="필터 없이 검색"), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    summary = policy.stats.summary()
+    print(f"\n--- {name} ---")
+    print(f"요청 {requests}건, upstream 호출 {upstream.calls}건, 소요 {elapsed:.2f}s, 서킷 {policy.breaker.state} "
+          f"(열린 횟수 {policy.breaker.opened_count})")
+    print(f"결과: {summary['outcomes']}, 헤지 {summary['hedged']}건(헤지 응답 채택 {summary['hedge_wins']}건), "
+          f"대체 동작 {summary['degraded']}건")
+    if summary.get("samples"):
+        print(f"성공 지연시간 p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms, p99 {summary['p99_ms']}ms, "
+              f"max {summary['max_ms']}ms")
+
+
+def _policy(deadline: float, hedge: bool, hedge_after: float = None, failure_threshold: int = 5,
+            reset_seconds: float = 30) -> CallPolicy:
+    return CallPolicy("bench", deadline, hedge=hedge, hedge_after=hedge_after,
+                      breaker=CircuitBreaker(failure_threshold, reset_seconds), stats=StageLatencyStats(),
+                      hedge_min_samples=20)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--median-ms", type=float, default=40)
+    parser.add_argument("--stall-ms", type=float, default=1500)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--deadline", type=float, default=0.5, help="단계 제한 시간(초)")
+    args = parser.parse_args()
+
+    def upstream(error_rate: float = 0.0):
+        return FakeUpstream(args.median_ms, args.stall_ms, args.stall_rate, error_rate)
+
+    run_scenario("제한 시간만", _policy(args.deadline, hedge=False), upstream(), args.requests, args.concurrency)
+    run_scenario("제한 시간 + p95 헤지", _policy(args.deadline, hedge=True, hedge_after=args.deadline / 4),
+                 upstream(), args.requests, args.concurrency)
+    run_scenario("upstream 장애", _policy(args.deadline, hedge=True, hedge_after=args.deadline / 4),
+                 upstream(error_rate=1.0), args.requests, args.concurrency)
@@ -0,0 +1,172 @@
+"""
+후보 조회 쿼리 EXPLAIN / 지연시간 비교 스크립트
+
+별도의 벤치마크 DB(기본 toyprj4_bench)에 합성 정책 데이터를 규모별로 채운 뒤,
+1. 기존 스키마(키/인덱스 없음) + 기존 쿼리(JOIN + DISTINCT + DATE(...))
+2. 마이그레이션 스키마(기본키/커버링 인덱스/날짜 컬럼) + EXISTS 세미 조인 prepared 쿼리
+의 EXPLAIN 결과와 평균 실행 시간을 출력합니다.
+
+사용법:
+    python bench_candidate_query.py --sizes 4000 40000 200000 --repeat 20
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+from config import DB_CONNECTION_INFO
+from database import ACTIVE_POLICY_CONDITIONS, pad_in_list
+
+LEGACY_DDL = [
+    """CREATE TABLE legacy_policies (
+        policy_id varchar(50) DEFAULT NULL, biz_end_date datetime DEFAULT NULL,
+        aply_start_date datetime DEFAULT NULL, aply_end_date datetime DEFAULT NULL,
+        application_status varchar(10) DEFAULT NULL)""",
+    """CREATE TABLE legacy_policy_regions (
+        policy_id varchar(50) DEFAULT NULL, region_code varchar(10) DEFAULT NULL)""",
+]
+INDEXED_DDL = [
+    """CREATE TABLE policies (
+        policy_id varchar(50) NOT NULL, biz_end_date datetime DEFAULT NULL,
+        aply_start_date datetime DEFAULT NULL, aply_end_date datetime DEFAULT NULL,
+        application_status varchar(10) DEFAULT NULL,
+        aply_start_day date GENERATED ALWAYS AS (CAST(aply_start_date AS DATE)) STORED,
+        aply_end_day date GENERATED ALWAYS AS (CAST(aply_end_date AS DATE)) STORED,
+        biz_end_day date GENERATED ALWAYS AS (CAST(biz_end_date AS DATE)) STORED,
+        PRIMARY KEY (policy_id),
+        KEY idx_policies_active (application_status, aply_end_day, aply_start_day, biz_end_day))""",
+    """CREATE TABLE policy_regions (
+        policy_id varchar(50) NOT NULL, region_code varchar(10) NOT NULL,
+        PRIMARY KEY (policy_id, region_code), KEY idx_region_policy (region_code, policy_id))""",
+]
+
+SIDO_PREFIXES = ["11", "26", "27", "28", "29", "30", "31", "36", "41", "43", "44", "46", "47", "48", "50", "51", "52"]
+REGION_CODES = [f"{prefix}{i:03d}" for prefix in SIDO_PREFIXES for i in range(110, 260, 10)]
+
+
+def _legacy_query(codes: list) -> str:
+    placeholders = ', '.join(['%s'] * len(codes))
+    return (
+        "SELECT DISTINCT p.policy_id FROM legacy_policies p "
+        "JOIN legacy_policy_regions pr ON p.policy_id = pr.policy_id "
+        "WHERE (p.application_status = '상시' OR (p.application_status = '특정 기간' "
+        "AND CURDATE() BETWEEN DATE(p.aply_start_date) AND DATE(p.aply_end_date))) "
+        "AND (p.biz_end_date IS NULL OR CURDATE() <= DATE(p.biz_end_date)) "
+        f"AND pr.region_code IN ({placeholders})"
+    )
+
+
+def _indexed_query(codes: list) -> str:
+    placeholders = ', '.join(['%s'] * len(codes))
+    return (
+        "SELECT p.policy_id FROM policies p WHERE (" + ") AND (".join(ACTIVE_POLICY_CONDITIONS) + ") "
+        "AND EXISTS (SELECT 1 FROM policy_regions pr "
+        f"WHERE pr.policy_id = p.policy_id AND pr.region_code IN ({placeholders}))"
+    )
+
+
+def _generate_rows(size: int, seed: int = 42):
+    """상시/특정 기간 정책과 단일 지역/전국(다지역) 정책을 섞어 합성 데이터를 만듭니다."""
+    rng = random.Random(seed)
+    today = date.today()
+    policies, regions = [], []
+    for i in range(size):
+        policy_id = f"B{i:012d}"
+        status = rng.choice(["상시", "특정 기간", "특정 기간", "마감"])
+        start = today - timedelta(days=rng.randint(0, 365))
+        end = start + timedelta(days=rng.randint(10, 400))
+        biz_end = None if rng.random() < 0.3 else today + timedelta(days=rng.randint(-200, 400))
+        policies.append((policy_id, biz_end, start, end, status))
+        if rng.random() < 0.1:
+            codes = REGION_CODES  # 전국 단위 정책
+        else:
+            prefix = rng.choice(SIDO_PREFIXES)
+            codes = rng.sample([c for c in REGION_CODES if c.startswith(prefix)], rng.randint(1, 5))
+        regions.extend((policy_id, code) for code in codes)
+    return policies, regions
+
+
+def _load(cursor, connection, table_prefix: str, policies: list, regions: list, batch_size: int = 5000):
+    for rows, table, columns in (
+            (policies, f"{table_prefix}policies",
+             "(policy_id, biz_end_date, aply_start_date, aply_end_date, application_status)"),
+            (regions, f"{table_prefix}policy_regions", "(policy_id, region_code)")):
+        placeholders = ', '.join(['%s'] * len(rows[0]))
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(f"INSERT INTO {table} {columns} VALUES ({placeholders})", rows[i:i + batch_size])
+        connection.commit()
+
+
+def _explain(cursor, query: str, params: list):
+    cursor.execute("EXPLAIN " + query, params)
+    columns = [c[0] for c in cursor.description]
+    for row in cursor.fetchall():
+        item = dict(zip(columns, row))
+        print(f"    table={item.get('table')}, type={item.get('type')}, key={item.get('key')}, "
+              f"rows={item.get('rows')}, extra={item.get('Extra')}")
+
+
+def _time_query(cursor, query: str, params: list, repeat: int) -> tuple:
+    started = time.perf_counter()
+    count = 0
+    for _ in range(repeat):
+        cursor.execute(query, params)
+        count = len(cursor.fetchall())
+    return (time.perf_counter() - started) / repeat * 1000, count
+
+
+def run_benchmark(sizes: list, repeat: int, database: str):
+    info = dict(DB_CONNECTION_INFO)
+    info.pop('database', None)
+    connection = mysql.connector.connect(**info)
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    cursor.execute(f"USE `{database}`")
+
+    # 서울 전체(시/도 단위 질의)에 해당하는 코드 목록
+    codes = [c for c in REGION_CODES if c.startswith("11")]
+    padded = pad_in_list(codes)
+
+    for size in sizes:
+        for table in ("legacy_policies", "legacy_policy_regions", "policies", "policy_regions"):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        for ddl in LEGACY_DDL + INDEXED_DDL:
+            cursor.execute(ddl)
+
+        policies, regions = _generate_rows(size)
+        _load(cursor, connection, "legacy_", policies, regions)
+        _load(cursor, connection, "", policies, regions)
+        cursor.execute("ANALYZE TABLE policies, policy_regions, legacy_policies, legacy_policy_regions")
+        cursor.fetchall()
+
+        print(f"\n=== 정책 {size}개, 지역 매핑 {len(regions)}행 ===")
+        legacy_query = _legacy_query(codes)
+        print("  [기존] JOIN + DISTINCT + DATE()")
+        _explain(cursor, legacy_query, codes)
+        legacy_ms, legacy_count = _time_query(cursor, legacy_query, codes, repeat)
+
+        indexed_query = _indexed_query(padded)
+        print("  [개선] EXISTS 세미 조인 + 인덱스 + prepared")
+        _explain(cursor, indexed_query, padded)
+        prepared = connection.cursor(prepared=True)
+        indexed_ms, indexed_count = _time_query(prepared, indexed_query, padded, repeat)
+        prepared.close()
+
+        print(f"  결과 수: 기존 {legacy_count} / 개선 {indexed_count}")
+        print(f"  평균 실행 시간: 기존 {legacy_ms:.2f}ms / 개선 {indexed_ms:.2f}ms "
+              f"({legacy_ms / max(indexed_ms, 1e-9):.1f}x)")
+
+    cursor.close()
+    connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4000, 40000, 200000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database", default="toyprj4_bench")
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.repeat, args.database)
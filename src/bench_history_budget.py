@@ -0,0 +1,96 @@
+"""
+대화 기록 토큰 예산 확인 스크립트 (API 호출 없음)
+
+data/policy_data.json의 정책으로 "정책 5개를 자세히 소개하는 긴 답변"이 이어지는 가상 대화를 만들고,
+턴마다 다음 두 기록이 프롬프트에 넣는 대화 기록 토큰 수를 비교합니다.
+- WindowedInMemoryHistory: 최근 메시지 2*MEMORY_K개
+- TokenBudgetHistory: 토큰 예산 + 이전 답변 압축 (--no-compress로 압축 끄기)
+추가/제거에 걸린 시간(턴당 add_messages)도 함께 출력합니다.
+
+사용법:
+    python bench_history_budget.py --turns 12 --budget 2000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from config import MEMORY_K, HISTORY_TOKEN_BUDGET, HISTORY_MAX_MESSAGES
+from memory import WindowedInMemoryHistory, TokenBudgetHistory, HistoryMetrics, message_tokens
+
+POLICY_FILE = "../data/policy_data.json"
+QUESTIONS = [
+    "서울 사는 27살 미취업자인데 받을 수 있는 주거 지원 정책 알려줘",
+    "두 번째 정책 신청 방법은?",
+    "창업 지원금도 있어?",
+    "대학생 장학금 정책도 알려줘",
+    "그거 자격 요건이 어떻게 돼?",
+    "인턴 정책은?",
+]
+
+
+def load_policies(path: str = POLICY_FILE) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["result"]["youthPolicyList"]
+
+
+def long_answer(policies: list) -> str:
+    """답변 프롬프트가 만드는 형식과 비슷한 정책 5개 상세 소개"""
+    sections = []
+    for i, policy in enumerate(policies, 1):
+        sections.append(
+            f"### {i}. {policy.get('plcyNm', '').strip()}\n"
+            f"- 정책 요약: {policy.get('plcyExplnCn', '')}\n"
+            f"- 지원 내용: {policy.get('plcySprtCn', '')}\n"
+            f"- 신청 방법: {policy.get('plcyAplyMthdCn', '')}\n"
+            f"- 신청 사이트: {policy.get('aplyUrlAddr', '')}"
+        )
+    return "질문하신 조건에 맞는 정책을 소개해 드립니다.\n\n" + "\n\n".join(sections)
+
+
+def history_tokens(history) -> int:
+    return sum(message_tokens(message.content) for message in history.messages)
+
+
+def replay(history, policies: list, turns: int) -> tuple:
+    """턴마다 (답변 생성 전 대화 기록 토큰 수)와 add_messages 시간을 반환합니다."""
+    tokens, add_seconds = [], []
+    for turn in range(turns):
+        tokens.append(history_tokens(history))
+        picked = [policies[(turn * 5 + i) % len(policies)] for i in range(5)]
+        history.last_documents = [Document(page_content="", metadata={"plcyNo": p["plcyNo"], "plcyNm": p["plcyNm"]})
+                                  for p in picked]
+        started = time.perf_counter()
+        history.add_messages([HumanMessage(content=QUESTIONS[turn % len(QUESTIONS)]),
+                              AIMessage(content=long_answer(picked))])
+        add_seconds.append(time.perf_counter() - started)
+    return tokens, add_seconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--budget", type=int, default=HISTORY_TOKEN_BUDGET or 2000)
+    parser.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
+
+    policies = load_policies()
+    windowed_tokens, windowed_seconds = replay(WindowedInMemoryHistory(k=MEMORY_K), policies, args.turns)
+    metrics = HistoryMetrics()
+    budget_tokens, budget_seconds = replay(
+        TokenBudgetHistory(args.budget, HISTORY_MAX_MESSAGES, not args.no_compress, metrics), policies, args.turns
+    )
+
+    print(f"\n{'turn':>4} {'windowed(k=' + str(MEMORY_K) + ')':>16} {'token budget':>14}")
+    for turn, (before, after) in enumerate(zip(windowed_tokens, budget_tokens), 1):
+        print(f"{turn:>4} {before:>16} {after:>14}")
+
+    total_before, total_after = sum(windowed_tokens), sum(budget_tokens)
+    print(f"\n대화 기록 토큰 합계: {total_before} -> {total_after} "
+          f"({(1 - total_after / total_before) * 100 if total_before else 0:.1f}% 감소)")
+    print(f"이전 답변 압축 {metrics.compressed_answers}건, 예산 초과로 제거한 메시지 {metrics.evicted_messages}건")
+    print(f"add_messages 평균: windowed {np.mean(windowed_seconds) * 1e6:.0f}µs, "
+          f"token budget {np.mean(budget_seconds) * 1e6:.0f}µs (토큰 계산 포함)")
@@ -0,0 +1,159 @@
+"""
+프롬프트 접두사 안정성 확인 스크립트 (API 호출 없음)
+
+OpenAI 프롬프트 캐싱은 요청 앞부분이 이전 요청과 바이트 단위로 같을 때(1024 토큰 이상, 128 토큰 단위)
+적용됩니다. 이 스크립트는 여러 턴짜리 가상 대화를 실제 프롬프트 템플릿으로 렌더링해서
+1. 턴마다 system 메시지가 바이트 단위로 같은지
+2. 같은 세션의 연속된 요청끼리 공통 접두사가 몇 바이트(토큰)인지
+3. 위 규칙대로라면 캐시에서 읽힐 토큰이 몇 개인지
+를 답변 프롬프트(TEMPLATE_WITH_HISTORY), 질문 재작성 프롬프트, 필터 추출 프롬프트,
+질의 이해 프롬프트(QUERY_UNDERSTANDING_SYSTEM_PROMPT, 기본 경로) 각각에 대해 출력합니다.
+대화 기록은 서버와 같은 memory.TokenBudgetHistory(토큰 예산 + 이전 답변 압축)에 쌓으므로,
+예산 초과로 오래된 턴이 빠지거나 이전 답변이 요약으로 바뀌면서 접두사가 어디서 달라지는지도 함께 확인합니다.
+system 메시지가 턴마다 달라지면 종료 코드 1로 끝납니다.
+
+사용법:
+    python bench_prompt_prefix.py --turns 6
+    python bench_prompt_prefix.py --turns 12 --token-budget 800   # 예산을 줄여 오래된 턴 제거까지 확인
+"""
+import argparse
+import json
+import sys
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from config import HISTORY_TOKEN_BUDGET
+from memory import TokenBudgetHistory, HistoryMetrics
+from prompts import (TEMPLATE_WITH_HISTORY, TEMPLATE_WITH_HISTORY_FOR_R, FILTER_EXTRACTION_SYSTEM_PROMPT,
+                     QUERY_UNDERSTANDING_SYSTEM_PROMPT)
+from query_understanding import history_to_openai_messages
+
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+SAMPLE_QUESTIONS = [
+    "서울 사는 27살 미취업자인데 받을 수 있는 주거 지원 정책 알려줘",
+    "두 번째 정책 신청 방법은?",
+    "비슷한 정책 더 알려줘",
+    "부산으로 이사 가면 받을 수 있는 일자리 정책은?",
+    "그거 자격 요건이 어떻게 돼?",
+    "창업 지원금도 있어?",
+]
+
+
+def _sample_documents(turn: int) -> list:
+    return [Document(page_content=f"샘플 정책 {turn}-{i} 본문",
+                     metadata={"plcyNo": f"{turn:04d}{i:04d}", "plcyNm": f"샘플 정책 {turn}-{i}"})
+            for i in range(5)]
+
+
+def _sample_context(turn: int) -> str:
+    return "\n".join(
+        f"### 정책명: 샘플 정책 {turn}-{i}\n- 지원 내용: 월 최대 20만원 지원 (턴 {turn})\n- 신청 기간: 상시"
+        for i in range(5)
+    )
+
+
+def _serialize(messages: list) -> str:
+    """API로 보내는 messages 배열과 같은 순서/형태로 직렬화합니다."""
+    return json.dumps(messages, ensure_ascii=False)
+
+
+def _to_api_messages(prompt_messages: list) -> list:
+    role_of = {"system": "system", "human": "user", "ai": "assistant"}
+    return [{"role": role_of.get(m.type, m.type), "content": m.content} for m in prompt_messages]
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _estimate_tokens(text: str) -> int:
+    """tiktoken 인코딩을 쓸 수 없는 환경(오프라인)에서는 한글 기준 대략 2바이트당 1토큰으로 추정합니다."""
+    try:
+        from utils import count_tokens
+        return count_tokens(text)
+    except Exception:
+        return len(text.encode("utf-8")) // 2
+
+
+def _cacheable_tokens(prefix_tokens: int) -> int:
+    if prefix_tokens < CACHE_MIN_TOKENS:
+        return 0
+    return prefix_tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+
+
+def render_conversation(turns: int, token_budget: int = HISTORY_TOKEN_BUDGET) -> dict:
+    """
+    턴마다 네 가지 프롬프트를 렌더링해 API messages 배열 목록으로 반환합니다.
+    대화 기록은 TokenBudgetHistory에 쌓아 서버와 같은 방식으로 잘리고 압축됩니다.
+    """
+    history = TokenBudgetHistory(token_budget=token_budget, metrics=HistoryMetrics())
+    rendered = {"answer": [], "rephrase": [], "filter_extraction": [], "query_understanding": []}
+    for turn in range(turns):
+        question = SAMPLE_QUESTIONS[turn % len(SAMPLE_QUESTIONS)]
+        chat_history = history.messages
+        rendered["rephrase"].append(_to_api_messages(
+            TEMPLATE_WITH_HISTORY_FOR_R.format_messages(chat_history=chat_history, question=question)))
+        rendered["filter_extraction"].append([
+            {"role": "system", "content": FILTER_EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": question},
+        ])
+        # query_understanding.understand_query와 같은 순서: 고정 system -> 대화 기록 -> 이번 질문
+        rendered["query_understanding"].append([
+            {"role": "system", "content": QUERY_UNDERSTANDING_SYSTEM_PROMPT},
+            *history_to_openai_messages(chat_history),
+            {"role": "user", "content": question},
+        ])
+        rendered["answer"].append(_to_api_messages(TEMPLATE_WITH_HISTORY.format_messages(
+            chat_history=chat_history, context=_sample_context(turn), question=question)))
+        # retrieve_documents가 답변 생성 전에 last_documents를 갱신하므로, 답변 압축 시 이 정책 목록이 쓰임
+        history.last_documents = _sample_documents(turn)
+        history.add_messages([HumanMessage(content=question),
+                              AIMessage(content=f"샘플 답변 {turn}: " + "정책 안내 " * 40)])
+    print(f"대화 기록: 메시지 {len(history.messages)}개, 약 {history.total_tokens} 토큰 (예산 {token_budget})")
+    return rendered
+
+
+def analyze(name: str, requests: list) -> bool:
+    """system 메시지 고정 여부와 연속 요청 간 공통 접두사를 출력합니다. system 메시지가 고정이면 True."""
+    system_messages = {messages[0]["content"] for messages in requests if messages[0]["role"] == "system"}
+    stable = len(system_messages) == 1
+    system_tokens = _estimate_tokens(next(iter(system_messages))) if system_messages else 0
+    print(f"\n[{name}] system 메시지 {'고정' if stable else f'변경됨({len(system_messages)}종)'}, "
+          f"system 토큰 약 {system_tokens}")
+
+    total_tokens = cached_tokens = 0
+    previous = None
+    for turn, messages in enumerate(requests):
+        serialized = _serialize(messages)
+        tokens = _estimate_tokens(serialized)
+        prefix_tokens = 0
+        if previous is not None:
+            prefix = serialized[:_common_prefix_length(previous, serialized)]
+            prefix_tokens = _estimate_tokens(prefix)
+        cacheable = _cacheable_tokens(prefix_tokens)
+        total_tokens += tokens
+        cached_tokens += cacheable
+        print(f"  턴 {turn + 1}: 입력 약 {tokens} 토큰, 직전 요청과 공통 접두사 약 {prefix_tokens} 토큰, "
+              f"캐시 예상 {cacheable} 토큰")
+        previous = serialized
+    ratio = cached_tokens / total_tokens if total_tokens else 0.0
+    print(f"  => 캐시 예상 비율 {ratio:.1%} ({cached_tokens}/{total_tokens})")
+    return stable
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--token-budget", type=int, default=HISTORY_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    rendered = render_conversation(args.turns, args.token_budget)
+    results = [analyze(name, requests) for name, requests in rendered.items()]
+    sys.exit(0 if all(results) else 1)
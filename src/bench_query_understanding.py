@@ -0,0 +1,183 @@
+"""
+질의 이해 A/B 비교 스크립트 (두 번 호출 vs 한 번 호출)
+
+data/eval_queries.json의 라벨 대화를 두 방식으로 실행해 지연시간, 토큰, 예상 비용, 품질을 비교합니다.
+- A (two_call): TEMPLATE_WITH_HISTORY_FOR_R로 질문 재작성 -> 재작성된 질문으로 create_filter_from_query
+- B (single_call): query_understanding.understand_query 한 번 호출
+품질은 eval_model_tiers.py와 같은 기준을 씁니다. (필터 exact/hard 일치, 재작성 fidelity)
+
+--offline이면 API를 호출하지 않고 요청마다 보내는 프롬프트 토큰 수만 비교합니다.
+
+사용법:
+    python bench_query_understanding.py --offline
+    python bench_query_understanding.py --repeat 3 --output ../data/query_understanding_ab.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from config import EVAL_QUERY_FILE, OPENAI_TEMPERATURE, CALL_POLICIES
+from eval_model_tiers import load_eval_cases, score_filters, score_rephrase
+from prompts import FILTER_EXTRACTION_SYSTEM_PROMPT, QUERY_UNDERSTANDING_SYSTEM_PROMPT, contextualize_q_system_prompt
+
+# 1M 토큰당 USD (gpt-4o 기준, 모델을 바꾸면 --price로 조정)
+DEFAULT_PRICES = {"input": 2.50, "cached_input": 1.25, "output": 10.00}
+# chat.completions 메시지 하나당 붙는 형식 토큰 (대략값)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def _estimate_tokens(text: str) -> int:
+    """tiktoken 인코딩을 쓸 수 없는 환경(오프라인)에서는 한글 기준 대략 2바이트당 1토큰으로 추정합니다."""
+    try:
+        from utils import count_tokens
+        return count_tokens(text)
+    except Exception:
+        return len(text.encode("utf-8")) // 2
+
+
+def _messages_tokens(contents: list) -> int:
+    return sum(_estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS for content in contents)
+
+
+def prompt_sizes(case: dict) -> dict:
+    """한 턴에 보내는 입력 토큰 수 (API 호출 없이 계산). two_call의 필터 추출 입력은 기대 독립 질문으로 대신합니다."""
+    history = [text for _, text in case.get("history", [])]
+    rephrase = _messages_tokens([contextualize_q_system_prompt, *history, case["question"]])
+    filter_extraction = _messages_tokens([FILTER_EXTRACTION_SYSTEM_PROMPT, case["reference"]])
+    single = _messages_tokens([QUERY_UNDERSTANDING_SYSTEM_PROMPT, *history, case["question"]])
+    return {"two_call": rephrase + filter_extraction, "single_call": single}
+
+
+def run_offline(cases: list) -> dict:
+    sizes = [prompt_sizes(case) for case in cases]
+    two_call = float(np.mean([s["two_call"] for s in sizes]))
+    single_call = float(np.mean([s["single_call"] for s in sizes]))
+    return {
+        "two_call": {"calls_per_turn": 2, "prompt_tokens_per_turn": round(two_call)},
+        "single_call": {"calls_per_turn": 1, "prompt_tokens_per_turn": round(single_call)},
+        "prompt_token_reduction": round(1 - single_call / two_call, 3) if two_call else 0.0,
+    }
+
+
+def _history_messages(case: dict) -> list:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    return [HumanMessage(content=text) if role == "human" else AIMessage(content=text)
+            for role, text in case.get("history", [])]
+
+
+def _cost(tokens: dict, prices: dict) -> float:
+    uncached = tokens["prompt_tokens"] - tokens["cached_tokens"]
+    return (uncached * prices["input"] + tokens["cached_tokens"] * prices["cached_input"]
+            + tokens["completion_tokens"] * prices["output"]) / 1_000_000
+
+
+def _summarize(name: str, latencies: list, scores: list, fidelities: list, turns: int, prices: dict) -> dict:
+    from metrics import usage_metrics
+
+    stages = usage_metrics.summary()
+    tokens = {field: sum(entry[field] for entry in stages.values())
+              for field in ("prompt_tokens", "cached_tokens", "completion_tokens")}
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "variant": name,
+        "calls_per_turn": round(sum(entry["calls"] for entry in stages.values()) / turns, 2),
+        "latency": {"p50_ms": round(p50 * 1000), "p95_ms": round(p95 * 1000),
+                    "mean_ms": round(float(np.mean(latencies)) * 1000)},
+        "tokens_per_turn": {field: round(value / turns, 1) for field, value in tokens.items()},
+        "cost_per_1k_turns_usd": round(_cost(tokens, prices) / turns * 1000, 4),
+        "filter_exact_match": round(float(np.mean([s["exact_match"] for s in scores])), 3),
+        "filter_hard_match": round(float(np.mean([s["hard_match"] for s in scores])), 3),
+        "rephrase_fidelity": round(float(np.mean(fidelities)), 3),
+        "stages": stages,
+    }
+
+
+def run_two_call(client, cases: list, repeat: int, prices: dict) -> dict:
+    from langchain_openai import ChatOpenAI
+    from langchain_core.output_parsers import StrOutputParser
+    from llm_utils import create_filter_from_query, stage_model
+    from metrics import usage_metrics, UsageCallbackHandler
+    from prompts import TEMPLATE_WITH_HISTORY_FOR_R
+
+    rephrase_model = ChatOpenAI(model=stage_model("rephrase"), temperature=OPENAI_TEMPERATURE,
+                                callbacks=[UsageCallbackHandler()], timeout=CALL_POLICIES["rephrase"]["deadline"])
+    chain = TEMPLATE_WITH_HISTORY_FOR_R | rephrase_model.with_config(tags=["stage:rephrase"]) | StrOutputParser()
+
+    usage_metrics.reset()
+    latencies, scores, fidelities = [], [], []
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            question = chain.invoke({"chat_history": _history_messages(case), "question": case["question"]})
+            filters = create_filter_from_query(client, question)
+            latencies.append(time.perf_counter() - started)
+            scores.append(score_filters(filters, case["filters"]))
+            fidelities.append(score_rephrase(question, case))
+    return _summarize("two_call", latencies, scores, fidelities, len(latencies), prices)
+
+
+def run_single_call(client, cases: list, repeat: int, prices: dict) -> dict:
+    from metrics import usage_metrics
+    from query_understanding import understand_query
+
+    usage_metrics.reset()
+    latencies, scores, fidelities = [], [], []
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            result = understand_query(client, _history_messages(case), case["question"])
+            latencies.append(time.perf_counter() - started)
+            scores.append(score_filters(result["filters"], case["filters"]))
+            fidelities.append(score_rephrase(result["standalone_question"], case))
+    return _summarize("single_call", latencies, scores, fidelities, len(latencies), prices)
+
+
+def print_report(results: dict):
+    offline = results["offline"]
+    print("\n--- 턴당 프롬프트 토큰 (추정) ---")
+    for variant in ("two_call", "single_call"):
+        print(f"{variant:<12} 호출 {offline[variant]['calls_per_turn']}회, "
+              f"입력 {offline[variant]['prompt_tokens_per_turn']} 토큰")
+    print(f"입력 토큰 감소율: {offline['prompt_token_reduction'] * 100:.1f}%")
+
+    if "online" not in results:
+        return
+    print(f"\n{'variant':<12} {'calls':>5} {'p50':>7} {'p95':>7} {'prompt':>8} {'cached':>7} {'output':>7} "
+          f"{'$/1k':>8} {'exact':>6} {'hard':>6} {'fidelity':>8}")
+    for result in results["online"]:
+        tokens = result["tokens_per_turn"]
+        print(f"{result['variant']:<12} {result['calls_per_turn']:>5} {result['latency']['p50_ms']:>5}ms "
+              f"{result['latency']['p95_ms']:>5}ms {tokens['prompt_tokens']:>8} {tokens['cached_tokens']:>7} "
+              f"{tokens['completion_tokens']:>7} {result['cost_per_1k_turns_usd']:>8} "
+              f"{result['filter_exact_match']:>6} {result['filter_hard_match']:>6} {result['rephrase_fidelity']:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", default=EVAL_QUERY_FILE)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--offline", action="store_true", help="API 호출 없이 프롬프트 토큰 수만 비교")
+    parser.add_argument("--price", nargs=3, type=float, metavar=("INPUT", "CACHED_INPUT", "OUTPUT"),
+                        default=None, help="1M 토큰당 USD 가격")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    cases = load_eval_cases(args.queries)
+    prices = dict(zip(("input", "cached_input", "output"), args.price)) if args.price else DEFAULT_PRICES
+    results = {"offline": run_offline(cases)}
+    if not args.offline:
+        from openai import OpenAI
+
+        load_dotenv()
+        client = OpenAI()
+        results["online"] = [run_two_call(client, cases, args.repeat, prices),
+                             run_single_call(client, cases, args.repeat, prices)]
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 비교 결과 저장: {args.output}")
@@ -0,0 +1,104 @@
+"""
+API 서버 처리량 측정 스크립트
+
+두 가지 경로를 같은 질문 목록으로 비교합니다.
+1. Streamlit 경로: 한 세션 스레드에서 final_chain_with_memory.stream을 순차(블로킹) 호출
+2. API 경로: 실행 중인 main.py 서버의 /chat/stream에 동시 요청
+
+사용법:
+    uvicorn main:app --workers 4   (다른 터미널)
+    python bench_server.py --base-url http://localhost:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+DEFAULT_QUESTIONS = [
+    "서울 사는 25세 미취업자인데 월세 지원 정책 알려줘",
+    "경기도 청년 창업 지원금 있어?",
+    "부산에 사는 대학생이 받을 수 있는 장학금 알려줘",
+    "전국 단위 청년 취업 지원 정책 알려줘",
+]
+
+
+def _summarize(name: str, latencies: list, first_token: list, elapsed: float):
+    count = len(latencies)
+    print(f"\n--- {name} ---")
+    print(f"요청 수: {count}, 전체 소요: {elapsed:.2f}s, 처리량: {count / elapsed:.2f} req/s")
+    if first_token:
+        print(f"첫 토큰 지연 p50: {statistics.median(first_token):.2f}s")
+    if latencies:
+        ordered = sorted(latencies)
+        p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+        print(f"전체 응답 p50: {statistics.median(latencies):.2f}s, p95: {p95:.2f}s")
+
+
+def bench_streamlit_path(questions: list):
+    """Streamlit과 같은 방식으로, 체인 stream을 한 번에 하나씩 블로킹 호출합니다."""
+    from dotenv import load_dotenv
+    from openai import OpenAI
+    from utils import load_code_table
+    from chains import create_final_chain
+
+    load_dotenv()
+    chain = create_final_chain(OpenAI(), load_code_table())
+
+    latencies, first_token = [], []
+    started = time.perf_counter()
+    for question in questions:
+        t0 = time.perf_counter()
+        first = None
+        for _ in chain.stream(
+                {"question": question},
+                config={"configurable": {"session_id": str(uuid.uuid4())}}
+        ):
+            if first is None:
+                first = time.perf_counter() - t0
+        latencies.append(time.perf_counter() - t0)
+        first_token.append(first or latencies[-1])
+    _summarize("Streamlit 경로 (순차 블로킹 stream)", latencies, first_token, time.perf_counter() - started)
+
+
+async def _one_request(client: httpx.AsyncClient, question: str, latencies: list, first_token: list):
+    t0 = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/chat/stream", json={"question": question}) as response:
+        async for line in response.aiter_lines():
+            if first is None and line.startswith("data:"):
+                first = time.perf_counter() - t0
+    latencies.append(time.perf_counter() - t0)
+    first_token.append(first or latencies[-1])
+
+
+async def bench_api_path(base_url: str, questions: list, concurrency: int):
+    """동시 요청 수를 concurrency로 제한하여 /chat/stream을 호출합니다."""
+    latencies, first_token = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(client, question):
+        async with semaphore:
+            await _one_request(client, question, latencies, first_token)
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        await asyncio.gather(*(worker(client, q) for q in questions))
+    _summarize(f"API 경로 (동시성 {concurrency})", latencies, first_token, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--skip-streamlit", action="store_true")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS * args.repeat
+
+    if not args.skip_streamlit:
+        bench_streamlit_path(questions)
+    asyncio.run(bench_api_path(args.base_url, questions, args.concurrency))
@@ -0,0 +1,255 @@
+"""
+외부 모델 호출 정책 (제한 시간, 헤지 요청, 서킷 브레이커, 단계별 대체 동작)
+
+OpenAI 호출(질문 재작성, 필터 추출, 질의 임베딩, 답변 생성)에 제한 시간이 없어서
+응답 하나가 늦어지면 세션 전체가 멈추던 문제를 막습니다.
+
+- 제한 시간(deadline): 단계마다 CALL_POLICIES에 정한 시간 안에 결과가 없으면 실패로 봅니다.
+- 헤지(hedge): 첫 요청이 그 단계의 최근 p95 지연시간을 넘기면 같은 요청을 한 번 더 보내고 먼저 온 결과를 씁니다.
+  (표본이 CALL_HEDGE_MIN_SAMPLES개 모이기 전에는 hedge_after 값을 기준으로 사용)
+- 서킷 브레이커: 연속 CIRCUIT_FAILURE_THRESHOLD번 실패하면 CIRCUIT_RESET_SECONDS 동안 호출하지 않고 바로 대체 동작으로 넘어갑니다.
+  그 뒤 한 번 시험 호출해 성공하면 다시 닫습니다.
+- 대체 동작(degraded mode)은 호출하는 쪽에서 fallback으로 정합니다.
+    질문 재작성 실패 -> 원문 질문 사용
+    필터 추출 실패  -> 필터 없이 원문 질문으로 검색
+    질의 임베딩 실패 -> BM25 또는 RDB 후보 순서로 검색 (retriever.semantic_search)
+    답변 생성       -> ChatOpenAI timeout (스트리밍은 헤지하지 않음)
+- 단계별 p50/p95/p99 지연시간, 결과별 횟수, 헤지/대체 동작 횟수는 call_policy_summary()로 확인합니다. (GET /metrics)
+
+주의: 스레드로 실행한 호출은 제한 시간이 지나도 강제로 멈출 수 없으므로,
+클라이언트 자체 timeout도 deadline으로 함께 지정해 남은 호출이 오래 남지 않게 합니다.
+
+사용법:
+    policy = get_call_policy("filter_extraction")
+    response = policy.call(lambda: client.chat.completions.create(..., timeout=policy.deadline),
+                           fallback=lambda: None, degraded="필터 없이 검색")
+    python bench_call_policy.py   # 지연을 주입한 가짜 upstream으로 동작 확인
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (CALL_POLICIES, CALL_HEDGE_MIN_SAMPLES, CALL_LATENCY_WINDOW, CIRCUIT_FAILURE_THRESHOLD,
+                    CIRCUIT_RESET_SECONDS, CALL_POLICY_MAX_WORKERS)
+
+_executor = ThreadPoolExecutor(max_workers=CALL_POLICY_MAX_WORKERS, thread_name_prefix="call-policy")
+
+
+class StageUnavailable(Exception):
+    """제한 시간 초과, 서킷 열림, 호출 오류로 단계 결과를 얻지 못했을 때 발생합니다."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """연속 실패 횟수 기반 서킷 브레이커 (closed -> open -> half-open -> closed)"""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        """호출해도 되는지 반환합니다. half-open 상태에서는 시험 호출 하나만 허용합니다."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.opened_count += 1
+                    print(f"⚠️ [Call Policy] 연속 실패 {self._failures}회: {self.reset_seconds}초 동안 호출 차단")
+                self._opened_at = time.monotonic()
+
+
+class StageLatencyStats:
+    """단계별 최근 지연시간(성공 호출)과 결과별 횟수"""
+
+    def __init__(self, window: int = CALL_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.outcomes = {}
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.degraded = 0
+
+    def record(self, elapsed: float, outcome: str, hedged: bool = False, hedge_won: bool = False):
+        with self._lock:
+            if outcome == "ok":
+                self.latencies.append(elapsed)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            self.hedged += int(hedged)
+            self.hedge_wins += int(hedge_won)
+
+    def record_degraded(self):
+        with self._lock:
+            self.degraded += 1
+
+    def percentile(self, q: float):
+        with self._lock:
+            samples = list(self.latencies)
+        return float(np.percentile(samples, q)) if samples else None
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = np.asarray(self.latencies, dtype=np.float64)
+            result = {"outcomes": dict(self.outcomes), "hedged": self.hedged, "hedge_wins": self.hedge_wins,
+                      "degraded": self.degraded, "samples": int(samples.size)}
+        if samples.size:
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            result.update({"p50_ms": round(p50 * 1000), "p95_ms": round(p95 * 1000),
+                           "p99_ms": round(p99 * 1000), "max_ms": round(samples.max() * 1000)})
+        return result
+
+
+class CallPolicy:
+    """한 단계의 외부 호출에 제한 시간, 헤지, 서킷 브레이커를 적용합니다."""
+
+    def __init__(self, stage: str, deadline: float, hedge: bool = False, hedge_after: float = None,
+                 breaker: CircuitBreaker = None, stats: StageLatencyStats = None,
+                 hedge_min_samples: int = CALL_HEDGE_MIN_SAMPLES):
+        self.stage = stage
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = stats or StageLatencyStats()
+
+    def hedge_delay(self):
+        """헤지 요청을 보낼 시점(초). 표본이 충분하면 최근 p95, 아니면 hedge_after를 사용합니다."""
+        if not self.hedge:
+            return None
+        if len(self.stats.latencies) >= self.hedge_min_samples:
+            return self.stats.percentile(95)
+        return self.hedge_after
+
+    def _submit(self, fn):
+        # 호출한 쪽의 contextvars(LangChain 실행 컨텍스트 등)를 작업 스레드에 그대로 넘김
+        return _executor.submit(contextvars.copy_context().run, fn)
+
+    def _run(self, fn) -> tuple:
+        """(결과, 헤지 여부, 헤지 요청이 이겼는지)를 반환합니다. 제한 시간 안에 성공하지 못하면 예외를 던집니다."""
+        deadline_at = time.monotonic() + self.deadline
+        primary = self._submit(fn)
+        pending = {primary}
+        hedged = False
+
+        delay = self.hedge_delay()
+        if delay is not None and delay < self.deadline:
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                pending.add(self._submit(fn))
+                hedged = True
+
+        last_error = None
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result(), hedged, future is not primary
+                last_error = future.exception()
+        if last_error is not None and not pending:
+            raise last_error
+        raise StageUnavailable(self.stage, "timeout")
+
+    def call(self, fn, fallback=None, degraded: str = ""):
+        """
+        fn()을 정책에 따라 실행합니다.
+        실패하면 fallback이 있으면 fallback()의 결과를, 없으면 StageUnavailable을 던집니다.
+        """
+        started = time.monotonic()
+        try:
+            if not self.breaker.allow():
+                raise StageUnavailable(self.stage, "circuit_open")
+            result, hedged, hedge_won = self._run(fn)
+        except Exception as e:
+            reason = e.reason if isinstance(e, StageUnavailable) else type(e).__name__
+            if reason != "circuit_open":
+                self.breaker.record_failure()
+            self.stats.record(time.monotonic() - started, reason)
+            if fallback is None:
+                if isinstance(e, StageUnavailable):
+                    raise
+                raise StageUnavailable(self.stage, reason) from e
+            if reason != "circuit_open":  # 서킷이 열린 동안은 열릴 때 한 번만 출력
+                print(f"⚠️ [Call Policy] {self.stage} 실패({reason}): {degraded or '대체 동작'} 사용")
+            self.stats.record_degraded()
+            return fallback()
+
+        self.breaker.record_success()
+        self.stats.record(time.monotonic() - started, "ok", hedged=hedged, hedge_won=hedge_won)
+        return result
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_call_policy(stage: str) -> CallPolicy:
+    """config.CALL_POLICIES 설정으로 단계별 정책을 프로세스당 하나씩 만듭니다."""
+    with _policies_lock:
+        if stage not in _policies:
+            settings = CALL_POLICIES[stage]
+            _policies[stage] = CallPolicy(stage, settings["deadline"], hedge=settings.get("hedge", False),
+                                          hedge_after=settings.get("hedge_after"))
+        return _policies[stage]
+
+
+def call_policy_summary() -> dict:
+    """단계별 지연시간 분위수, 결과별 횟수, 헤지/대체 동작 횟수, 서킷 상태"""
+    with _policies_lock:
+        policies = dict(_policies)
+    return {stage: {**policy.stats.summary(), "circuit": policy.breaker.state,
+                    "circuit_opened": policy.breaker.opened_count}
+            for stage, policy in policies.items()}
+
+
+class PolicyEmbeddings(Embeddings):
+    """질의 임베딩에 query_embedding 정책을 적용하는 래퍼. 실패하면 StageUnavailable을 던집니다."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: list) -> list:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return get_call_policy("query_embedding").call(lambda: self.embeddings.embed_query(text))
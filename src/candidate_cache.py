@@ -0,0 +1,130 @@
+"""
+RDB 후보 집합 캐시 (날짜 + 지역 코드 집합 기준)
+
+get_rdb_candidate_ids의 결과는 지역 코드 집합과 오늘 날짜(CURDATE())에만 달라지는데,
+턴마다 여러 테이블을 조회하는 SQL을 다시 실행했습니다.
+- 키: (오늘 날짜, 정렬된 지역 코드 튜플). 지역 조건이 없으면 빈 튜플(전국 후보).
+- 값: 정렬된 policy_id의 numpy 고정 길이 바이트 배열 (policy_id는 varchar라 정수 배열 대신 사용,
+  파이썬 문자열 리스트보다 메모리를 적게 씀)
+- 날짜가 바뀌면(자정) 첫 조회 때 전체를 비웁니다. (신청 기간/사업 기간 조건이 날짜 기준이므로)
+- 정책/지역 테이블을 다시 적재하면 invalidate_candidate_cache()로 비웁니다.
+  비우는 중에 실행되던 조회 결과는 저장하지 않습니다. (세대 번호 비교)
+- 적중 비율, 실행한 SQL 시간, 적중으로 아낀 SQL 시간(저장 당시 SQL 시간의 합)은 candidate_cache_summary()로 확인합니다.
+
+주의: 날짜는 서버 프로세스의 현지 날짜를 씁니다. DB 서버와 시간대가 같아야 합니다.
+
+사용법:
+    ids = get_candidate_cache().get_or_load(region_codes, lambda: run_sql(region_codes))
+    invalidate_candidate_cache()   # policy_loader / region_loader 적재 후
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+from config import CANDIDATE_CACHE, CANDIDATE_CACHE_MAX_ENTRIES
+
+
+class CandidateSetCache:
+    """(날짜, 지역 코드 집합) -> 정렬된 policy_id 배열 LRU 캐시"""
+
+    def __init__(self, max_entries: int = CANDIDATE_CACHE_MAX_ENTRIES, today=date.today):
+        self.max_entries = max_entries
+        self._today = today
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (ids 배열, SQL 시간)
+        self._day = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.sql_seconds = 0.0
+        self.saved_seconds = 0.0
+        self.rollovers = 0
+        self.invalidations = 0
+
+    def _roll_over(self, day: str):
+        # 락 안에서 호출
+        if self._day != day:
+            if self._day is not None:
+                self._entries.clear()
+                self._generation += 1
+                self.rollovers += 1
+                print(f"--- [Candidate Cache] 날짜 변경({self._day} -> {day}): 후보 캐시 비움 ---")
+            self._day = day
+
+    def get_or_load(self, region_codes: list, load) -> list:
+        """
+        캐시에 있으면 저장된 후보 ID를, 없으면 load()(SQL 실행)의 결과를 저장하고 반환합니다.
+        load()가 None을 반환하면(DB 오류) 저장하지 않고 빈 리스트를 반환합니다.
+        """
+        day = self._today().isoformat()
+        key = (day, tuple(sorted(set(region_codes or []))))
+        with self._lock:
+            self._roll_over(day)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[1]
+            else:
+                self.misses += 1
+            generation = self._generation
+        if entry is not None:
+            return entry[0].astype(str).tolist()
+
+        started = time.perf_counter()
+        ids = load()
+        elapsed = time.perf_counter() - started
+        if ids is None:
+            return []
+        array = np.array(sorted(ids), dtype=np.bytes_) if ids else np.empty(0, dtype="S1")
+        with self._lock:
+            self.sql_seconds += elapsed
+            if generation == self._generation:
+                self._entries[key] = (array, elapsed)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return array.astype(str).tolist()
+
+    def invalidate(self, reason: str = ""):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+        print(f"--- [Candidate Cache] 후보 캐시 무효화{f' ({reason})' if reason else ''} ---")
+
+    def summary(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": CANDIDATE_CACHE,
+                "day": self._day,
+                "entries": len(self._entries),
+                "bytes": int(sum(array.nbytes for array, _ in self._entries.values())),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "sql_ms": round(self.sql_seconds * 1000),
+                "saved_sql_ms": round(self.saved_seconds * 1000),
+                "rollovers": self.rollovers,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = CandidateSetCache()
+
+
+def get_candidate_cache() -> CandidateSetCache:
+    return _cache
+
+
+def invalidate_candidate_cache(reason: str = ""):
+    """policies / 매핑 / region_codes 테이블을 다시 적재한 뒤 호출합니다."""
+    _cache.invalidate(reason)
+
+
+def candidate_cache_summary() -> dict:
+    return _cache.summary()
@@ -1,5 +1,6 @@
 # src/chains.py
 
+from datetime import date
 from functools import partial
 
 # LangChain 및 외부 모듈 import
@@ -8,20 +9,88 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough, RunnableWithMessageHistory
 
 # 프로젝트 내부 모듈 import
-from config import VDB_DIRECTORY, OPENAI_MODEL, OPENAI_TEMPERATURE
-from database import get_db_connection, get_rdb_candidate_ids
-from llm_utils import create_filter_from_query, format_docs
-from retriever import semantic_search
+from config import (VDB_DIRECTORY, OPENAI_TEMPERATURE, RETRIEVAL_K, ELIGIBILITY_FETCH_K,
+                    SIMILAR_FOLLOWUP, CALL_POLICIES, QUERY_UNDERSTANDING_SINGLE_CALL, USER_PROFILE)
+from database import get_thread_connection, get_rdb_candidate_ids, get_related_region_codes
+from llm_utils import create_filter_from_query, format_docs, stage_model
+from query_understanding import understand_query
+from retriever import semantic_search, similar_policy_search, SEARCH_PATHS
+from eligibility import rerank_by_eligibility
+from near_duplicates import collapse_near_duplicates
 from memory import get_session_history
+from user_profile import apply_profile
+from similarity_graph import is_similar_request
+from followup import classify_followup
+from metrics import UsageCallbackHandler
+from singleflight import get_flight, request_key
+from call_policy import get_call_policy
+from index_lifecycle import get_active_collection_name
+from chat_events import emit_event, policy_cards
 from prompts import TEMPLATE_WITH_HISTORY, TEMPLATE_WITH_HISTORY_FOR_R
 
 
+# 검색 단계 (턴마다 실행/생략된 단계를 출력할 때 사용)
+RETRIEVAL_STAGES = ("rephrase", "filter_extraction", "rdb_candidates", "vector_search", "eligibility_rerank")
+
+
+def report_stages(path: str, ran: list):
+    """이번 턴에서 실행/생략된 검색 단계를 출력합니다."""
+    skipped = [stage for stage in RETRIEVAL_STAGES if stage not in ran]
+    print(f"--- [Retrieval Path] {path} | 실행: {', '.join(ran) or '없음'} | 생략: {', '.join(skipped) or '없음'} ---")
+
+
+def coalesced_filters(openai_client, query: str) -> dict:
+    """같은 질문의 필터 추출이 실행 중이면 그 결과를 공유합니다. (singleflight.py)"""
+    return get_flight("filter_extraction").do(request_key(query), create_filter_from_query, openai_client, query)
+
+
+def with_session_profile(filters: dict, question: str, config) -> dict:
+    """이번 턴 필터로 세션 프로필을 갱신하고, 비어 있는 조건을 프로필로 채웁니다. (user_profile.py)"""
+    session_id = ((config or {}).get("configurable") or {}).get("session_id")
+    if not USER_PROFILE or session_id is None:
+        return filters
+    return apply_profile(get_session_history(session_id).profile, filters, question)
+
+
+def coalesced_understanding(openai_client, chat_history: list, question: str) -> dict:
+    """같은 대화 기록 + 질문의 질의 이해 호출이 실행 중이면 그 결과를 공유합니다."""
+    key = request_key([(message.type, message.content) for message in chat_history or []], question)
+    return get_flight("query_understanding").do(key, understand_query, openai_client, chat_history, question)
+
+
+def coalesced_candidate_ids(filters: dict) -> list:
+    """같은 필터(같은 날짜)의 후보 조회가 실행 중이면 그 결과를 공유합니다."""
+    return get_flight("rdb_candidates").do(
+        request_key(filters, date.today().isoformat()), get_rdb_candidate_ids, get_thread_connection(), filters
+    )
+
+
+def coalesced_semantic_search(candidate_ids: list, query: str, filters: dict, k: int, fetch_k: int) -> tuple:
+    """
+    같은 컬렉션/질문/후보/k에 대한 벡터 검색이 실행 중이면 그 결과를 공유합니다.
+    (문서 목록, 검색 경로)를 반환합니다. (retriever.SEARCH_PATHS)
+    """
+    key = request_key(get_active_collection_name(), query, filters, candidate_ids, k, fetch_k)
+    return get_flight("vector_search").do(
+        key, semantic_search,
+        candidate_ids=candidate_ids, original_query=query, extracted_filters=filters,
+        vdb_directory=VDB_DIRECTORY, k=k, fetch_k=fetch_k, with_path=True
+    )
+
+
 def create_final_chain(openai_client, code_map):
     """
     RAG 애플리케이션의 모든 체인을 조립하고 최종 실행 가능한 체인을 반환합니다.
     """
     # 0. 모델, 파서, 포맷터 정의
-    model = ChatOpenAI(model=OPENAI_MODEL, temperature=OPENAI_TEMPERATURE)
+    # stream_usage: 스트리밍 응답에서도 토큰 사용량(캐시 토큰 포함)을 받아 metrics에 기록
+    # timeout: 단계 제한 시간(call_policy.py)에 맞춰, 제한 시간이 지난 요청이 오래 남아 있지 않게 함
+    # 모델은 단계별 등급(config.STAGE_MODEL_TIERS)에 따라 정함
+    model = ChatOpenAI(model=stage_model("answer"), temperature=OPENAI_TEMPERATURE, stream_usage=True,
+                       callbacks=[UsageCallbackHandler()], timeout=CALL_POLICIES["answer"]["deadline"], max_retries=1)
+    rephrase_model = ChatOpenAI(model=stage_model("rephrase"), temperature=OPENAI_TEMPERATURE, stream_usage=True,
+                                callbacks=[UsageCallbackHandler()], timeout=CALL_POLICIES["rephrase"]["deadline"],
+                                max_retries=0)
     output_parser = StrOutputParser()
     formatted_docs_func = partial(format_docs, code_map=code_map)
 
@@ -41,44 +110,111 @@ def create_final_chain(openai_client, code_map):
 
     rephrase_question_chain = (
         TEMPLATE_WITH_HISTORY_FOR_R
-        | model
+        | rephrase_model.with_config(tags=["stage:rephrase"])
         | output_parser
     )
 
-    base_retrieval_chain = (
-            RunnableLambda(lambda q: {"query": q})
-            | RunnablePassthrough.assign(filters=lambda x: create_filter_from_query(openai_client, x["query"]))
-            | RunnablePassthrough.assign(
-        candidate_ids=lambda x: (
-            # get_rdb_candidate_ids 함수를 실행하고 결과를 ids 변수에 저장
-            ids := get_rdb_candidate_ids(get_db_connection(), x["filters"]),
-
-            # --- 디버깅 출력 ---
-            print("--- [DEBUG] 체인 중간 데이터 확인 ---"),
-            print(f"RDB에서 가져온 ID 개수: {len(ids)}"),
-            print(f"ID 리스트 앞 5개: {ids[:5] if ids else '없음'}"),
-            print(f"첫 번째 ID의 타입: {type(ids[0]) if ids else 'ID 없음'}"),
-            print("---------------------------------"),
-            # --- 디버깅 출력 끝 ---
-
-            # 최종적으로 ids를 반환
-            ids
-        )[-1]  # 튜플의 마지막 요소인 ids를 최종 결과로 사용
+    def extract_filters(x, config):
+        """필터를 추출하고, 화면에 바로 보여줄 수 있도록 이벤트로 내보냅니다. (chat_events.py)"""
+        filters = with_session_profile(coalesced_filters(openai_client, x["query"]), x["query"], config)
+        emit_event(config, "filters", filters)
+        return filters
+
+    def fetch_candidate_ids(x, config):
+        """RDB 후보 ID를 조회하고, 후보 수를 이벤트로 내보냅니다. (chat_events.py)"""
+        ids = coalesced_candidate_ids(x["filters"])
+        emit_event(config, "candidates", {"count": len(ids)})
+        return ids
+
+    # {"query", "filters"} -> 후보 조회 -> 벡터 검색 -> 자격 요건 재정렬
+    search_chain = (
+            RunnablePassthrough.assign(
+        candidate_ids=fetch_candidate_ids
     )
-            | RunnableLambda(lambda x: semantic_search(
+            | RunnablePassthrough.assign(search=lambda x: coalesced_semantic_search(
         candidate_ids=x["candidate_ids"],
-        original_query=x["query"],
-        extracted_filters=x["filters"],
-        vdb_directory=VDB_DIRECTORY
+        query=x["query"],
+        filters=x["filters"],
+        k=ELIGIBILITY_FETCH_K,
+        fetch_k=max(20, ELIGIBILITY_FETCH_K * 2)
     ))
+            # 검색 경로(벡터 검색/후보 직접 조회/정확 일치/임베딩 실패)는 턴별 단계 보고에 사용
+            | RunnablePassthrough.assign(documents=lambda x: x["search"][0], search_path=lambda x: x["search"][1])
+            # 지역만 다른 변형 정책은 하나만 남김 (사용자 지역에 맞는 변형 우선, near_duplicates.py)
+            | RunnablePassthrough.assign(documents=lambda x: collapse_near_duplicates(
+        x["documents"], get_related_region_codes(x["filters"].get("regions") or [])))
+            # 넉넉히 가져온 문서를 자격 요건으로 걸러 최종 RETRIEVAL_K개만 남김
+            | RunnablePassthrough.assign(
+        documents=lambda x: rerank_by_eligibility(x["documents"], x["filters"], code_map, k=RETRIEVAL_K))
     )
 
-    conversational_retrieval_chain = rephrase_question_chain | base_retrieval_chain
+    base_retrieval_chain = (
+            RunnableLambda(lambda q: {"query": q})
+            | RunnablePassthrough.assign(filters=extract_filters)
+            | search_chain
+    )
+
+    rephrase_policy = get_call_policy("rephrase")
+
+    def rephrase_question(x, config):
+        """질문 재작성. 제한 시간 안에 끝나지 않거나 실패하면 원문 질문을 그대로 사용합니다."""
+        return rephrase_policy.call(lambda: rephrase_question_chain.invoke(x, config),
+                                    fallback=lambda: x["question"], degraded="원문 질문으로 검색")
+
+    def understand(x, config):
+        """질문 재작성 + 필터 추출을 한 번의 호출로 처리합니다. (query_understanding.py)"""
+        result = coalesced_understanding(openai_client, x["chat_history"], x["question"])
+        filters = with_session_profile(result["filters"], result["standalone_question"], config)
+        emit_event(config, "filters", filters)
+        print(f"--- [Query Understanding] 독립 질문: {result['standalone_question']} ---")
+        return {"query": result["standalone_question"], "filters": filters}
+
+    if QUERY_UNDERSTANDING_SINGLE_CALL:
+        conversational_retrieval_chain = RunnableLambda(understand) | search_chain
+    else:
+        conversational_retrieval_chain = RunnableLambda(rephrase_question) | base_retrieval_chain
+
+    def retrieve_documents(x, config):
+        """
+        직전 문서로 답할 수 있는 후속 질문이면 검색 없이 그 문서를 그대로 쓰고,
+        "비슷한 정책 더 알려줘" 같은 질문이면 유사도 그래프로 답합니다(재작성/필터 추출/임베딩 생략).
+        그 외에는 기존 검색 체인을 실행하고, 사용한 문서와 필터를 세션에 기록합니다.
+        """
+        history = get_session_history(config.get("configurable", {}).get("session_id"))
+
+        # 1. 직전 문서에 대한 후속 질문 ("신청 방법은?", "두 번째 정책 자격요건")
+        reason, docs = classify_followup(x["question"], history.last_documents, history.last_answer())
+        if docs:
+            report_stages(f"후속 질문({reason})", ran=[])
+            emit_event(config, "policies", lambda: {"path": "followup", "policies": policy_cards(docs)})
+            return docs
+
+        # 2. 유사 정책 요청 ("비슷한 정책 더 알려줘")
+        if SIMILAR_FOLLOWUP and history.last_documents and is_similar_request(x["question"]):
+            docs = similar_policy_search(history.last_policy_ids, history.last_filters, k=ELIGIBILITY_FETCH_K)
+            docs = collapse_near_duplicates(docs, get_related_region_codes(history.last_filters.get("regions") or []))
+            docs = rerank_by_eligibility(docs, history.last_filters, code_map, k=RETRIEVAL_K) if docs else []
+            if docs:
+                report_stages("유사 정책 그래프", ran=["rdb_candidates", "eligibility_rerank"])
+                emit_event(config, "policies", lambda: {"path": "similar", "policies": policy_cards(docs)})
+                history.last_documents = docs
+                return docs
+
+        # 3. 일반 검색
+        result = conversational_retrieval_chain.invoke(x, config)
+        # 후보 직접 조회/정책명 정확 일치/임베딩 실패 경로는 벡터 검색을 실행하지 않음
+        search_path = result["search_path"]
+        ran = [stage for stage in RETRIEVAL_STAGES if stage != "vector_search" or SEARCH_PATHS.get(search_path)]
+        report_stages(f"전체 검색({search_path})", ran=ran)
+        emit_event(config, "policies", lambda: {"path": "search", "policies": policy_cards(result["documents"])})
+        history.last_documents = result["documents"]
+        history.last_filters = result["filters"]
+        return result["documents"]
 
     # 2. 핵심 RAG 체인 조립
     rag_core_chain = (
             {
-                "documents": conversational_retrieval_chain,
+                "documents": RunnableLambda(retrieve_documents),
                 "question": lambda x: x["question"],
                 "chat_history": lambda x: x["chat_history"],
             }
@@ -86,7 +222,7 @@ def create_final_chain(openai_client, code_map):
         context=(lambda x: formatted_docs_func(x["documents"]))
     )
             | TEMPLATE_WITH_HISTORY
-            | model
+            | model.with_config(tags=["stage:answer"])
             | output_parser
     )
 
@@ -0,0 +1,153 @@
+"""
+검색 중간 결과 이벤트 (답변보다 정책 카드를 먼저 보여주기)
+
+답변 토큰이 나오기 전까지(질문 재작성 + 필터 추출 + SQL + 벡터 검색) 화면이 비어 있던 문제를 줄이기 위해,
+체인이 단계별 결과를 구조화된 이벤트로 내보내고 UI/API가 이를 바로 그립니다.
+
+이벤트 (type, data)
+- filters:    추출된 필터 dict
+- candidates: {"count": RDB 후보 수}
+- policies:   {"path": 검색 경로, "policies": [{"plcyNo", "plcyNm", "aplyUrlAddr"}, ...]}
+- token:      답변 토큰 문자열
+- error:      오류 메시지 (status: 단계 호출 불가(call_policy.StageUnavailable)면 503, 그 외 502)
+
+체인 안에서는 emit_event(config, ...)로 config["configurable"]["event_sink"]에 전달하고,
+stream_with_events / astream_with_events가 이벤트와 답변 토큰을 한 줄의 스트림으로 합칩니다.
+두 함수는 요청마다 TTFC(첫 콘텐츠), 정책 카드, TTFT(첫 토큰) 시간을 metrics.content_metrics에 기록합니다.
+
+사용법:
+    for event in stream_with_events(chain, {"question": q}, {"configurable": {"session_id": sid}}):
+        ...
+"""
+import asyncio
+import queue
+import threading
+import time
+
+from metrics import content_metrics
+from policy_store import hydrate_documents
+
+EVENT_SINK_KEY = "event_sink"
+_DONE = object()
+
+
+def _error_event(e: Exception) -> dict:
+    """체인 실행 오류를 error 이벤트로 바꿉니다. API는 status를 그대로 HTTP 상태 코드로 씁니다."""
+    from call_policy import StageUnavailable
+    status = 503 if isinstance(e, StageUnavailable) else 502
+    return {"type": "error", "data": str(e), "status": status}
+
+
+def emit_event(config, event_type: str, data):
+    """
+    config에 이벤트 수신 함수가 있으면 이벤트를 전달합니다. (일반 invoke/stream에서는 아무 일도 하지 않음)
+    data가 함수이면 수신 함수가 있을 때만 호출해 값을 만듭니다.
+    """
+    sink = ((config or {}).get("configurable") or {}).get(EVENT_SINK_KEY)
+    if sink is not None:
+        sink(event_type, data() if callable(data) else data)
+
+
+def policy_cards(docs: list) -> list:
+    """정책 카드에 필요한 필드만 뽑습니다. (신청 URL은 사이드 스토어에서 채움)"""
+    return [
+        {
+            "plcyNo": doc.metadata.get("plcyNo"),
+            "plcyNm": doc.metadata.get("plcyNm"),
+            "aplyUrlAddr": doc.metadata.get("aplyUrlAddr"),
+        }
+        for doc in hydrate_documents(docs)
+    ]
+
+
+def _with_sink(config: dict, sink) -> dict:
+    config = dict(config or {})
+    config["configurable"] = {**(config.get("configurable") or {}), EVENT_SINK_KEY: sink}
+    return config
+
+
+class _ContentTimer:
+    """요청 시작 시점 기준으로 첫 콘텐츠/정책 카드/첫 토큰 시각을 잽니다."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {"ttfc": None, "policies": None, "ttft": None}
+
+    def observe(self, event_type: str):
+        elapsed = time.perf_counter() - self.started
+        if self.timings["ttfc"] is None and event_type != "error":
+            self.timings["ttfc"] = elapsed
+        if event_type == "policies" and self.timings["policies"] is None:
+            self.timings["policies"] = elapsed
+        if event_type == "token" and self.timings["ttft"] is None:
+            self.timings["ttft"] = elapsed
+
+    def finish(self):
+        content_metrics.record(**self.timings)
+        print("--- [TTFC] " + ", ".join(
+            f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.timings.items() if seconds is not None
+        ) + " ---")
+
+
+def stream_with_events(chain, inputs: dict, config: dict):
+    """
+    체인을 별도 스레드에서 stream으로 실행하고, 중간 이벤트와 답변 토큰을 발생 순서대로 {"type", "data"}로 내보냅니다.
+    (Streamlit처럼 UI를 그리는 스레드가 정해진 환경용)
+    """
+    events = queue.Queue()
+    config = _with_sink(config, lambda event_type, data: events.put({"type": event_type, "data": data}))
+
+    def run():
+        try:
+            for token in chain.stream(inputs, config=config):
+                events.put({"type": "token", "data": token})
+        except Exception as e:
+            print(f"스트리밍 중 오류 발생: {e}")
+            events.put(_error_event(e))
+        finally:
+            events.put(_DONE)
+
+    timer = _ContentTimer()
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        event = events.get()
+        if event is _DONE:
+            break
+        timer.observe(event["type"])
+        yield event
+    timer.finish()
+
+
+async def astream_with_events(chain, inputs: dict, config: dict):
+    """stream_with_events의 asyncio 버전 (FastAPI). 호출한 쪽이 중간에 멈추면 체인 실행도 취소합니다."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def sink(event_type, data):
+        # 동기 단계는 실행기 스레드에서 돌기 때문에 이벤트 루프로 넘겨서 넣음
+        loop.call_soon_threadsafe(events.put_nowait, {"type": event_type, "data": data})
+
+    config = _with_sink(config, sink)
+
+    async def run():
+        try:
+            async for token in chain.astream(inputs, config=config):
+                events.put_nowait({"type": "token", "data": token})
+        except Exception as e:
+            print(f"스트리밍 중 오류 발생: {e}")
+            events.put_nowait(_error_event(e))
+        finally:
+            loop.call_soon(events.put_nowait, _DONE)
+
+    timer = _ContentTimer()
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            event = await events.get()
+            if event is _DONE:
+                break
+            timer.observe(event["type"])
+            yield event
+        timer.finish()
+    finally:
+        task.cancel()
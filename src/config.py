@@ -7,7 +7,11 @@ from typing import Dict, Any
 # 디렉토리 경로
 VDB_DIRECTORY = "../vectorDB/chroma_db_policy"
 CODE_TABLE_FILE = "../data/code_table.xlsx"
-COLLECTION_NAME = 'policy_collection_summary_added_openai_large_0730'
+REGION_CODE_FILE = "../data/법정동코드전체자료.txt"
+REGION_HIERARCHY_FILE = "../data/region_hierarchy.json"  # region_loader.py가 생성
+REGION_MIN_ROW_RATIO = 0.9  # 새 파일의 지역 코드 수가 기존 region_codes 행 수의 이 비율보다 적으면 적재 중단 (--force로 무시)
+COLLECTION_NAME = 'policy_collection_summary_added_openai_large_0730'  # alias 파일(active_collection.json)이 없을 때 사용
+COLLECTION_BASE_NAME = 'policy_collection_summary_added_openai_large'  # index_lifecycle.py 버전 컬렉션 접두사
 
 # 데이터베이스 연결 정보
 DB_CONNECTION_INFO: Dict[str, Any] = {
@@ -20,11 +24,107 @@ DB_CONNECTION_INFO: Dict[str, Any] = {
 # OpenAI 설정
 OPENAI_MODEL = "gpt-4o"
 OPENAI_TEMPERATURE = 0
+# 단계별 모델 등급 (eval_model_tiers.py로 단계별 품질/지연시간을 비교한 뒤 조정)
+MODEL_TIERS = {"standard": OPENAI_MODEL, "fast": "gpt-4o-mini"}
+STAGE_MODEL_TIERS = {"rephrase": "standard", "filter_extraction": "standard", "query_understanding": "standard",
+                     "answer": "standard"}
+EVAL_QUERY_FILE = "../data/eval_queries.json"
 
 # 메모리 설정
 MEMORY_K = 2  # 최근 k개의 상호작용 기억
 
+# 대화 기록 토큰 예산 설정 (memory.TokenBudgetHistory)
+HISTORY_TOKEN_BUDGET = 2000  # 대화 기록 토큰 합계 상한. 0이면 MEMORY_K 메시지 수 기준 창 사용
+HISTORY_MAX_MESSAGES = 20  # 예산 안이더라도 보관할 최대 메시지 수
+HISTORY_COMPRESS_OLD_ANSWERS = True  # 최신 답변을 제외한 이전 답변은 추천 정책 목록(plcyNo/plcyNm)으로 줄임
+HISTORY_COMPRESSED_MAX_CHARS = 200  # 정책 목록이 없는 이전 답변은 이 길이까지만 유지
+
+# 세션 사용자 프로필 설정 (user_profile.py)
+USER_PROFILE = True  # 한 번 말한 나이/지역/직업 상태 등을 세션 내내 필터에 채움
+PROFILE_FIELDS = ("age", "income", "regions", "job_status", "marriage_status", "education_levels", "majors",
+                  "specializations")
+PROFILE_NATIONWIDE_CUES = ("전국", "지역상관없이", "지역무관", "지역관계없이", "어느지역이든")
+
 # Streamlit 설정
 PAGE_TITLE = "나만의 정책 분석 챗봇"
 PAGE_ICON = "🤖"
-CHAT_TITLE = "🤖 청년 정책 추천 챗 봇"
\ No newline at end of file
+CHAT_TITLE = "🤖 청년 정책 추천 챗 봇"
+
+# API 서버 설정 (uvicorn main:app)
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = 8000
+SERVER_WORKERS = 4  # 프로세스 수. 세션 기록은 프로세스별 메모리에 저장되므로 앞단에 세션 고정(sticky) 라우팅이 필요합니다.
+# /admin/* 요청은 ADMIN_TOKEN 환경 변수와 같은 값을 X-Admin-Token 헤더로 보내야 합니다.
+# ADMIN_TOKEN이 없으면 같은 호스트(127.0.0.1, ::1)에서 온 요청만 허용합니다.
+ADMIN_TOKEN_ENV = "ADMIN_TOKEN"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+# 하이브리드 검색 설정 (BM25 + 벡터, Reciprocal Rank Fusion)
+HYBRID_SEARCH = True
+RRF_K = 60
+
+# 검색 개수 설정
+RETRIEVAL_K = 5  # 최종적으로 LLM에 전달할 문서 수
+ELIGIBILITY_FETCH_K = 15  # 자격 요건 재정렬 전에 넉넉히 가져올 문서 수
+ELIGIBILITY_PARSED_CACHE_SIZE = 20000  # 정책 metadata 파싱 결과 캐시 최대 개수 ((plcyNo, lastMdfcnDt) 기준)
+
+# 적응형 검색 깊이 설정 (retrieval_depth.py)
+ADAPTIVE_RETRIEVAL = True
+ADAPTIVE_FETCH_K_MAX = 100  # 후보가 많아도 벡터 검색에서 가져올 최대 문서 수
+ADAPTIVE_FETCH_SQRT_FACTOR = 1.0  # fetch_k >= sqrt(후보 수) * factor
+ADAPTIVE_TIE_SPREAD = 0.02  # k번째 문서와 거리 차가 이보다 작은 문서는 함께 반환 (최대 k * 2개)
+ADAPTIVE_SCORE_DROP = 0.12  # 연속한 두 결과의 거리 차가 이보다 크면 그 앞에서 자름
+ADAPTIVE_MIN_K = 5  # 점수 급락으로 자르더라도 최소 유지할 문서 수
+
+# RDB 후보 집합 캐시 설정 (candidate_cache.py)
+CANDIDATE_CACHE = True  # (오늘 날짜, 지역 코드 집합) 기준으로 후보 ID를 캐시, 자정에 자동으로 비움
+CANDIDATE_CACHE_MAX_ENTRIES = 256
+
+# 정책 증분 동기화 설정 (policy_sync.py)
+POLICY_API_URL = "https://www.youthcenter.go.kr/go/ythip/getPlcy"  # 온통청년 청년정책 API (키: 환경 변수 YOUTH_POLICY_API_KEY)
+POLICY_SYNC_PAGE_SIZE = 100
+POLICY_SYNC_STATE_FILE = "policy_sync_state.json"  # 벡터 스토어 디렉토리에 저장 (마지막으로 반영한 lastMdfcnDt)
+POLICY_SYNC_PRUNE_EXPIRED = True  # 사업 기간/신청 기간이 끝났거나 마감된 정책을 RDB와 벡터 스토어에서 삭제
+
+# 질의 이해 설정 (query_understanding.py)
+# True: 질문 재작성 + 필터 추출을 한 번의 JSON 호출로 처리, False: 기존 두 번 호출 (bench_query_understanding.py로 비교)
+QUERY_UNDERSTANDING_SINGLE_CALL = True
+
+# 동시 요청 병합 설정 (singleflight.py)
+SINGLE_FLIGHT = True  # 실행 중인 동일 필터 추출/후보 조회/질의 임베딩/벡터 검색 요청은 결과를 공유
+
+# 외부 모델 호출 정책 설정 (call_policy.py)
+# deadline: 단계 제한 시간(초), hedge: 지연 시 같은 요청을 한 번 더 보낼지, hedge_after: p95 표본이 모이기 전 헤지 기준(초)
+CALL_POLICIES = {
+    "rephrase": {"deadline": 8.0, "hedge": True, "hedge_after": 2.0},
+    "filter_extraction": {"deadline": 10.0, "hedge": True, "hedge_after": 3.0},
+    "query_understanding": {"deadline": 12.0, "hedge": True, "hedge_after": 3.5},
+    "query_embedding": {"deadline": 5.0, "hedge": True, "hedge_after": 1.0},
+    "answer": {"deadline": 60.0, "hedge": False},  # 스트리밍 답변은 ChatOpenAI timeout만 적용
+}
+CALL_HEDGE_MIN_SAMPLES = 20  # 이만큼 성공 표본이 모이면 최근 p95를 헤지 기준으로 사용
+CALL_LATENCY_WINDOW = 500  # 단계별로 보관할 최근 지연시간 표본 수
+CIRCUIT_FAILURE_THRESHOLD = 5  # 연속 실패 시 서킷 열림
+CIRCUIT_RESET_SECONDS = 30  # 서킷이 열린 뒤 시험 호출까지 대기 시간
+CALL_POLICY_MAX_WORKERS = 32
+
+# 근사 중복(지역별 변형) 정책 묶음 설정 (near_duplicates.py)
+NEAR_DUP_COLLAPSE = True  # 검색 결과에서 같은 묶음의 변형은 하나만 남김
+NEAR_DUP_THRESHOLD = 0.8  # MinHash 추정 Jaccard 유사도가 이 이상이면 같은 묶음
+NEAR_DUP_NUM_PERM = 128  # MinHash 해시 함수 수
+NEAR_DUP_BANDS = 16  # LSH 밴드 수 (밴드당 NUM_PERM / BANDS행, 후보 기준 약 (1/16)^(1/8) = 0.71)
+NEAR_DUP_SHINGLE = 5  # 글자 shingle 길이
+
+# 지역 분할 컬렉션 설정 (partitions.py로 생성 후 활성화)
+PARTITIONED_SEARCH = False
+NATIONWIDE_SIDO_THRESHOLD = 10  # 이 개수 이상의 시/도에 걸친 정책은 '전국' 파티션에 저장
+
+# 축소 차원 2단계 벡터 검색 설정 (reduced_index.py로 생성 후 활성화)
+TWO_STAGE_SEARCH = False  # 앞 차원만 자른 임베딩으로 1차 검색 후 전체 차원으로 재계산 (파티션 검색이 아닐 때)
+REDUCED_DIMENSIONS = 256  # text-embedding-3-large 3072차원 중 앞에서부터 사용할 차원 수
+REDUCED_QUANTIZE = True  # 축소 차원 벡터를 int8로 저장 (행별 scale)
+TWO_STAGE_OVERSAMPLE = 4  # 1단계에서 k의 몇 배를 골라 전체 차원으로 다시 계산할지
+
+# 유사 정책 그래프 설정 (similarity_graph.py로 생성)
+SIMILARITY_GRAPH_TOP_N = 20  # 정책마다 저장할 최근접 이웃 수
+SIMILAR_FOLLOWUP = True  # "비슷한 정책 더" 후속 질문을 그래프로 바로 답변
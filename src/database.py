@@ -1,18 +1,94 @@
 # 후보 정책들 필터링
 
+import threading
+
 import mysql.connector
 from mysql.connector import Error
-from config import DB_CONNECTION_INFO
+from config import DB_CONNECTION_INFO, CANDIDATE_CACHE
+from region_loader import get_region_hierarchy
+from candidate_cache import get_candidate_cache
+
+# 현재 신청 가능한 정책 조건 (p = policies 별칭)
+# 인덱스를 탈 수 있도록 DATE(...)로 감싸지 않고, 미리 계산된 *_day 컬럼과 비교합니다.
+# (data/index migration script.sql 적용 필요)
+ACTIVE_POLICY_CONDITIONS = [
+    # 1. 신청 기간 필터
+    """(p.application_status = '상시' OR 
+         (p.application_status = '특정 기간' AND p.aply_start_day <= CURDATE() AND p.aply_end_day >= CURDATE()))""",
+    # 2. 사업 기간 필터
+    "(p.biz_end_day IS NULL OR p.biz_end_day >= CURDATE())",
+]
+
+# IN 목록 길이를 이 크기들로 맞춰(마지막 값 반복) 같은 prepared statement를 재사용합니다.
+IN_LIST_BUCKETS = (1, 4, 16, 64, 256, 1024)
+
+_local = threading.local()
+_region_code_cache = {}
+
 
 def get_db_connection():
     return mysql.connector.connect(**DB_CONNECTION_INFO)
 
+
+def get_thread_connection():
+    """
+    스레드마다 하나의 연결을 재사용합니다.
+    연결이 끊어졌으면 다시 연결하고, 해당 연결에 묶인 prepared cursor 캐시도 비웁니다.
+    """
+    connection = getattr(_local, 'connection', None)
+    if connection is None or not connection.is_connected():
+        connection = get_db_connection()
+        connection.autocommit = True
+        _local.connection = connection
+        _local.cursors = {}
+    return connection
+
+
+def _prepared_cursor(db_connection, query: str):
+    """
+    서버 측 prepared statement 커서를 (cursor, 사용 후 close 여부)로 반환합니다.
+    스레드 연결이면 쿼리 문자열별로 커서를 캐시하여 PREPARE를 한 번만 수행합니다.
+    """
+    if db_connection is getattr(_local, 'connection', None):
+        cursor = _local.cursors.get(query)
+        if cursor is None:
+            cursor = db_connection.cursor(prepared=True)
+            _local.cursors[query] = cursor
+        return cursor, False
+    return db_connection.cursor(prepared=True), True
+
+
+def pad_in_list(values: list) -> list:
+    """값 목록을 IN_LIST_BUCKETS 크기 중 하나로 맞춥니다. (IN 조건 결과는 변하지 않음)"""
+    for size in IN_LIST_BUCKETS:
+        if len(values) <= size:
+            return values + [values[-1]] * (size - len(values))
+    return values
+
+
+def clear_region_code_cache():
+    """region_codes 테이블을 다시 적재한 뒤 호출합니다. (지역 코드가 바뀌므로 후보 캐시도 비움)"""
+    _region_code_cache.clear()
+    get_candidate_cache().invalidate("region_codes 재적재")
+
+
 def _get_all_related_region_codes(cursor, region_names: list) -> list:
     """
     지역명 리스트를 받아 관련된 모든 지역 코드(시/도 및 하위 시/군/구)를 반환합니다.
     """
     if not region_names:
         return []
+    # region_codes는 정적 테이블이므로 같은 지역명 조합은 한 번만 조회합니다.
+    cache_key = tuple(sorted(region_names))
+    if cache_key in _region_code_cache:
+        return _region_code_cache[cache_key]
+
+    # region_loader.py가 만든 계층 파일이 있으면 DB 조회 없이 같은 규칙으로 매칭
+    hierarchy = get_region_hierarchy()
+    if hierarchy is not None:
+        _region_code_cache[cache_key] = hierarchy.codes_for(region_names)
+        return _region_code_cache[cache_key]
+
     all_codes = set()
     region_regex = '|'.join(region_names)
 
@@ -22,63 +98,72 @@ def _get_all_related_region_codes(cursor, region_names: list) -> list:
     for row in results:
         all_codes.add(row[0])
 
-    return list(all_codes)
+    _region_code_cache[cache_key] = sorted(all_codes)
+    return _region_code_cache[cache_key]
+
+
+def get_related_region_codes(region_names: list) -> list:
+    """스레드 연결로 지역명 리스트에 관련된 지역 코드를 조회합니다. (캐시 사용)"""
+    if not region_names:
+        return []
+    cursor = get_thread_connection().cursor()
+    try:
+        return _get_all_related_region_codes(cursor, region_names)
+    finally:
+        cursor.close()
 
 
 def get_rdb_candidate_ids(db_connection, filters: dict) -> list:
     """
     [최소 조건 버전] 기간과 지역 필터만을 사용하여 RDB에서 1차 후보군을 조회합니다.
+    지역 조건은 JOIN + DISTINCT 대신 EXISTS 세미 조인으로 걸어 정렬/중복 제거 없이 인덱스만 탑니다.
+    결과는 (오늘 날짜, 지역 코드 집합) 기준으로 캐시하고 policy_id 오름차순으로 반환합니다. (candidate_cache.py)
     """
     try:
-        cursor = db_connection.cursor()
+        region_cursor = db_connection.cursor()
+        try:
+            region_codes = _get_all_related_region_codes(region_cursor, filters.get("regions") or [])
+        finally:
+            region_cursor.close()
+    except Error as e:
+        print(f"Database error: {e}")
+        return []
 
-        base_query = "SELECT DISTINCT p.policy_id FROM policies p"
-        joins = set()
-        where_conditions = []
-        params = []
+    if not CANDIDATE_CACHE:
+        return sorted(_query_candidate_ids(db_connection, region_codes) or [])
+    return get_candidate_cache().get_or_load(region_codes, lambda: _query_candidate_ids(db_connection, region_codes))
 
-        # 1. 신청 기간 필터
-        application_date_condition = """
-        (p.application_status = '상시' OR 
-         (p.application_status = '특정 기간' AND CURDATE() BETWEEN DATE(p.aply_start_date) AND DATE(p.aply_end_date)))
-        """
-        where_conditions.append(application_date_condition.strip())
 
-        # 2. 사업 기간 필터
-        biz_date_condition = "(p.biz_end_date IS NULL OR CURDATE() <= DATE(p.biz_end_date))"
-        where_conditions.append(biz_date_condition)
+def _query_candidate_ids(db_connection, region_codes: list):
+    """후보 조회 SQL을 실행합니다. DB 오류면 None을 반환합니다. (캐시에 저장하지 않도록)"""
+    cursor = None
+    close_cursor = True
+    try:
+        where_conditions = list(ACTIVE_POLICY_CONDITIONS)
+        params = []
 
         # 3. 지역 필터
-        if filters.get("regions"):
-            region_codes = _get_all_related_region_codes(cursor, filters["regions"])
-            if region_codes:
-                joins.add("JOIN policy_regions pr ON p.policy_id = pr.policy_id")
-                placeholders = ', '.join(['%s'] * len(region_codes))
-                where_conditions.append(f"pr.region_code IN ({placeholders})")
-                params.extend(region_codes)
+        if region_codes:
+            padded_codes = pad_in_list(region_codes)
+            placeholders = ', '.join(['%s'] * len(padded_codes))
+            where_conditions.append(
+                "EXISTS (SELECT 1 FROM policy_regions pr "
+                f"WHERE pr.policy_id = p.policy_id AND pr.region_code IN ({placeholders}))"
+            )
+            params.extend(padded_codes)
 
         # 최종 쿼리 조립
-        final_query = base_query
-        if joins:
-            final_query += " " + " ".join(list(joins))
-        if where_conditions:
-            final_query += " WHERE (" + ") AND (".join(where_conditions) + ")"
-        final_query += ";"
-
-        # 디버깅을 위해 쿼리 템플릿과 파라미터를 별도로 출력
-        print("--- Generated SQL Query (Simplified) ---")
-        print(final_query)
-        print("\n--- SQL Parameters ---")
-        print(params)
+        final_query = "SELECT p.policy_id FROM policies p WHERE (" + ") AND (".join(where_conditions) + ")"
 
         # 쿼리 실행
+        cursor, close_cursor = _prepared_cursor(db_connection, final_query)
         cursor.execute(final_query, params)
         candidate_ids = [str(item[0]) for item in cursor.fetchall()]
         return candidate_ids
 
     except Error as e:
         print(f"Database error: {e}")
-        return []
+        return None
     finally:
-        if 'cursor' in locals() and cursor:
-            cursor.close()
\ No newline at end of file
+        if cursor is not None and close_cursor:
+            cursor.close()
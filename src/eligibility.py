@@ -0,0 +1,186 @@
+"""
+구조화 자격 요건 점수화 (LLM 호출 없는 재정렬 단계)
+
+create_filter_from_query가 추출한 age, income, job_status, education_levels,
+majors, specializations를 검색된 후보 문서의 metadata 코드와 비교하여,
+1) 명백히 자격이 안 되는 정책은 제거하고
+2) 사용자 조건과 구체적으로 맞는 정책을 앞으로 올린 뒤
+최종 k개만 format_docs로 넘깁니다.
+
+정책별 metadata 파싱 결과는 (plcyNo, lastMdfcnDt) 기준으로 캐시하므로, 재정렬 자체는 numpy 연산 몇 번으로 끝납니다.
+정책이 수정되면 lastMdfcnDt가 바뀌어 다시 파싱되고, 캐시는 ELIGIBILITY_PARSED_CACHE_SIZE개를 넘으면 오래된 것부터 버립니다.
+컬렉션 전환(index_lifecycle)이나 동기화 후 재적재(main.py /admin/reload) 시에는 clear_parsed_cache()로 비웁니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import ELIGIBILITY_PARSED_CACHE_SIZE
+from utils import normalize_code
+
+UNRESTRICTED_NAMES = {'제한없음', '관계없음', '무관'}
+
+# 필터 키 -> metadata 코드 컬럼 (코드 테이블 분류명과 같음)
+CODE_FIELDS = {
+    "job_status": "jobCd",
+    "education_levels": "schoolCd",
+    "majors": "plcyMajorCd",
+    "specializations": "sbizCd",
+}
+# 사용자가 조건을 말했는데 정책 요건과 겹치지 않으면 제외하는 항목
+# (특화 요건은 사용자가 말하지 않은 경우가 대부분이라 가산점으로만 사용)
+HARD_FIELDS = {"job_status", "education_levels", "majors"}
+
+_parsed_cache = OrderedDict()  # (plcyNo, lastMdfcnDt) -> 파싱 결과
+_parsed_cache_lock = threading.Lock()
+
+
+def clear_parsed_cache(reason: str = ""):
+    """정책 metadata 파싱 캐시를 비웁니다."""
+    with _parsed_cache_lock:
+        size = len(_parsed_cache)
+        _parsed_cache.clear()
+    print(f"--- [자격 요건] 파싱 캐시 비움 ({size}개){f': {reason}' if reason else ''} ---")
+
+
+def _to_number(value) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return number if number > 0 else np.nan
+
+
+def _filter_number(value):
+    """추출된 필터의 숫자 값("25" 같은 문자열 포함)을 float로 바꿉니다. 바꿀 수 없으면 None (조건 무시)"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(number) else number
+
+
+def _filter_names(value) -> list:
+    """추출된 필터의 코드명 값을 리스트로 맞춥니다. (문자열 하나가 글자 단위로 순회되지 않도록)"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    try:
+        return [v for v in value if isinstance(v, str)]
+    except TypeError:
+        return []
+
+
+def _parse_metadata(meta: dict, code_map: dict) -> dict:
+    """정책 metadata를 비교 가능한 형태(숫자 구간, 코드명 집합)로 한 번만 변환합니다."""
+    policy_id = meta.get('plcyNo')
+    cache_key = (policy_id, meta.get('lastMdfcnDt'))
+    with _parsed_cache_lock:
+        if cache_key in _parsed_cache:
+            _parsed_cache.move_to_end(cache_key)
+            return _parsed_cache[cache_key]
+
+    age_limited = meta.get('sprtTrgtAgeLmtYn') == 'Y'
+    parsed = {
+        "min_age": _to_number(meta.get('sprtTrgtMinAge')) if age_limited else np.nan,
+        "max_age": _to_number(meta.get('sprtTrgtMaxAge')) if age_limited else np.nan,
+        "min_income": _to_number(meta.get('earnMinAmt')),
+        "max_income": _to_number(meta.get('earnMaxAmt')),
+    }
+    for field, category in CODE_FIELDS.items():
+        codes = meta.get(category)
+        names = set()
+        if isinstance(codes, str):
+            for code in codes.split(','):
+                name = code_map.get(category, {}).get(normalize_code(code)) if code.strip() else None
+                if name:
+                    names.add(name)
+        # 요건이 없거나 '제한없음'이 포함되면 제한 없음으로 처리
+        parsed[field] = frozenset() if names & UNRESTRICTED_NAMES else frozenset(names)
+
+    if policy_id:
+        with _parsed_cache_lock:
+            _parsed_cache[cache_key] = parsed
+            while len(_parsed_cache) > ELIGIBILITY_PARSED_CACHE_SIZE:
+                _parsed_cache.popitem(last=False)
+    return parsed
+
+
+def score_eligibility(docs: list, filters: dict, code_map: dict):
+    """
+    후보 문서 묶음에 대해 (자격 충족 여부 배열, 일치 점수 배열)을 반환합니다.
+    - 자격: 나이 구간, 학력/취업상태/전공 요건 중 하나라도 명백히 불충족이면 False
+    - 점수: 사용자 조건과 구체적으로 일치한 요건 수 (소득 구간, 특화 요건 포함)
+    """
+    parsed = [_parse_metadata(doc.metadata, code_map) for doc in docs]
+    n = len(parsed)
+    eligible = np.ones(n, dtype=bool)
+    score = np.zeros(n, dtype=np.float32)
+
+    # 1. 나이 (구간 밖이면 제외, 구간 안이면 가산)
+    age = _filter_number(filters.get("age"))
+    if age is not None:
+        low = np.array([p["min_age"] for p in parsed], dtype=np.float32)
+        high = np.array([p["max_age"] for p in parsed], dtype=np.float32)
+        limited = ~np.isnan(low) | ~np.isnan(high)
+        in_range = (np.isnan(low) | (age >= low)) & (np.isnan(high) | (age <= high))
+        eligible &= in_range
+        score += (limited & in_range).astype(np.float32)
+
+    # 2. 소득 (단위가 질문마다 달라 제외 기준으로는 쓰지 않고 가산점만 부여)
+    income = _filter_number(filters.get("income"))
+    if income is not None:
+        low = np.array([p["min_income"] for p in parsed], dtype=np.float32)
+        high = np.array([p["max_income"] for p in parsed], dtype=np.float32)
+        limited = ~np.isnan(low) | ~np.isnan(high)
+        in_range = (np.isnan(low) | (income >= low)) & (np.isnan(high) | (income <= high))
+        score += 0.5 * (limited & in_range).astype(np.float32)
+
+    # 3. 코드 요건: (후보 x 사용자 조건) 불리언 행렬로 교집합 여부 계산
+    for field in CODE_FIELDS:
+        wanted = [v for v in _filter_names(filters.get(field)) if v not in UNRESTRICTED_NAMES]
+        if not wanted:
+            continue
+        vocab = {name: j for j, name in enumerate(wanted)}
+        matrix = np.zeros((n, len(vocab)), dtype=np.float32)
+        restricted = np.zeros(n, dtype=bool)
+        for i, p in enumerate(parsed):
+            restricted[i] = bool(p[field])
+            for name in p[field]:
+                j = vocab.get(name)
+                if j is not None:
+                    matrix[i, j] = 1.0
+        overlap = matrix.any(axis=1)
+        if field in HARD_FIELDS:
+            eligible &= ~restricted | overlap
+        score += (restricted & overlap).astype(np.float32)
+
+    return eligible, score
+
+
+def rerank_by_eligibility(docs: list, filters: dict, code_map: dict, k: int = 5) -> list:
+    """
+    자격 미충족 문서를 제거하고 (일치 점수 내림차순, 기존 검색 순위 오름차순)으로 정렬해 k개를 반환합니다.
+    모든 문서가 제외되면 기존 검색 결과 상위 k개를 그대로 돌려줍니다.
+    """
+    if not docs:
+        return docs
+    started = time.perf_counter()
+    eligible, score = score_eligibility(docs, filters or {}, code_map)
+
+    if not eligible.any():
+        print(f"--- Eligibility Rerank: 자격 충족 문서 없음, 검색 순위 유지 ({len(docs)}건) ---")
+        return docs[:k]
+
+    rows = np.flatnonzero(eligible)
+    # lexsort는 마지막 키가 1순위: 점수 내림차순 -> 기존 순위 오름차순
+    order = rows[np.lexsort((rows, -score[rows]))][:k]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"--- Eligibility Rerank: {len(docs)}건 중 {int(eligible.sum())}건 통과 -> {len(order)}건 사용 "
+          f"({elapsed_ms:.3f}ms) ---")
+    return [docs[i] for i in order]
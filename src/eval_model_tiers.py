@@ -0,0 +1,320 @@
+"""
+단계별 모델 등급 평가 스크립트 (라벨 데이터 재생)
+
+data/eval_queries.json의 라벨 질문을 모델 등급(config.MODEL_TIERS)마다 단계별로 실행해
+품질과 지연시간을 비교합니다. 결과를 보고 config.STAGE_MODEL_TIERS를 조정합니다.
+
+- filter_extraction: 기대 독립 질문(reference)으로 필터 추출 프롬프트를 OpenAI 클라이언트로 직접 호출해
+  (운영 경로의 call_policy 제한 시간/헤지/폴백을 거치지 않으므로, 빈 필터 폴백이 품질로 섞이지 않음)
+  * exact_match: 스키마 전체 필드가 라벨과 같은 비율 (리스트는 순서 무시, 빈 값은 null/[]로 통일)
+  * hard_match: SQL 후보 조회/자격 요건 재정렬에 쓰는 필드(age, income, regions, job_status,
+    marriage_status, education_levels)만 같은 비율
+  * field_accuracy: 필드별 일치 비율
+- rephrase: 대화 기록 + 질문으로 TEMPLATE_WITH_HISTORY_FOR_R를 실행해
+  * fidelity = 0.5 * 필수 조건어(must_include) 포함 비율 + 0.5 * 기대 질문과의 글자 bigram F1
+- query_understanding: 대화 기록 + 질문으로 understand_query와 같은 요청(QUERY_UNDERSTANDING_SYSTEM_PROMPT)을
+  call_policy 없이 보내고 같은 파서(parse_understanding)로 정리해
+  * standalone_question은 rephrase와 같은 fidelity, filters는 filter_extraction과 같은 exact/hard/field 점수
+  (QUERY_UNDERSTANDING_SINGLE_CALL이 켜져 있으면 운영에서 실제로 실행되는 단계)
+- 단계별 p50/p95 지연시간 (완료된 호출만), 제한 시간(--timeout) 초과 건수/비율은 품질과 따로 집계
+
+사용법:
+    python eval_model_tiers.py --tiers standard fast --repeat 3 --output ../data/eval_results.json
+    python eval_model_tiers.py --tiers fast --timeout 2.0   # 운영 제한 시간 기준으로 초과 비율 확인
+    python eval_model_tiers.py --stages query_understanding --tiers standard fast
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from config import MODEL_TIERS, OPENAI_TEMPERATURE, EVAL_QUERY_FILE
+
+EVAL_TIMEOUT = 60.0  # 평가 호출 제한 시간(초). 운영 제한 시간과 별개로 모델 자체 품질/지연시간을 보기 위해 넉넉히 둠
+
+FILTER_FIELDS = ("age", "income", "regions", "job_status", "marriage_status", "education_levels", "majors",
+                 "categories", "subcategories", "specializations", "keywords")
+HARD_FILTER_FIELDS = ("age", "income", "regions", "job_status", "marriage_status", "education_levels")
+LIST_FIELDS = {"regions", "job_status", "education_levels", "majors", "categories", "subcategories",
+               "specializations", "keywords"}
+
+
+def load_eval_cases(path: str = EVAL_QUERY_FILE) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+
+def normalize_filters(filters: dict) -> dict:
+    """비교용으로 필터를 정규화합니다. (리스트는 정렬된 튜플, 빈 값은 None/빈 튜플, 정수형 실수는 int)"""
+    normalized = {}
+    for field in FILTER_FIELDS:
+        value = (filters or {}).get(field)
+        if field in LIST_FIELDS:
+            if isinstance(value, str):
+                value = [value]
+            normalized[field] = tuple(sorted({str(v).strip() for v in value or [] if str(v).strip()}))
+        elif value in ("", [], None):
+            normalized[field] = None
+        elif isinstance(value, (int, float)) and float(value).is_integer():
+            normalized[field] = int(value)
+        else:
+            normalized[field] = value
+    return normalized
+
+
+def score_filters(predicted: dict, expected: dict) -> dict:
+    predicted, expected = normalize_filters(predicted), normalize_filters(expected)
+    fields = {field: predicted[field] == expected[field] for field in FILTER_FIELDS}
+    return {
+        "exact_match": all(fields.values()),
+        "hard_match": all(fields[field] for field in HARD_FILTER_FIELDS),
+        "fields": fields,
+    }
+
+
+def _bigrams(text: str) -> dict:
+    compact = "".join(str(text).split())
+    counts = {}
+    for i in range(len(compact) - 1):
+        counts[compact[i:i + 2]] = counts.get(compact[i:i + 2], 0) + 1
+    return counts
+
+
+def bigram_f1(predicted: str, reference: str) -> float:
+    predicted_counts, reference_counts = _bigrams(predicted), _bigrams(reference)
+    overlap = sum(min(count, reference_counts.get(gram, 0)) for gram, count in predicted_counts.items())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(predicted_counts.values())
+    recall = overlap / sum(reference_counts.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def score_rephrase(predicted: str, case: dict) -> float:
+    required = case.get("must_include") or []
+    compact = "".join(str(predicted).split())
+    keyword_recall = sum(term in compact for term in required) / len(required) if required else 1.0
+    return 0.5 * keyword_recall + 0.5 * bigram_f1(predicted, case["reference"])
+
+
+def _history_messages(case: dict) -> list:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    return [HumanMessage(content=text) if role == "human" else AIMessage(content=text)
+            for role, text in case.get("history", [])]
+
+
+def _latency_summary(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {"p50_ms": round(p50 * 1000), "p95_ms": round(p95 * 1000)}
+
+
+def extract_filters_raw(client, model: str, question: str, timeout: float) -> dict:
+    """call_policy 없이 필터 추출 프롬프트를 한 번 호출하고, 운영 경로와 같이 허용 값으로 정규화합니다."""
+    from prompts import FILTER_EXTRACTION_SYSTEM_PROMPT
+    from filter_validation import validate_filters
+
+    response = client.chat.completions.create(
+        model=model,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": FILTER_EXTRACTION_SYSTEM_PROMPT},
+            {"role": "user", "content": question}
+        ],
+        timeout=timeout
+    )
+    try:
+        return validate_filters(json.loads(response.choices[0].message.content))
+    except (TypeError, ValueError):
+        return {}
+
+
+def evaluate_filter_extraction(client, model: str, cases: list, repeat: int, timeout: float = EVAL_TIMEOUT) -> dict:
+    from openai import APITimeoutError
+
+    latencies, scores, failures, timeouts, errors = [], [], [], [], []
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            try:
+                predicted = extract_filters_raw(client, model, case["reference"], timeout)
+            except APITimeoutError:
+                timeouts.append(case["id"])
+                continue
+            except Exception as e:
+                errors.append({"id": case["id"], "error": str(e)})
+                continue
+            latencies.append(time.perf_counter() - started)
+            score = score_filters(predicted, case["filters"])
+            scores.append(score)
+            if not score["hard_match"]:
+                failures.append({"id": case["id"], "predicted": predicted})
+
+    # 품질은 응답을 받은 호출만으로 계산하고, 제한 시간 초과/오류는 따로 보고
+    return {
+        "completed": len(scores),
+        "timeouts": len(timeouts),
+        "timeout_rate": round(len(timeouts) / max(len(cases) * repeat, 1), 3),
+        "errors": errors[:10],
+        "exact_match": round(float(np.mean([s["exact_match"] for s in scores])), 3) if scores else None,
+        "hard_match": round(float(np.mean([s["hard_match"] for s in scores])), 3) if scores else None,
+        "field_accuracy": {field: round(float(np.mean([s["fields"][field] for s in scores])), 3)
+                           for field in FILTER_FIELDS} if scores else {},
+        "latency": _latency_summary(latencies),
+        "hard_mismatches": failures[:10],
+    }
+
+
+def evaluate_rephrase(model: str, cases: list, repeat: int, timeout: float = EVAL_TIMEOUT) -> dict:
+    from openai import APITimeoutError
+    from langchain_openai import ChatOpenAI
+    from langchain_core.output_parsers import StrOutputParser
+    from prompts import TEMPLATE_WITH_HISTORY_FOR_R
+
+    chain = TEMPLATE_WITH_HISTORY_FOR_R | ChatOpenAI(model=model, temperature=OPENAI_TEMPERATURE, timeout=timeout,
+                                                     max_retries=0) | StrOutputParser()
+    latencies, fidelities, samples, timeouts = [], [], [], 0
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            try:
+                predicted = chain.invoke({"chat_history": _history_messages(case), "question": case["question"]})
+            except APITimeoutError:
+                timeouts += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            fidelities.append(score_rephrase(predicted, case))
+            if case.get("history"):
+                samples.append({"id": case["id"], "rephrased": predicted})
+
+    return {
+        "completed": len(fidelities),
+        "timeouts": timeouts,
+        "timeout_rate": round(timeouts / max(len(cases) * repeat, 1), 3),
+        "fidelity": round(float(np.mean(fidelities)), 3) if fidelities else None,
+        "latency": _latency_summary(latencies),
+        "samples": samples[:10],
+    }
+
+
+def understand_query_raw(client, model: str, chat_history: list, question: str, timeout: float) -> dict:
+    """call_policy 없이 understand_query와 같은 메시지로 한 번 호출하고, 같은 파서로 독립 질문/필터를 정리합니다."""
+    from prompts import QUERY_UNDERSTANDING_SYSTEM_PROMPT
+    from query_understanding import history_to_openai_messages, parse_understanding
+
+    response = client.chat.completions.create(
+        model=model,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": QUERY_UNDERSTANDING_SYSTEM_PROMPT},
+            *history_to_openai_messages(chat_history),
+            {"role": "user", "content": question},
+        ],
+        timeout=timeout
+    )
+    return parse_understanding(response.choices[0].message.content, question)
+
+
+def evaluate_query_understanding(client, model: str, cases: list, repeat: int, timeout: float = EVAL_TIMEOUT) -> dict:
+    from openai import APITimeoutError
+
+    latencies, fidelities, scores, samples, failures, timeouts, errors = [], [], [], [], [], [], []
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            try:
+                predicted = understand_query_raw(client, model, _history_messages(case), case["question"], timeout)
+            except APITimeoutError:
+                timeouts.append(case["id"])
+                continue
+            except Exception as e:
+                errors.append({"id": case["id"], "error": str(e)})
+                continue
+            latencies.append(time.perf_counter() - started)
+            fidelities.append(score_rephrase(predicted["standalone_question"], case))
+            score = score_filters(predicted["filters"], case["filters"])
+            scores.append(score)
+            if case.get("history"):
+                samples.append({"id": case["id"], "rephrased": predicted["standalone_question"]})
+            if not score["hard_match"]:
+                failures.append({"id": case["id"], "predicted": predicted["filters"]})
+
+    return {
+        "completed": len(scores),
+        "timeouts": len(timeouts),
+        "timeout_rate": round(len(timeouts) / max(len(cases) * repeat, 1), 3),
+        "errors": errors[:10],
+        "fidelity": round(float(np.mean(fidelities)), 3) if fidelities else None,
+        "exact_match": round(float(np.mean([s["exact_match"] for s in scores])), 3) if scores else None,
+        "hard_match": round(float(np.mean([s["hard_match"] for s in scores])), 3) if scores else None,
+        "field_accuracy": {field: round(float(np.mean([s["fields"][field] for s in scores])), 3)
+                           for field in FILTER_FIELDS} if scores else {},
+        "latency": _latency_summary(latencies),
+        "samples": samples[:10],
+        "hard_mismatches": failures[:10],
+    }
+
+
+def run_evaluation(tiers: list, stages: list, repeat: int = 1, path: str = EVAL_QUERY_FILE,
+                   timeout: float = EVAL_TIMEOUT) -> dict:
+    from openai import OpenAI
+
+    load_dotenv()
+    client = OpenAI()
+    cases = load_eval_cases(path)
+    results = {}
+    for tier in tiers:
+        model = MODEL_TIERS[tier]
+        results[tier] = {"model": model}
+        if "filter_extraction" in stages:
+            results[tier]["filter_extraction"] = evaluate_filter_extraction(client, model, cases, repeat, timeout)
+        if "rephrase" in stages:
+            results[tier]["rephrase"] = evaluate_rephrase(model, cases, repeat, timeout)
+        if "query_understanding" in stages:
+            results[tier]["query_understanding"] = evaluate_query_understanding(client, model, cases, repeat, timeout)
+    return results
+
+
+def print_report(results: dict):
+    print(f"\n{'tier':<10} {'model':<14} {'stage':<20} {'quality':<34} {'p50':>7} {'p95':>7} {'timeouts':>9}")
+    for tier, result in results.items():
+        for stage in ("filter_extraction", "rephrase", "query_understanding"):
+            if stage not in result:
+                continue
+            stage_result = result[stage]
+            if not stage_result["completed"]:
+                quality = "응답 없음"
+            elif stage == "filter_extraction":
+                quality = f"exact {stage_result['exact_match']:.2f} / hard {stage_result['hard_match']:.2f}"
+            elif stage == "query_understanding":
+                quality = (f"fid {stage_result['fidelity']:.2f} / exact {stage_result['exact_match']:.2f}"
+                           f" / hard {stage_result['hard_match']:.2f}")
+            else:
+                quality = f"fidelity {stage_result['fidelity']:.2f}"
+            timeouts = f"{stage_result['timeouts']} ({stage_result['timeout_rate']:.0%})"
+            latency = stage_result["latency"]
+            print(f"{tier:<10} {result['model']:<14} {stage:<20} {quality:<34} "
+                  f"{latency.get('p50_ms', 0):>5}ms {latency.get('p95_ms', 0):>5}ms {timeouts:>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tiers", nargs="+", default=list(MODEL_TIERS))
+    parser.add_argument("--stages", nargs="+", default=["filter_extraction", "rephrase", "query_understanding"],
+                        choices=["filter_extraction", "rephrase", "query_understanding"])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--queries", default=EVAL_QUERY_FILE)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--timeout", type=float, default=EVAL_TIMEOUT, help="평가 호출 제한 시간(초)")
+    args = parser.parse_args()
+
+    results = run_evaluation(args.tiers, args.stages, args.repeat, args.queries, args.timeout)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 평가 결과 저장: {args.output}")
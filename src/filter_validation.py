@@ -0,0 +1,164 @@
+"""
+추출된 필터 검증/정규화 (API 호출 없음)
+
+모델이 돌려준 필터 JSON을 스키마(prompts.FILTER_JSON_SCHEMA)와 허용 값(prompts.FILTER_ALLOWED_VALUE_LISTS)에 맞춥니다.
+- 허용 값 필드: 정확히 일치 -> 그대로, 공백/구두점만 다름 -> 허용 값으로, 동의어 -> 매핑,
+  허용 값/동의어를 포함하는 표현("대학원 졸업" -> 대학원) -> 가장 긴 것, 비슷한 값(difflib) -> 가장 가까운 값, 그 외 -> 버림
+- age / income: 숫자 하나로 변환 (구간 "25~29세", 단위 "3천만원"처럼 하나로 정할 수 없으면 null)
+- regions: 문자열 리스트로만 정리 (지역명 정규화는 DB 지역 코드 조회가 담당)
+- 스키마에 없는 필드는 버리고, 없는 필드는 null / []로 채웁니다.
+고친 내용은 "--- [Filter Validation] ... ---"로 출력합니다.
+
+사용법:
+    from filter_validation import validate_filters
+    filters = validate_filters(raw_filters)
+"""
+import difflib
+import re
+
+from prompts import FILTER_ALLOWED_VALUE_LISTS
+
+# 허용 값은 프롬프트와 같은 목록을 사용 (prompts.FILTER_ALLOWED_VALUE_LISTS)
+ALLOWED_FILTER_VALUES = FILTER_ALLOWED_VALUE_LISTS
+
+# 모델이 허용 값 대신 자주 내놓는 표현 -> 허용 값
+FILTER_VALUE_SYNONYMS = {
+    "job_status": {"미취업": "미취업자", "실업자": "미취업자", "구직자": "미취업자", "취준생": "미취업자",
+                   "취업준비생": "미취업자", "무직": "미취업자", "직장인": "재직자", "회사원": "재직자",
+                   "근로자": "재직자", "창업자": "(예비)창업자", "예비창업자": "(예비)창업자", "창업": "(예비)창업자",
+                   "사업자": "자영업자", "자영업": "자영업자", "일용직": "일용근로자", "단기근로": "단기근로자",
+                   "아르바이트": "단기근로자", "농업인": "영농종사자"},
+    "marriage_status": {"결혼": "기혼", "신혼": "기혼", "신혼부부": "기혼", "배우자있음": "기혼", "비혼": "미혼",
+                        "싱글": "미혼"},
+    "education_levels": {"고졸": "고교 졸업", "고등학교졸업": "고교 졸업", "고등학생": "고교 재학",
+                         "고등학교재학": "고교 재학", "대학생": "대학 재학", "대학교재학": "대학 재학",
+                         "대졸": "대학 졸업", "대학교졸업": "대학 졸업", "석사": "석·박사", "박사": "석·박사",
+                         "대학원": "석·박사", "대학원생": "석·박사", "석박사": "석·박사", "중졸": "고졸 미만"},
+    "majors": {"인문": "인문계열", "사회": "사회계열", "경영": "상경계열", "경제": "상경계열", "상경": "상경계열",
+               "이학": "이학계열", "자연계열": "이학계열", "공학": "공학계열", "이공계": "공학계열",
+               "예체능": "예체능계열", "농업": "농산업계열"},
+    "categories": {"취업": "일자리", "창업": "일자리", "주택": "주거", "복지": "복지문화", "문화": "복지문화",
+                   "참여": "참여권리"},
+    "subcategories": {"주거지원": "주택 및 거주지", "월세": "전월세 및 주거급여 지원", "전세": "전월세 및 주거급여 지원",
+                      "전월세": "전월세 및 주거급여 지원", "장학금": "교육비지원", "금융지원": "취약계층 및 금융지원"},
+    "specializations": {"중소기업재직자": "중소기업", "기초수급자": "기초생활수급자", "수급자": "기초생활수급자",
+                        "한부모": "한부모가정", "농업": "농업인", "군장병": "군인", "장병": "군인"},
+    "keywords": {"지원금": "보조금", "장려금": "보조금", "보조": "보조금", "저금리": "금리혜택", "이자지원": "금리혜택",
+                 "상담": "맞춤형상담서비스", "인턴십": "인턴", "임대주택": "공공임대주택", "해외취업": "해외진출"},
+}
+
+NUMBER_FIELDS = ("age", "income")
+SINGLE_VALUE_FIELDS = ("marriage_status",)
+LIST_FIELDS = ("regions", "job_status", "education_levels", "majors", "categories", "subcategories",
+               "specializations", "keywords")
+SIMILARITY_CUTOFF = 0.8
+CONTAINED_KEY_MIN_LENGTH = 3  # 포함 여부로 매핑할 허용 값/동의어의 최소 길이 (짧은 말은 우연히 포함되기 쉬움)
+
+_PUNCTUATION = re.compile(r"[\s·.,()\[\]/_-]+")
+
+
+def _compact(value: str) -> str:
+    return _PUNCTUATION.sub("", str(value))
+
+
+# 필드별 (압축 문자열 -> 허용 값) 조회표
+_LOOKUP = {
+    field: {**{_compact(v): v for v in allowed},
+            **{_compact(k): v for k, v in FILTER_VALUE_SYNONYMS.get(field, {}).items()}}
+    for field, allowed in ALLOWED_FILTER_VALUES.items()
+}
+
+
+def normalize_enum_value(field: str, value):
+    """
+    허용 값 필드의 값 하나를 허용 값으로 바꿉니다. 바꿀 수 없으면 None을 반환합니다.
+    (정확히 일치 -> 공백/구두점 무시 일치 + 동의어 -> 비슷한 값 순서)
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value in ALLOWED_FILTER_VALUES[field]:
+        return value
+    lookup = _LOOKUP[field]
+    compact = _compact(value)
+    if compact in lookup:
+        return lookup[compact]
+    # 글자 유사도는 "대학원졸업"을 "대학졸업"에 붙이므로, 알려진 표현을 포함하면 그쪽을 먼저 사용
+    contained = [key for key in lookup if len(key) >= CONTAINED_KEY_MIN_LENGTH and key in compact]
+    if contained:
+        return lookup[max(contained, key=len)]
+    matches = difflib.get_close_matches(compact, list(lookup), n=1, cutoff=SIMILARITY_CUTOFF)
+    return lookup[matches[0]] if matches else None
+
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_THOUSANDS_SEPARATOR = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+# 숫자만 남기면 값이 달라지는 단위 ("3천만원" -> 3)
+_NUMBER_UNITS = re.compile(r"\d\s*[십백천만억]")  # "만 25세"의 '만'은 단위가 아님
+
+
+def _to_number(value):
+    """
+    숫자 하나로 바꿉니다. 문자열에 숫자가 여러 개("25~29세")이거나
+    한글 단위("3천만원")가 있으면 하나의 값으로 정할 수 없으므로 None을 반환합니다.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if float(value).is_integer() else value
+    text = _THOUSANDS_SEPARATOR.sub("", str(value))
+    numbers = _NUMBER.findall(text)
+    if len(numbers) != 1 or _NUMBER_UNITS.search(text):
+        return None
+    number = float(numbers[0])
+    return int(number) if number.is_integer() else number
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [v for v in value if v is not None and str(v).strip()]
+    return [value] if str(value).strip() else []
+
+
+def validate_filters(filters, log: bool = True) -> dict:
+    """
+    필터 dict를 스키마와 허용 값에 맞게 정규화한 새 dict를 반환합니다.
+    dict가 아니면 빈 필터(모든 필드 null / [])를 반환합니다.
+    """
+    filters = filters if isinstance(filters, dict) else {}
+    corrections = []
+    result = {}
+
+    for field in NUMBER_FIELDS:
+        value = _to_number(filters.get(field))
+        if value != filters.get(field):
+            corrections.append(f"{field}: {filters.get(field)!r} -> {value!r}")
+        result[field] = value
+
+    for field in SINGLE_VALUE_FIELDS:
+        raw = filters.get(field)
+        if isinstance(raw, (list, tuple)):
+            raw = raw[0] if raw else None
+        value = normalize_enum_value(field, raw) if raw not in (None, "") else None
+        if value != filters.get(field):
+            corrections.append(f"{field}: {filters.get(field)!r} -> {value!r}")
+        result[field] = value
+
+    for field in LIST_FIELDS:
+        values = []
+        for raw in _as_list(filters.get(field)):
+            value = str(raw).strip() if field == "regions" else normalize_enum_value(field, raw)
+            if value != raw:
+                corrections.append(f"{field}: {raw!r} -> {value!r}")
+            if value is not None and value not in values:
+                values.append(value)
+        result[field] = values
+
+    dropped = [field for field in filters if field not in result]
+    if dropped:
+        corrections.append(f"스키마 밖 필드 제거: {dropped}")
+    if log and corrections:
+        print(f"--- [Filter Validation] {'; '.join(corrections)} ---")
+    return result
@@ -0,0 +1,121 @@
+"""
+직전 검색 결과를 그대로 쓰는 후속 질문 판별 (규칙 기반)
+
+추천을 받은 직후의 "신청 방법은?", "두 번째 정책 자격요건 알려줘" 같은 질문은
+답이 직전에 가져온 문서 안에 있으므로, 필터 추출/SQL/벡터 검색을 다시 할 필요가 없습니다.
+
+판별 순서 (직전 답변을 가리키는 질문만 후속 질문으로 봄)
+1. 새 검색 의도("다른 정책", "말고", "추천해줘", "비슷한" 등)나 새 지역이 있으면 후속 질문이 아님
+2. 순서 지칭("두 번째", "2번") -> 직전 답변에 언급된 순서의 해당 문서
+3. 정책명 언급 -> 이름이 포함된 문서
+4. 지시어("그거", "이 정책", "위 정책") -> 직전 문서 전체
+5. 가리키는 말 없이 세부 항목만 묻는 질문("신청 방법은?", "자격 요건 알려줘") -> 직전 문서 전체
+   단, 세부 항목/어미를 빼고 남는 말이 있으면("여성 대상 정책 있어?", "25살인데 받을 수 있는 혜택은?")
+   새 대상/조건을 담은 질문이므로 다시 검색
+"""
+import re
+
+_NEW_SEARCH_PATTERN = re.compile(
+    r"다른\s*정책|다른\s*거|말고|그\s*외|외에|새로운|추천해|추천 해|찾아|검색|비슷한|유사한|더\s*(알려|보여|있)"
+)
+# 지역이 새로 언급되면 후보군 자체가 달라지므로 다시 검색
+_REGION_PATTERN = re.compile(
+    r"서울|부산|대구|인천|광주|대전|울산|세종|경기|강원|충북|충남|충청|전북|전남|전라|경북|경남|경상|제주|"
+    r"[가-힣]{1,4}(특별시|광역시|특별자치시|특별자치도)|"
+    r"[가-힣]{1,3}(?<!누)(?<!연)(?<!요)(?<!가)(시|군|구)(?=\s|$|에|의|는|은)"
+)
+# 새 대상/조건 (나이, 학업/취업 상태, 가구/계층). 이런 말이 있으면 후보군이 달라짐
+_CONDITION_PATTERN = re.compile(
+    r"\d+\s*(살|세)|만\s*\d+|[1-9]0\s*대|대학생|대학원생|고등학생|청소년|취준생|취업\s*준비|구직자|재직자|직장인|"
+    r"미취업|자영업|프리랜서|여성|남성|신혼|임산부|한부모|장애인|저소득|기초\s*생활|차상위|군인|전역|제대"
+)
+_DEMONSTRATIVE_PATTERN = re.compile(
+    r"그거|그것|이거|이것|저거|위의|방금|거기|"
+    r"(?<![가-힣])(이|그|저|위|해당)\s*(정책|사업|제도|지원금|지원\s*사업|프로그램|내용|중)"
+)
+_DETAIL_PATTERN = re.compile(
+    r"신청\s*방법|신청\s*방식|신청\s*기간|신청하|신청|어떻게|자격\s*요건|자격|요건|조건|대상|지원\s*내용|혜택|"
+    r"지원\s*금액|금액|얼마|기간|언제|마감|필요\s*서류|서류|제출|문의처|문의|연락처|전화번호|전화|링크|사이트|홈페이지|"
+    r"주소|url|URL|나이|소득"
+)
+# 세부 항목을 빼고 남는 말 중 질문 어미/조사로 보는 것 (이것까지 빼고 남는 말이 있으면 새 조건으로 봄)
+_FILLER_PATTERN = re.compile(
+    r"알려\s*주세요|알려\s*줘|알려\s*줄래|알려|가르쳐\s*줘|말해\s*줘|뭐예요|뭐에요|뭔가요|뭐야|뭐지|뭐|무엇인가요|무엇|"
+    r"어떻게\s*돼요?|어떻게\s*되나요|되나요|돼요|돼|받을\s*수\s*있|할\s*수\s*있|있나요|있어요|있어|있는|있|"
+    r"해야\s*돼|해야\s*하나요|해야|하나요|해요|해|인가요|이에요|예요|이야|야|요|은|는|이|가|을|를|도|에|좀|및|랑|하고|"
+    r"정책|[?？!.,~]"
+)
+_ORDINAL_WORDS = {"첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+_ORDINAL_PATTERN = re.compile(r"(첫|두|세|네|다섯|여섯|일곱|여덟|아홉|열)\s*번\s*째|(\d+)\s*번(?!\s*째)|(\d+)\s*번\s*째")
+_LAST_PATTERN = re.compile(r"마지막")
+
+
+
+def _compact(text) -> str:
+    return re.sub(r"\s+", "", str(text or ""))
+
+
+def mentions_new_condition(question: str) -> bool:
+    """새 지역이나 새 대상/조건(나이, 학업/취업 상태 등)을 말하는 질문인지 판별합니다."""
+    question = str(question)
+    return bool(_REGION_PATTERN.search(question) or _CONDITION_PATTERN.search(question))
+
+
+def _is_detail_only(question: str) -> bool:
+    """세부 항목(신청 방법, 자격, 기간 ...)과 질문 어미만으로 이루어진 질문인지 판별합니다."""
+    if not _DETAIL_PATTERN.search(question):
+        return False
+    residual = _FILLER_PATTERN.sub("", _DETAIL_PATTERN.sub("", question))
+    return not _compact(residual)
+
+
+def order_by_mention(documents: list, answer_text: str) -> list:
+    """직전 답변에서 정책명이 처음 등장한 순서대로 문서를 정렬합니다. 언급되지 않은 문서는 뒤에 원래 순서로 둡니다."""
+    answer = _compact(answer_text)
+    positions = []
+    for i, doc in enumerate(documents):
+        position = answer.find(_compact(doc.metadata.get('plcyNm'))) if doc.metadata.get('plcyNm') else -1
+        positions.append((position if position >= 0 else len(answer) + i, i))
+    return [documents[i] for _, i in sorted(positions)]
+
+
+def _ordinal_indexes(question: str, count: int) -> list:
+    indexes = []
+    for word, number, numbered in _ORDINAL_PATTERN.findall(question):
+        position = _ORDINAL_WORDS.get(word) or int(number or numbered)
+        if 1 <= position <= count:
+            indexes.append(position - 1)
+    if _LAST_PATTERN.search(question) and count:
+        indexes.append(count - 1)
+    return sorted(set(indexes))
+
+
+def classify_followup(question: str, documents: list, answer_text: str = "") -> tuple:
+    """
+    직전 문서를 그대로 쓸 수 있는 후속 질문인지 판별합니다.
+
+    Returns:
+        (판별 근거, 사용할 Document 리스트). 후속 질문이 아니면 (None, [])
+    """
+    if not documents:
+        return None, []
+    question = str(question)
+    if _NEW_SEARCH_PATTERN.search(question) or _REGION_PATTERN.search(question):
+        return None, []
+
+    ordered = order_by_mention(documents, answer_text)
+    indexes = _ordinal_indexes(question, len(ordered))
+    if indexes:
+        return "ordinal", [ordered[i] for i in indexes]
+
+    compact_question = _compact(question)
+    named = [doc for doc in ordered
+             if doc.metadata.get('plcyNm') and _compact(doc.metadata.get('plcyNm')) in compact_question]
+    if named:
+        return "policy_name", named
+
+    if _DEMONSTRATIVE_PATTERN.search(question):
+        return "demonstrative", ordered
+    if _is_detail_only(question):
+        return "detail", ordered
+    return None, []
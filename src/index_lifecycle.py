@@ -0,0 +1,353 @@
+"""
+무중단(blue/green) 재색인 스크립트
+
+config.COLLECTION_NAME을 직접 고치고 재시작하는 대신,
+1. 버전이 붙은 새 컬렉션(<기본이름>_vYYYYMMDDHHMMSS)에 백그라운드로 색인하고
+2. 문서 수와 샘플 검색으로 새 컬렉션을 검증한 뒤
+3. 벡터 스토어 디렉토리의 alias 파일(active_collection.json)을 원자적으로 교체합니다.
+
+실행 중인 retriever는 get_active_collection_name()으로 alias 파일 변경을 감지하고,
+새 컬렉션을 미리 한 번 조회(warm-up)한 뒤에 전환하므로 재시작이나 첫 요청 지연이 없습니다.
+policy_sync.py처럼 활성 컬렉션을 제자리에서 갱신한 경우에는 같은 이름으로 alias 파일을 다시 써서(mark_updated_in_place)
+모든 워커가 읽어 둔 파생 색인/캐시를 버리고 다시 읽게 합니다. (reload_derived_indexes)
+
+사용법:
+    python index_lifecycle.py build --csv ../data/policies_with_documents_final2.csv --activate
+    python index_lifecycle.py activate <collection_name>
+    python index_lifecycle.py status
+    python index_lifecycle.py retire --keep 2
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from langchain_chroma import Chroma
+
+from config import COLLECTION_NAME, VDB_DIRECTORY, COLLECTION_BASE_NAME
+
+ALIAS_FILE_NAME = "active_collection.json"
+
+
+def alias_path(vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, ALIAS_FILE_NAME)
+
+
+def versioned_collection_name(base_name: str = COLLECTION_BASE_NAME) -> str:
+    return f"{base_name}_v{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+
+def read_alias(vdb_directory: str = VDB_DIRECTORY) -> dict:
+    """alias 파일 내용을 반환합니다. 없으면 config.COLLECTION_NAME을 활성 컬렉션으로 봅니다."""
+    try:
+        with open(alias_path(vdb_directory), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"collection": COLLECTION_NAME, "history": []}
+
+
+def activate_version(collection_name: str, vdb_directory: str = VDB_DIRECTORY, note: str = "") -> dict:
+    """
+    임시 파일에 쓴 뒤 os.replace로 alias 파일을 교체합니다.
+    os.replace는 같은 파일시스템 안에서 원자적이므로, 읽는 쪽은 항상 이전 또는 새 내용 중 하나만 봅니다.
+    """
+    current = read_alias(vdb_directory)
+    history = ([current["collection"]] + current.get("history", []))[:10]
+    alias = {
+        "collection": collection_name,
+        "activated_at": datetime.now().isoformat(timespec="seconds"),
+        "note": note,
+        "history": [c for c in history if c != collection_name],
+    }
+    os.makedirs(vdb_directory, exist_ok=True)
+    tmp_path = alias_path(vdb_directory) + f".tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(alias, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, alias_path(vdb_directory))
+    print(f"✅ 활성 컬렉션 전환: {current['collection']} -> {collection_name}")
+    return alias
+
+
+def mark_updated_in_place(collection_name: str, vdb_directory: str = VDB_DIRECTORY, note: str = "") -> bool:
+    """
+    활성 컬렉션을 제자리에서 갱신했음을 알립니다. alias가 이 컬렉션을 가리킬 때만 같은 내용으로 다시 써서 mtime을 바꿉니다.
+    (다른 컬렉션이 활성이면 아무 것도 하지 않고 False)
+    """
+    if read_alias(vdb_directory)["collection"] != collection_name:
+        return False
+    activate_version(collection_name, vdb_directory, note=note)
+    return True
+
+
+def warm_up_collection(collection_name: str, vdb_directory: str = VDB_DIRECTORY) -> bool:
+    """저장된 임베딩 하나로 질의를 한 번 수행해 HNSW 인덱스를 메모리에 올립니다. (임베딩 API 호출 없음)"""
+    collection = Chroma(collection_name=collection_name, persist_directory=vdb_directory)._collection
+    sample = collection.get(limit=1, include=["embeddings"])
+    if not sample["ids"]:
+        return False
+    collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1)
+    return True
+
+
+class _ActiveCollection:
+    """
+    alias 파일의 mtime을 확인해 활성 컬렉션 이름을 캐시합니다.
+    변경을 감지하면 백그라운드에서 warm-up을 마친 뒤에 새 이름으로 전환합니다.
+    """
+
+    def __init__(self, vdb_directory: str = VDB_DIRECTORY, check_interval: float = 1.0):
+        self.vdb_directory = vdb_directory
+        self.check_interval = check_interval
+        self.name = read_alias(vdb_directory)["collection"]
+        try:
+            self._mtime = os.stat(alias_path(vdb_directory)).st_mtime
+        except FileNotFoundError:
+            self._mtime = None
+        self._checked_at = 0.0
+        self._warming = None
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self.name
+        self._checked_at = now
+        try:
+            mtime = os.stat(alias_path(self.vdb_directory)).st_mtime
+        except FileNotFoundError:
+            return self.name
+        if mtime == self._mtime:
+            return self.name
+
+        target = read_alias(self.vdb_directory)["collection"]
+        if target == self.name:
+            # 같은 컬렉션으로 다시 쓰였으면 제자리 갱신(policy_sync.py)이므로 파생 색인/캐시를 다시 읽음
+            self._mtime, self.name = mtime, target
+            reload_derived_indexes(f"활성 컬렉션 갱신: {target}")
+            return self.name
+
+        with self._lock:
+            if self._warming != target:
+                self._warming = target
+                threading.Thread(target=self._switch, args=(target, mtime), daemon=True).start()
+        return self.name
+
+    def _switch(self, target: str, mtime: float):
+        started = time.perf_counter()
+        try:
+            warm_up_collection(target, self.vdb_directory)
+            print(f"--- 새 컬렉션 warm-up 완료: {target} ({(time.perf_counter() - started) * 1000:.0f}ms) ---")
+        except Exception as e:
+            print(f"⚠️ 새 컬렉션 warm-up 실패, 그대로 전환합니다: {e}")
+        with self._lock:
+            self.name, self._mtime, self._warming = target, mtime, None
+        # 새 컬렉션은 같은 plcyNo라도 metadata가 다를 수 있으므로 파싱 캐시를 비우고, 이전 버전 색인도 메모리에서 내림
+        reload_derived_indexes(f"활성 컬렉션 전환 -> {target}")
+
+
+def reload_derived_indexes(reason: str = "") -> dict:
+    """
+    이 프로세스가 읽어 둔 파생 색인과 캐시를 모두 버립니다. 다음 요청부터 파일/DB를 다시 읽습니다.
+    (BM25 색인, 유사도 그래프, 사이드 스토어, 축소 차원 색인, 파티션 manifest, 자격 요건 파싱 캐시, RDB 후보 캐시)
+    policy_sync.py가 활성 컬렉션을 제자리에서 갱신한 뒤 API 서버(POST /admin/reload)에서 호출합니다.
+    """
+    from lexical_index import clear_loaded_indexes as clear_lexical
+    from similarity_graph import clear_loaded_graphs
+    from policy_store import clear_loaded_stores
+    from reduced_index import clear_loaded_indexes as clear_reduced
+    from partitions import clear_manifest_cache
+    from eligibility import clear_parsed_cache
+    from candidate_cache import invalidate_candidate_cache
+
+    cleared = {
+        "bm25": clear_lexical(),
+        "similarity_graph": clear_loaded_graphs(),
+        "policy_store": clear_loaded_stores(),
+        "reduced_index": clear_reduced(),
+        "partition_manifest": clear_manifest_cache(),
+    }
+    clear_parsed_cache(reason)
+    invalidate_candidate_cache(reason)
+    print(f"--- [Reload] 파생 색인/캐시 다시 읽기{f' ({reason})' if reason else ''}: {cleared} ---")
+    return cleared
+
+
+_active = None
+
+
+def get_active_collection_name() -> str:
+    """retriever 등 조회 경로에서 사용할 현재 활성 컬렉션 이름"""
+    global _active
+    if _active is None:
+        _active = _ActiveCollection()
+    return _active.get()
+
+
+def build_version(csv_path: str, collection_name: str = None, batch_size: int = 200,
+                  vdb_directory: str = VDB_DIRECTORY) -> tuple:
+    """
+    새 버전 컬렉션에 문서를 임베딩하고 정책 레코드 사이드 스토어, BM25 색인, 유사도 그래프, 축소 차원 색인(TWO_STAGE_SEARCH일 때),
+    지역 분할 컬렉션(PARTITIONED_SEARCH일 때)도 함께 만듭니다. (전환 직후에도 지역 분할 검색이 그대로 동작)
+    (컬렉션 이름, 문서 수)를 반환합니다.
+    """
+    from langchain_openai import OpenAIEmbeddings
+    from indexing import create_documents_from_csv, add_to_chroma_in_batches, build_lexical_index
+    from near_duplicates import assign_duplicate_clusters
+    from similarity_graph import build_similarity_graph
+    from reduced_index import build_reduced_index_if_enabled
+    from partitions import refresh_region_partitions
+    from policy_store import split_policy_documents, write_policy_store, policy_store_path
+
+    collection_name = collection_name or versioned_collection_name()
+    docs = create_documents_from_csv(csv_path)
+    store = Chroma(
+        collection_name=collection_name,
+        embedding_function=OpenAIEmbeddings(model="text-embedding-3-large"),
+        persist_directory=vdb_directory
+    )
+    print(f"--- 새 버전 색인 시작: {collection_name} ({len(docs)}개 문서) ---")
+    # 지역별 변형 정책 묶음(dupClusterId)은 Chroma metadata와 사이드 스토어 양쪽에 들어가야 하므로 분리 전에 기록
+    assign_duplicate_clusters(docs)
+    slim_docs, records = split_policy_documents(docs)
+    write_policy_store(records, policy_store_path(collection_name, vdb_directory))
+    add_to_chroma_in_batches(slim_docs, batch_size, store=store)
+    build_lexical_index(docs, collection_name, vdb_directory)
+    build_similarity_graph(collection_name, vdb_directory)
+    build_reduced_index_if_enabled(collection_name, vdb_directory)
+    refresh_region_partitions(collection_name, vdb_directory)
+    return collection_name, len(docs)
+
+
+def start_background_build(csv_path: str, activate: bool = True, **kwargs) -> threading.Thread:
+    """서빙 프로세스를 막지 않도록 별도 스레드에서 build -> validate -> activate를 수행합니다."""
+    def run():
+        name, expected = build_version(csv_path, **kwargs)
+        if validate_version(name, expected) and activate:
+            activate_version(name, note=f"built from {os.path.basename(csv_path)}")
+
+    thread = threading.Thread(target=run, daemon=False)
+    thread.start()
+    return thread
+
+
+def validate_version(collection_name: str, expected_count: int, sample_size: int = 20,
+                     sample_queries: list = None, vdb_directory: str = VDB_DIRECTORY) -> bool:
+    """
+    1. 문서 수가 기대값과 같은지
+    2. 저장된 임베딩 샘플로 검색했을 때 자기 자신이 1위로 나오는지 (인덱스 무결성, API 호출 없음)
+    3. (선택) 텍스트 샘플 질의가 빈 결과 없이 동작하는지
+    를 확인합니다.
+    """
+    store = Chroma(collection_name=collection_name, persist_directory=vdb_directory)
+    collection = store._collection
+
+    count = collection.count()
+    if count != expected_count:
+        print(f"🚨 검증 실패: 문서 수 {count} != 기대값 {expected_count}")
+        return False
+
+    ids = collection.get(include=[])["ids"]
+    sample_ids = random.sample(ids, min(sample_size, len(ids)))
+    sample = collection.get(ids=sample_ids, include=["embeddings"])
+    result = collection.query(query_embeddings=sample["embeddings"], n_results=1, include=["distances"])
+    # 같은 문서가 중복 저장된 경우 다른 id가 거리 0으로 먼저 나올 수 있으므로 거리도 함께 확인
+    hits = sum(
+        1 for record_id, found, distance in zip(sample["ids"], result["ids"], result["distances"])
+        if found and (found[0] == record_id or distance[0] < 1e-6)
+    )
+    if hits < len(sample_ids):
+        print(f"🚨 검증 실패: 자기 검색 적중 {hits}/{len(sample_ids)}")
+        return False
+
+    if sample_queries:
+        from langchain_openai import OpenAIEmbeddings
+        text_store = Chroma(collection_name=collection_name, persist_directory=vdb_directory,
+                            embedding_function=OpenAIEmbeddings(model="text-embedding-3-large"))
+        for query in sample_queries:
+            if not text_store.similarity_search(query, k=3):
+                print(f"🚨 검증 실패: 샘플 질의 결과 없음 - {query}")
+                return False
+
+    print(f"✅ 검증 통과: {collection_name} (문서 {count}개, 자기 검색 {hits}/{len(sample_ids)})")
+    return True
+
+
+def version_side_files(collection_name: str, vdb_directory: str = VDB_DIRECTORY) -> list:
+    """버전 컬렉션과 함께 만들어지는 파생 파일 경로 (BM25 색인, 유사도 그래프, 레코드 스토어, 축소 차원 색인, 파티션 manifest)"""
+    from lexical_index import lexical_index_path
+    from similarity_graph import similarity_graph_path
+    from policy_store import policy_store_path
+    from reduced_index import full_vectors_path
+    from partitions import manifest_path
+
+    paths = [
+        lexical_index_path(collection_name, vdb_directory),
+        similarity_graph_path(collection_name, vdb_directory),
+        policy_store_path(collection_name, vdb_directory),
+        full_vectors_path(collection_name, vdb_directory),
+        manifest_path(collection_name, vdb_directory),
+    ]
+    # 축소 차원 색인은 차원 수/양자화 설정마다 파일이 따로 생김
+    paths += glob.glob(os.path.join(glob.escape(vdb_directory), f"reduced_{glob.escape(collection_name)}_*.npz"))
+    return paths
+
+
+def retire_versions(keep: int = 2, vdb_directory: str = VDB_DIRECTORY):
+    """
+    활성 컬렉션과 최근 keep개 이전 버전만 남기고 나머지 버전 컬렉션을 삭제합니다.
+    지역 분할 컬렉션({버전}__{파티션})과 버전별 파생 파일도 함께 지웁니다.
+    """
+    import chromadb
+
+    alias = read_alias(vdb_directory)
+    protected = {alias["collection"], *alias.get("history", [])[:keep]}
+    client = chromadb.PersistentClient(path=vdb_directory)
+    retired = set()
+    for collection in client.list_collections():
+        name = collection if isinstance(collection, str) else collection.name
+        version = name.split("__", 1)[0]
+        if version.startswith(f"{COLLECTION_BASE_NAME}_v") and version not in protected:
+            client.delete_collection(name)
+            retired.add(version)
+            print(f"🗑️ 이전 버전 삭제: {name}")
+
+    for version in sorted(retired):
+        for path in version_side_files(version, vdb_directory):
+            if os.path.exists(path):
+                os.remove(path)
+                print(f"🗑️ 이전 버전 파생 파일 삭제: {os.path.basename(path)}")
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--csv", default="../data/policies_with_documents_final2.csv")
+    build.add_argument("--activate", action="store_true")
+    build.add_argument("--query", action="append", default=[], help="검증용 샘플 질의 (여러 번 지정 가능)")
+    activate = sub.add_parser("activate")
+    activate.add_argument("collection_name")
+    sub.add_parser("status")
+    retire = sub.add_parser("retire")
+    retire.add_argument("--keep", type=int, default=2)
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.command == "build":
+        name, expected = build_version(args.csv)
+        if validate_version(name, expected, sample_queries=args.query) and args.activate:
+            activate_version(name, note=f"built from {os.path.basename(args.csv)}")
+    elif args.command == "activate":
+        activate_version(args.collection_name, note="manual")
+    elif args.command == "status":
+        print(json.dumps(read_alias(), ensure_ascii=False, indent=2))
+    elif args.command == "retire":
+        retire_versions(args.keep)
@@ -58,6 +58,9 @@ etcMttrCn: 기타사항내용
 refUrlAddr1: 참고URL주소1
 refUrlAddr2: 참고URL주소2
 
+※ 위 컬럼 전체는 policy_store 사이드 스토어에 저장되고,
+  Chroma metadata에는 policy_store.SLIM_METADATA_FIELDS만 저장됩니다.
+
 
 '''
 
@@ -69,6 +72,70 @@ from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
 import utils
+from lexical_index import BM25Index, lexical_index_path
+from similarity_graph import build_similarity_graph
+from policy_store import split_policy_documents, write_policy_store, policy_store_path
+from near_duplicates import assign_duplicate_clusters
+from reduced_index import build_reduced_index_if_enabled
+
+
+def create_metadata(row: dict) -> dict:
+    """정책 원본 레코드(CSV row 또는 API 응답의 정책 dict)에서 metadata를 만듭니다. 항상 원본값 그대로 사용합니다."""
+    return {
+        # 정책 기본 정보
+        "plcyNo": row.get('plcyNo', '정보 없음'),
+        "plcyNm": row.get('plcyNm', '정보 없음'),
+        "plcyKywdNm": row.get('plcyKywdNm', '정보 없음'),
+        "plcyExplnCn": row.get('plcyExplnCn', '정보 없음'),
+        "lclsfNm": row.get('lclsfNm', '정보 없음'),
+        "mclsfNm": row.get('mclsfNm', '정보 없음'),
+        "plcySprtCn": row.get('plcySprtCn', '정보 없음'),
+        "plcyPvsnMthdCd": row.get('plcyPvsnMthdCd', '정보 없음'),
+
+        # 기관 정보
+        "rgtrUpInstCdNm": row.get('rgtrUpInstCdNm', '정보 없음'),
+
+        # 기간 정보
+        "aplyPrdSeCd": row.get('aplyPrdSeCd', '정보 없음'),
+        "bizPrdSeCd": row.get('bizPrdSeCd', '정보 없음'),
+        "bizPrdBgngYmd": row.get('bizPrdBgngYmd', '정보 없음'),
+        "bizPrdEndYmd": row.get('bizPrdEndYmd', '정보 없음'),
+        "bizPrdEtcCn": row.get('bizPrdEtcCn', '정보 없음'),
+        "aplyYmd": row.get('aplyYmd', '정보 없음'),
+        "frstRegDt": row.get('frstRegDt', '정보 없음'),
+        "lastMdfcnDt": row.get('lastMdfcnDt', '정보 없음'),
+
+        # 신청 및 방법
+        "plcyAplyMthdCn": row.get('plcyAplyMthdCn', '정보 없음'),
+        "srngMthdCn": row.get('srngMthdCn', '정보 없음'),
+        "sbmsnDcmntCn": row.get('sbmsnDcmntCn', '정보 없음'),
+        "aplyUrlAddr": row.get('aplyUrlAddr', '정보 없음'),
+
+        # 지원 조건
+        "sprtSclLmtYn": row.get('sprtSclLmtYn', '정보 없음'),
+        "sprtTrgtMinAge": row.get('sprtTrgtMinAge', '정보 없음'),
+        "sprtTrgtMaxAge": row.get('sprtTrgtMaxAge', '정보 없음'),
+        "sprtTrgtAgeLmtYn": row.get('sprtTrgtAgeLmtYn', '정보 없음'),
+        "mrgSttsCd": row.get('mrgSttsCd', '정보 없음'),
+        "earnMinAmt": row.get('earnMinAmt', '정보 없음'),
+        "earnMaxAmt": row.get('earnMaxAmt', '정보 없음'),
+        "earnEtcCn": row.get('earnEtcCn', '정보 없음'),
+        "addAplyQlfcCndCn": row.get('addAplyQlfcCndCn', '정보 없음'),
+        "ptcpPrpTrgtCn": row.get('ptcpPrpTrgtCn', '정보 없음'),
+
+        # 요건 코드(target, 대상)
+        "zipCd": row.get('zipCd', '정보 없음'),
+        "plcyMajorCd": row.get('plcyMajorCd', '정보 없음'),
+        "jobCd": row.get('jobCd', '정보 없음'),
+        "schoolCd": row.get('schoolCd', '정보 없음'),
+        "sbizCd": row.get('sbizCd', '정보 없음'),
+
+        # 기타
+        "etcMttrCn": row.get('etcMttrCn', '정보 없음'),
+        "refUrlAddr1": row.get('refUrlAddr1', '정보 없음'),
+        "refUrlAddr2": row.get('refUrlAddr2', '정보 없음'),
+
+    }
 
 
 def create_documents_from_csv(csv_file_path: str) -> list[Document]:
@@ -95,61 +162,7 @@ def create_documents_from_csv(csv_file_path: str) -> list[Document]:
 
                 # 2. metadata 구성: 필터링 및 출처 표시에 사용할 정형 데이터
                 # 항상 원본값 그대로
-                metadata = {
-                    # 정책 기본 정보
-                    "plcyNo": row.get('plcyNo', '정보 없음'),
-                    "plcyNm": row.get('plcyNm', '정보 없음'),
-                    "plcyKywdNm": row.get('plcyKywdNm', '정보 없음'),
-                    "plcyExplnCn": row.get('plcyExplnCn', '정보 없음'),
-                    "lclsfNm": row.get('lclsfNm', '정보 없음'),
-                    "mclsfNm": row.get('mclsfNm', '정보 없음'),
-                    "plcySprtCn": row.get('plcySprtCn', '정보 없음'),
-                    "plcyPvsnMthdCd": row.get('plcyPvsnMthdCd', '정보 없음'),
-
-                    # 기관 정보
-                    "rgtrUpInstCdNm": row.get('rgtrUpInstCdNm', '정보 없음'),
-
-                    # 기간 정보
-                    "aplyPrdSeCd": row.get('aplyPrdSeCd', '정보 없음'),
-                    "bizPrdSeCd": row.get('bizPrdSeCd', '정보 없음'),
-                    "bizPrdBgngYmd": row.get('bizPrdBgngYmd', '정보 없음'),
-                    "bizPrdEndYmd": row.get('bizPrdEndYmd', '정보 없음'),
-                    "bizPrdEtcCn": row.get('bizPrdEtcCn', '정보 없음'),
-                    "aplyYmd": row.get('aplyYmd', '정보 없음'),
-                    "frstRegDt": row.get('frstRegDt', '정보 없음'),
-                    "lastMdfcnDt": row.get('lastMdfcnDt', '정보 없음'),
-
-                    # 신청 및 방법
-                    "plcyAplyMthdCn": row.get('plcyAplyMthdCn', '정보 없음'),
-                    "srngMthdCn": row.get('srngMthdCn', '정보 없음'),
-                    "sbmsnDcmntCn": row.get('sbmsnDcmntCn', '정보 없음'),
-                    "aplyUrlAddr": row.get('aplyUrlAddr', '정보 없음'),
-
-                    # 지원 조건
-                    "sprtSclLmtYn": row.get('sprtSclLmtYn', '정보 없음'),
-                    "sprtTrgtMinAge": row.get('sprtTrgtMinAge', '정보 없음'),
-                    "sprtTrgtMaxAge": row.get('sprtTrgtMaxAge', '정보 없음'),
-                    "sprtTrgtAgeLmtYn": row.get('sprtTrgtAgeLmtYn', '정보 없음'),
-                    "mrgSttsCd": row.get('mrgSttsCd', '정보 없음'),
-                    "earnMinAmt": row.get('earnMinAmt', '정보 없음'),
-                    "earnMaxAmt": row.get('earnMaxAmt', '정보 없음'),
-                    "earnEtcCn": row.get('earnEtcCn', '정보 없음'),
-                    "addAplyQlfcCndCn": row.get('addAplyQlfcCndCn', '정보 없음'),
-                    "ptcpPrpTrgtCn": row.get('ptcpPrpTrgtCn', '정보 없음'),
-
-                    # 요건 코드(target, 대상)
-                    "zipCd": row.get('zipCd', '정보 없음'),
-                    "plcyMajorCd": row.get('plcyMajorCd', '정보 없음'),
-                    "jobCd": row.get('jobCd', '정보 없음'),
-                    "schoolCd": row.get('schoolCd', '정보 없음'),
-                    "sbizCd": row.get('sbizCd', '정보 없음'),
-
-                    # 기타
-                    "etcMttrCn": row.get('etcMttrCn', '정보 없음'),
-                    "refUrlAddr1": row.get('refUrlAddr1', '정보 없음'),
-                    "refUrlAddr2": row.get('refUrlAddr2', '정보 없음'),
-
-                }
+                metadata = create_metadata(row)
 
                 documents.append(Document(page_content=page_content.strip(), metadata=metadata))
 
@@ -171,8 +184,9 @@ def setup_vectorstore(collection_name: str, embedding_model, persist_directory:
     return vectorstore
 
 
-def add_to_chroma_in_batches(docs: list[Document], batch_size: int = 100):
-    """문서 리스트를 배치로 나누어 ChromaDB에 추가합니다."""
+def add_to_chroma_in_batches(docs: list[Document], batch_size: int = 100, store: Chroma = None):
+    """문서 리스트를 배치로 나누어 ChromaDB에 추가합니다. store를 주지 않으면 __main__의 vectorstore를 사용합니다."""
+    target = store if store is not None else vectorstore
 
     # 전체 문서 리스트를 batch_size만큼 건너뛰며 반복
     for i in range(0, len(docs), batch_size):
@@ -180,12 +194,19 @@ def add_to_chroma_in_batches(docs: list[Document], batch_size: int = 100):
         batch = docs[i:i + batch_size]
 
         # 현재 배치만 DB에 추가
-        vectorstore.add_documents(documents=batch)
+        target.add_documents(documents=batch)
 
         # 진행 상황 출력
         print(f"Batch {i // batch_size + 1}/{(len(docs) - 1) // batch_size + 1} 처리 완료 ({len(batch)}개 문서 추가)")
 
 
+def build_lexical_index(docs: list[Document], collection_name: str, persist_directory: str):
+    """벡터 스토어와 같은 디렉토리에 같은 문서로 BM25 색인을 만들어 저장합니다."""
+    records = [(doc.metadata.get('plcyNo'), doc.page_content, doc.metadata.get('plcyNm')) for doc in docs]
+    index = BM25Index.build(records)
+    index.save(lexical_index_path(collection_name, persist_directory))
+
+
 if __name__ == '__main__':
 
     COLLECTION_NAME = "policy_collection_summary_added_openai_large_0730"
@@ -212,8 +233,24 @@ if __name__ == '__main__':
 
     print(f'총 토큰 수 : {avg}')
 
+    # 지역별 변형 정책(근사 중복)을 묶어 metadata에 dupClusterId 기록 (검색 결과에서 대표 하나만 사용)
+    assign_duplicate_clusters(docs)
+
+    # Chroma에는 ID와 필터용 필드만, 전체 레코드는 사이드 스토어(records_<컬렉션>.arrow)에 저장
+    slim_docs, records = split_policy_documents(docs)
+    write_policy_store(records, policy_store_path(COLLECTION_NAME, VECTOR_DB_PATH))
+
     try:
-        add_to_chroma_in_batches(docs, 200)
+        add_to_chroma_in_batches(slim_docs, 200)
     except Exception as e:
         print('문서 임베딩 중 오류 발생!')
         print(e)
+
+    # 하이브리드 검색용 BM25 색인
+    build_lexical_index(docs, COLLECTION_NAME, VECTOR_DB_PATH)
+
+    # "비슷한 정책" 후속 질문용 유사도 그래프 (저장된 임베딩 사용)
+    build_similarity_graph(COLLECTION_NAME, VECTOR_DB_PATH)
+
+    # 2단계 검색용 축소 차원 색인 + 전체 차원 벡터 파일 (TWO_STAGE_SEARCH가 켜져 있을 때만, 저장된 임베딩 사용)
+    build_reduced_index_if_enabled(COLLECTION_NAME, VECTOR_DB_PATH)
@@ -0,0 +1,184 @@
+"""
+한국어 BM25 역색인 (하이브리드 검색용)
+
+pre_processing.create_final_document로 만든 document 텍스트를 글자 bi-gram 단위로 색인합니다.
+조사가 붙은 형태("월세를", "전세자금은")도 bi-gram이 겹치므로 형태소 분석기 없이 매칭됩니다.
+
+- 인덱싱 시점(indexing.py)에 벡터 스토어와 같은 디렉토리에 pickle 파일로 저장합니다.
+- 검색 시점(retriever.py)에는 후보 ID 집합 안에서만 점수를 계산하고,
+  벡터 검색 결과와 Reciprocal Rank Fusion(RRF)으로 합칩니다.
+- 질문에 정책명이 그대로 포함된 경우(정확 일치)에는 임베딩 호출 없이 바로 결과를 돌려줄 수 있습니다.
+"""
+import math
+import os
+import pickle
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from config import VDB_DIRECTORY, COLLECTION_NAME
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-zA-Z]+|[0-9]+")
+_HANGUL = re.compile(r"[가-힣]+")
+
+# 정확 일치로 보기 위한 정책명 최소 길이 (너무 짧은 이름은 오탐이 많음)
+EXACT_MATCH_MIN_LENGTH = 4
+
+
+def lexical_index_path(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY) -> str:
+    """벡터 스토어 디렉토리 안에 컬렉션 이름으로 색인 파일 경로를 만듭니다."""
+    return os.path.join(vdb_directory, f"bm25_{collection_name}.pkl")
+
+
+def tokenize(text: str) -> list:
+    """
+    한글 단어는 단어 전체 + 글자 bi-gram으로, 영문/숫자는 소문자 단어 그대로 토큰화합니다.
+    예) "전세자금 대출" -> ["전세자금", "전세", "세자", "자금", "대출"]
+    """
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(str(text)):
+        if _HANGUL.fullmatch(word):
+            tokens.append(word)
+            if len(word) > 2:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def _normalize_name(text: str) -> str:
+    return re.sub(r"\s+", "", str(text))
+
+
+class BM25Index:
+    """plcyNo 단위 BM25 역색인"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []          # 내부 번호 -> plcyNo
+        self.row_of = {}           # plcyNo -> 내부 번호
+        self.doc_lengths = None    # np.float32 배열
+        self.avg_length = 0.0
+        self.postings = {}         # token -> (np.int32 문서 번호 배열, np.float32 tf 배열)
+        self.idf = {}
+        self.names = {}            # 공백 제거한 정책명 -> plcyNo 목록
+
+    @classmethod
+    def build(cls, records: list, **kwargs) -> "BM25Index":
+        """
+        records: (plcyNo, document 텍스트, plcyNm) 튜플 리스트
+        """
+        index = cls(**kwargs)
+        postings = defaultdict(lambda: ([], []))
+        lengths = []
+        names = defaultdict(list)
+
+        for row, (policy_id, text, policy_name) in enumerate(records):
+            policy_id = str(policy_id)
+            index.doc_ids.append(policy_id)
+            index.row_of[policy_id] = row
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                postings[token][0].append(row)
+                postings[token][1].append(tf)
+            name = _normalize_name(policy_name or "")
+            if len(name) >= EXACT_MATCH_MIN_LENGTH:
+                names[name].append(policy_id)
+
+        n_docs = len(records)
+        index.doc_lengths = np.asarray(lengths, dtype=np.float32)
+        index.avg_length = float(index.doc_lengths.mean()) if n_docs else 0.0
+        for token, (rows, tfs) in postings.items():
+            index.postings[token] = (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            df = len(rows)
+            index.idf[token] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        index.names = dict(names)
+        print(f"✅ BM25 색인 생성 완료: 문서 {n_docs}개, 토큰 {len(index.postings)}개")
+        return index
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"✅ BM25 색인 저장 완료: {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        index = cls()
+        with open(path, "rb") as f:
+            index.__dict__.update(pickle.load(f))
+        return index
+
+    def search(self, query: str, candidate_ids: list = None, k: int = 20) -> list:
+        """
+        후보 ID 집합 안에서 BM25 상위 k개를 [(plcyNo, score), ...]로 반환합니다.
+        """
+        if not self.doc_ids:
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-9))
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            scores[rows] += self.idf[token] * tfs * (self.k1 + 1) / (tfs + norm[rows])
+
+        if candidate_ids is not None:
+            rows = np.fromiter((self.row_of[c] for c in candidate_ids if c in self.row_of), dtype=np.int64)
+            if rows.size == 0:
+                return []
+        else:
+            rows = np.arange(len(self.doc_ids))
+        rows = rows[scores[rows] > 0]
+        if rows.size == 0:
+            return []
+        top = rows[np.argsort(-scores[rows], kind="stable")[:k]]
+        return [(self.doc_ids[r], float(scores[r])) for r in top]
+
+    def exact_matches(self, query: str, candidate_ids: list = None) -> list:
+        """질문에 정책명이 그대로 들어 있으면 해당 plcyNo 목록을 반환합니다."""
+        normalized = _normalize_name(query)
+        allowed = set(candidate_ids) if candidate_ids is not None else None
+        matches = []
+        for name, policy_ids in self.names.items():
+            if name in normalized:
+                matches.extend(p for p in policy_ids if allowed is None or p in allowed)
+        return list(dict.fromkeys(matches))
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    여러 개의 순위 리스트(plcyNo 리스트)를 RRF 점수로 합쳐 내림차순 plcyNo 리스트로 반환합니다.
+    score(d) = sum(1 / (k + rank))
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, policy_id in enumerate(ranking, start=1):
+            scores[policy_id] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda p: scores[p], reverse=True)
+
+
+_loaded_indexes = {}
+
+
+def clear_loaded_indexes() -> int:
+    """읽어 둔 색인을 버립니다. 다음 조회 때 파일을 다시 읽습니다. (버린 개수 반환)"""
+    count = len(_loaded_indexes)
+    _loaded_indexes.clear()
+    return count
+
+
+def get_lexical_index(path: str = None):
+    """프로세스당 한 번만 색인 파일을 읽습니다. 파일이 없으면 None을 반환합니다."""
+    path = path or lexical_index_path()
+    if path not in _loaded_indexes:
+        if not os.path.exists(path):
+            print(f"⚠️ BM25 색인 파일이 없어 벡터 검색만 사용합니다: {path}")
+            _loaded_indexes[path] = None
+        else:
+            _loaded_indexes[path] = BM25Index.load(path)
+    return _loaded_indexes[path]
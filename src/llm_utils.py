@@ -6,9 +6,20 @@ import json
 from openai import OpenAI
 import pandas as pd
 from utils import count_tokens
+from prompts import FILTER_EXTRACTION_SYSTEM_PROMPT
+from filter_validation import validate_filters
+from policy_store import hydrate_documents
+from metrics import usage_metrics
+from call_policy import get_call_policy
+from config import MODEL_TIERS, STAGE_MODEL_TIERS
 
 
-def create_filter_from_query(client: OpenAI, user_query: str) -> dict:
+def stage_model(stage: str) -> str:
+    """단계(rephrase, filter_extraction, query_understanding, answer)에 설정된 모델 등급의 모델명을 반환합니다."""
+    return MODEL_TIERS[STAGE_MODEL_TIERS[stage]]
+
+
+def create_filter_from_query(client: OpenAI, user_query: str, model: str = None) -> dict:
     """
     사용자의 자연어 질문을 분석하고,
     정책 필터링에 사용할 구조화된 JSON(파이썬 딕셔너리)을 생성합니다.
@@ -16,138 +27,39 @@ def create_filter_from_query(client: OpenAI, user_query: str) -> dict:
     Args:
         client: 초기화된 OpenAI 클라이언트 객체
         user_query: 사용자의 원본 질문 문자열
+        model: 사용할 모델명. 없으면 STAGE_MODEL_TIERS["filter_extraction"] 등급의 모델
 
     Returns:
-        추출된 필터 정보가 담긴 딕셔너리
+        추출된 필터 정보가 담긴 딕셔너리.
+        제한 시간 초과/서킷 열림/호출 오류 시에는 빈 딕셔너리(필터 없이 원문 질문으로 검색)를 반환합니다.
     """
-    # LLM에게 전달할 시스템 프롬프트. 역할, 지시사항, 허용 값, JSON 스키마를 명시합니다.
-    system_prompt = """
-# ROLE
-You are an expert at extracting key information for filtering South Korean youth policies from a user's query.
-
-# INSTRUCTION
-- Analyze the user's query and generate a JSON object that strictly follows the provided `JSON SCHEMA`.
-- CRITICAL: When extracting regions, you MUST normalize them to their full official administrative names. (e.g., "서울", "서울시" -> "서울특별시" / "경기" -> "경기도" / "부산" -> "부산광역시" / "성남" -> "성남시" / "종로" -> "종로구")
-- For fields with `ALLOWED VALUES`, you MUST choose from the provided list. If a user's term is a synonym, map it to the correct value (e.g., "실업자" -> "미취업").
-- If a value is not mentioned, use `null` for single values or an empty list `[]` for array values.
-- Do NOT make up values that are not in the `ALLOWED VALUES` list.
-- Output ONLY the JSON object.
-
-# ALLOWED VALUES
-- 'job_status': ["재직자", "자영업자", "미취업자", "프리랜서", "일용근로자",
-"(예비)창업자", "단기근로자", "영농종사자", "기타", "제한없음"]
-- 'marriage_status': ["기혼", "미혼", "제한없음"]
-- 'education_levels': ["고졸 미만", "고교 재학", "고졸 예정", "고교 졸업", "대학 재학", "대졸 예정",
-"대학 졸업", "석·박사", "기타", "제한없음"]
-- 'majors': ["인문계열", "사회계열", "상경계열", "이학계열", "공학계열", 
-"예체능계열", "농산업계열", "기타", "제한없음"]
-- 'categories': ["일자리", "주거", "교육", "복지문화", "참여권리"]
-- 'subcategories': ["취업", "재직자", "창업", "주택 및 거주지", "기숙사",
-"전월세 및 주거급여 지원", "미래역량강화", "교육비지원", "온라인교육", "취약계층 및 금융지원",
-"건강", "예술인지원", "문화활동", "청년참여", "정책인프라구축", "청년국제교류", "권익보호"]
-- 'specializations': ["중소기업", "여성", "기초생활수급자", "한부모가정", "장애인",
-"농업인", "군인", "지역인재", "기타", "제한없음"]
-- 'keywords': ["대출", "보조금", "바우처", "금리혜택", "교육지원", "맞춤형상담서비스",
-"인턴", "벤처", "중소기업", "청년가장", "장기미취업청년", "공공임대주택",
-"신용회복", "육아", "출산", "해외진출", "주거지원"]
-
-
-# JSON SCHEMA
-{
-  "age": "number | null",
-  "income": "number | null",
-  "regions": ["string"],
-  "job_status": ["string"],
-  "marriage_status": "string | null",
-  "education_levels": ["string"],
-  "majors": ["string"],
-  "categories": ["string"],
-  "subcategories": ["string"],
-  "specializations": ["string"],
-  "keywords": ["string"]
-}
-
-# EXAMPLES
----
-user_query: "서울 사는 25세 미취업자인데, 창업 지원금 좀 알아봐줘"
-{
-  "age": 25,
-  "income": null,
-  "regions": ["서울특별시"],
-  "job_status": ["미취업자", "(예비)창업자"],
-  "marriage_status": null,
-  "education_levels": [],
-  "majors": [],
-  "categories": ["일자리"],
-  "subcategories": ["창업"],
-  "specializations": [],
-  "keywords": ["보조금", "벤처"]
-}
----
-user_query: "강원 춘천에 거주하는 고졸 학력으로 지원 가능한 주거 대출 정책 있어?"
-{
-  "age": null,
-  "income": null,
-  "regions": ["강원특별자치도", "춘천시"],
-  "job_status": [],
-  "marriage_status": null,
-  "education_levels": ["고교 졸업"],
-  "majors": [],
-  "categories": ["주거"],
-  "subcategories": ["주택 및 거주지", "기숙사", "전월세 및 주거급여 지원"],
-  "specializations": [],
-  "keywords": ["대출"]
-}
----
-user_query: "목포에 사는 사람인데 석사 지원 정책같은거 있냐"
-{
-  "age": null,
-  "income": null,
-  "regions": ["전라남도", "목포시"],
-  "job_status": [],
-  "marriage_status": null,
-  "education_levels": ["석·박사"],
-  "majors": [],
-  "categories": [],
-  "subcategories": [],
-  "specializations": [],
-  "keywords": []
-}
-
----
-user_query: "전국 단위로 지원해주는 청년 창업 정책 알려줘"
-{
-  "age": null,
-  "income": null,
-  "regions": [],
-  "job_status": ["(예비)창업자"],
-  "marriage_status": null,
-  "education_levels": [],
-  "majors": [],
-  "categories": ["일자리"],
-  "subcategories": ["창업"],
-  "specializations": [],
-  "keywords": []
-}
-"""
+    policy = get_call_policy("filter_extraction")
 
-    try:
-        # OpenAI API 호출
-        response = client.chat.completions.create(
-            model="gpt-4o",
+    def request():
+        # OpenAI API 호출 (클라이언트 timeout도 단계 제한 시간에 맞춤)
+        return client.chat.completions.create(
+            model=model or stage_model("filter_extraction"),
             response_format={"type": "json_object"},
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": FILTER_EXTRACTION_SYSTEM_PROMPT},
                 {"role": "user", "content": user_query}
-            ]
+            ],
+            timeout=policy.deadline
         )
 
-        # 반환된 JSON 문자열을 파이썬 딕셔너리로 파싱
+    response = policy.call(request, fallback=lambda: None, degraded="필터 없이 원문 질문으로 검색")
+    if response is None:
+        return {}
+
+    usage_metrics.record_openai_usage("filter_extraction", getattr(response, "usage", None))
+
+    try:
+        # 반환된 JSON 문자열을 파이썬 딕셔너리로 파싱하고, 허용 값 밖의 값은 로컬에서 정규화
         result = json.loads(response.choices[0].message.content)
-        return result
+        return validate_filters(result)
 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        print(f"⚠️ 필터 JSON 파싱 실패: {e} -> 필터 없이 원문 질문으로 검색")
         return {}
 
 # --- 이 코드로 전체 format_docs 함수를 교체하세요 ---
@@ -226,6 +138,9 @@ def format_docs(docs: list, code_map: dict) -> str:
         if bool_str == 'N': return '아니오'
         return ''
 
+    # Chroma에는 필터용 필드만 있으므로 최종 문서의 전체 레코드를 사이드 스토어에서 한 번에 가져옴
+    docs = hydrate_documents(docs)
+
     # --- Main Loop ---
     formatted_strings = []
     for i, doc in enumerate(docs):
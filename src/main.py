@@ -0,0 +1,216 @@
+# src/main.py
+"""
+FastAPI 기반 비동기 API 서버
+
+Streamlit(app.py)과 같은 체인을 사용하지만, 체인은 프로세스당 한 번만 조립하고
+여러 요청을 asyncio 이벤트 루프에서 동시에 처리합니다.
+
+실행:
+    uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4
+    또는 python main.py (config의 SERVER_* 설정 사용)
+
+주의: 대화 기록(memory.store)은 프로세스 메모리에 저장되므로,
+여러 워커로 띄울 때는 앞단 로드밸런서에서 session_id 기준 고정 라우팅이 필요합니다.
+/admin/* 와 /sessions/*/profile 엔드포인트는 ADMIN_TOKEN 환경 변수를 설정하고 X-Admin-Token 헤더로 같은 값을 보내야 합니다.
+(설정하지 않으면 서버와 같은 호스트에서 온 요청만 허용)
+"""
+import hmac
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from openai import OpenAI
+from pydantic import BaseModel
+
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, ADMIN_TOKEN_ENV, ADMIN_TOKEN_HEADER
+from utils import load_code_table
+from chains import create_final_chain
+from metrics import usage_metrics, content_metrics
+from singleflight import coalescing_summary
+from call_policy import call_policy_summary
+from chat_events import astream_with_events
+from memory import store, history_metrics
+from candidate_cache import candidate_cache_summary, invalidate_candidate_cache
+from index_lifecycle import reload_derived_indexes
+
+
+class ChatRequest(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    answer: str
+    filters: dict = {}
+    policies: list = []
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """워커 프로세스 시작 시 체인을 한 번만 조립하여 app.state에 보관합니다."""
+    load_dotenv()
+    openai_client = OpenAI()
+    code_table_map = load_code_table()
+    app.state.chain = create_final_chain(openai_client, code_table_map)
+    yield
+
+
+app = FastAPI(title="청년 정책 추천 챗봇 API", lifespan=lifespan)
+
+
+def _session_config(session_id: str) -> dict:
+    # RunnableWithMessageHistory가 get_session_history(session_id)를 호출하도록 전달
+    return {"configurable": {"session_id": session_id}}
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """SSE 프레임 한 개를 만듭니다."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+_LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_admin(request: Request):
+    """관리용 엔드포인트 접근 확인 (ADMIN_TOKEN이 있으면 헤더 토큰 비교, 없으면 로컬 요청만 허용)"""
+    expected = os.environ.get(ADMIN_TOKEN_ENV)
+    if expected:
+        token = request.headers.get(ADMIN_TOKEN_HEADER, "")
+        if not hmac.compare_digest(token.encode(), expected.encode()):
+            raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+    elif request.client is None or request.client.host not in _LOCAL_HOSTS:
+        raise HTTPException(status_code=403, detail=f"{ADMIN_TOKEN_ENV}가 설정되지 않아 로컬 요청만 허용합니다.")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    이 워커 프로세스의 단계별 LLM 토큰 사용량/프롬프트 캐시 적중 비율, 동일 요청 병합 비율, 단계별 지연시간,
+    RDB 후보 캐시 적중 비율/아낀 SQL 시간, 대화 기록 토큰 감소율
+    """
+    return {"llm_usage": usage_metrics.summary(), "single_flight": coalescing_summary(),
+            "call_policy": call_policy_summary(), "content_latency": content_metrics.summary(),
+            "candidate_cache": candidate_cache_summary(), "history": history_metrics.summary()}
+
+
+@app.post("/admin/candidate-cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_candidates():
+    """정책/지역 테이블을 다른 프로세스에서 다시 적재한 뒤 호출합니다. (이 워커의 후보 캐시만 비움)"""
+    invalidate_candidate_cache("API 요청")
+    return candidate_cache_summary()
+
+
+@app.post("/admin/reload", dependencies=[Depends(require_admin)])
+async def reload_indexes():
+    """
+    policy_sync.py로 활성 컬렉션을 갱신한 뒤 호출합니다. 이 워커가 읽어 둔 BM25/유사도 그래프/사이드 스토어/축소 차원 색인과
+    자격 요건 파싱 캐시, 후보 캐시를 버려 다음 요청부터 새 파일을 읽게 합니다. (다른 워커는 alias 파일 갱신을 1초 안에 감지해 같은 일을 합니다)
+    """
+    return {"cleared": reload_derived_indexes("API 요청"), "candidate_cache": candidate_cache_summary()}
+
+
+@app.get("/sessions/{session_id}/profile", dependencies=[Depends(require_admin)])
+async def get_profile(session_id: str):
+    """
+    세션 사용자 프로필 (대화에서 한 번 말한 나이/지역/직업 상태 등, user_profile.py)
+    session_id는 클라이언트가 정할 수 있어 추측 가능하므로, 개인정보가 담긴 프로필은 관리자만 조회합니다.
+    """
+    # get_session_history는 없는 세션을 새로 만들기 때문에 조회에는 쓰지 않습니다.
+    if session_id not in store:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    return {"session_id": session_id, "profile": store[session_id].profile}
+
+
+@app.delete("/sessions/{session_id}/profile", dependencies=[Depends(require_admin)])
+async def reset_profile(session_id: str):
+    """세션 사용자 프로필을 비웁니다. (대화 기록은 유지)"""
+    if session_id not in store:
+        raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
+    store[session_id].profile.clear()
+    return {"session_id": session_id, "profile": {}}
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: Request, body: ChatRequest):
+    """스트리밍 없이 완성된 답변을 검색 조건, 정책 카드 정보와 함께 한 번에 반환합니다."""
+    session_id = body.session_id or str(uuid.uuid4())
+    response = ChatResponse(session_id=session_id, answer="")
+    tokens = []
+    async for event in astream_with_events(
+            request.app.state.chain,
+            {"question": body.question},
+            _session_config(session_id)
+    ):
+        if event["type"] == "token":
+            tokens.append(event["data"])
+        elif event["type"] == "filters":
+            response.filters = event["data"]
+        elif event["type"] == "policies":
+            response.policies = event["data"]["policies"]
+        elif event["type"] == "error":
+            # 단계 호출 불가(제한 시간/서킷 열림)는 503, 그 밖의 체인 오류는 502
+            raise HTTPException(status_code=event.get("status", 502), detail=event["data"])
+    response.answer = "".join(tokens)
+    return response
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request, body: ChatRequest):
+    """
+    답변을 SSE(text/event-stream)로 스트리밍합니다.
+    답변 토큰보다 먼저 검색 중간 결과를 보내므로 클라이언트는 정책 카드를 바로 그릴 수 있습니다.
+    - 검색 조건: event: filters / {...추출된 필터}
+    - 후보 수: event: candidates / {"count": n}
+    - 정책 카드: event: policies / {"path": "...", "policies": [{"plcyNo", "plcyNm", "aplyUrlAddr"}, ...]}
+    - 기본 이벤트: {"token": "..."}
+    - 종료 이벤트: event: end / {"session_id": "..."}
+    - 오류 이벤트: event: error / {"message": "..."}
+    """
+    session_id = body.session_id or str(uuid.uuid4())
+    chain = request.app.state.chain
+
+    async def event_generator():
+        try:
+            async for event in astream_with_events(
+                    chain,
+                    {"question": body.question},
+                    _session_config(session_id)
+            ):
+                # 클라이언트가 연결을 끊으면 남은 생성을 중단합니다.
+                if await request.is_disconnected():
+                    break
+                if event["type"] == "token":
+                    yield _sse({"token": event["data"]})
+                elif event["type"] == "error":
+                    yield _sse({"message": event["data"]}, event="error")
+                    return
+                else:
+                    yield _sse(event["data"], event=event["type"])
+            yield _sse({"session_id": session_id}, event="end")
+        except Exception as e:
+            print(f"스트리밍 중 오류 발생: {e}")
+            yield _sse({"message": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"X-Session-Id": session_id, "Cache-Control": "no-cache"}
+    )
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run("main:app", host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS)
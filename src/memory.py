@@ -1,14 +1,64 @@
-
 """
 메모리 관리 클래스 및 함수
+
+- WindowedInMemoryHistory: 최근 MEMORY_K개의 상호작용(메시지 2*k개)만 저장 (HISTORY_TOKEN_BUDGET = 0일 때)
+- TokenBudgetHistory: 메시지별 토큰 수를 한 번만 세어 두고, 합계가 HISTORY_TOKEN_BUDGET을 넘으면
+  오래된 상호작용부터 버립니다. deque에 저장해 추가/제거가 O(1)입니다.
+  HISTORY_COMPRESS_OLD_ANSWERS이면 최신 답변을 제외한 이전 답변은 추천했던 정책 목록(plcyNo/plcyNm)으로 줄여 둡니다.
+  (최신 답변은 후속 질문의 "두 번째 정책" 같은 지칭 해석에 쓰이므로 그대로 유지)
+- history_metrics: 기존 방식(메시지 2*k개)으로 보냈을 대화 기록 토큰과 실제 대화 기록 토큰을 비교합니다. (GET /metrics)
 """
+import threading
+from collections import deque
+
 from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
-from config import MEMORY_K
+from langchain_core.messages import AIMessage
+from config import (MEMORY_K, HISTORY_TOKEN_BUDGET, HISTORY_MAX_MESSAGES, HISTORY_COMPRESS_OLD_ANSWERS,
+                    HISTORY_COMPRESSED_MAX_CHARS)
 from pydantic import Field
 
-class WindowedInMemoryHistory(InMemoryChatMessageHistory):
+_encoding = None
+
+
+def message_tokens(text: str) -> int:
+    """
+    메시지 토큰 수. tiktoken 인코딩(cl100k_base)을 한 번만 불러와 재사용하고,
+    불러올 수 없는 환경(오프라인)에서는 한글 기준 대략 2바이트당 1토큰으로 추정합니다.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    text = str(text)
+    return len(_encoding.encode(text)) if _encoding else len(text.encode("utf-8")) // 2
+
+
+class SessionStateMixin:
+    """직전 답변의 문서/필터와 세션 프로필을 쓰는 헬퍼 (두 기록 클래스 공통)"""
+
+    @property
+    def last_policy_ids(self) -> list:
+        return [doc.metadata.get('plcyNo') for doc in self.last_documents]
+
+    def last_answer(self) -> str:
+        """가장 최근 AI 답변 텍스트 (후속 질문의 순서 지칭 해석용)"""
+        for message in reversed(self.messages):
+            if message.type == "ai":
+                return str(message.content)
+        return ""
+
+
+class WindowedInMemoryHistory(SessionStateMixin, InMemoryChatMessageHistory):
     k: int = 2
     """최근 k개의 상호작용만 저장하는 인메모리 기록 클래스"""
+    # 직전 답변에 사용한 문서와 필터 (후속 질문에서 검색을 다시 하지 않기 위해 보관)
+    last_documents: list = Field(default_factory=list)
+    last_filters: dict = Field(default_factory=dict)
+    # 세션 사용자 프로필 (user_profile.py, 대화 기록 창과 무관하게 유지되며 프롬프트에는 들어가지 않음)
+    profile: dict = Field(default_factory=dict)
 
     def __init__(self, k: int = 2):
         super().__init__()
@@ -22,11 +72,153 @@ class WindowedInMemoryHistory(InMemoryChatMessageHistory):
             self.messages = self.messages[-(self.k * 2):]
 
 
+class HistoryMetrics:
+    """턴마다 기존 방식(메시지 2*MEMORY_K개) 대비 대화 기록 토큰 수를 누적합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.baseline_tokens = 0
+        self.history_tokens = 0
+        self.compressed_answers = 0
+        self.evicted_messages = 0
+
+    def record(self, baseline: int, actual: int, compressed: int = 0, evicted: int = 0):
+        with self._lock:
+            self.turns += 1
+            self.baseline_tokens += baseline
+            self.history_tokens += actual
+            self.compressed_answers += compressed
+            self.evicted_messages += evicted
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "avg_baseline_tokens": round(self.baseline_tokens / self.turns, 1) if self.turns else 0.0,
+                "avg_history_tokens": round(self.history_tokens / self.turns, 1) if self.turns else 0.0,
+                "reduction": round(1 - self.history_tokens / self.baseline_tokens, 3) if self.baseline_tokens else 0.0,
+                "compressed_answers": self.compressed_answers,
+                "evicted_messages": self.evicted_messages,
+            }
+
+
+history_metrics = HistoryMetrics()
+
+
+def compress_answer(content: str, policy_refs: list) -> str:
+    """이전 답변을 추천 정책 목록(또는 앞부분)으로 줄입니다."""
+    if policy_refs:
+        listed = ", ".join(f"{i}. {name} [{policy_id}]" for i, (policy_id, name) in enumerate(policy_refs, 1))
+        return f"(이전 답변 요약) 추천한 정책: {listed}"
+    content = str(content)
+    if len(content) <= HISTORY_COMPRESSED_MAX_CHARS:
+        return content
+    return f"(이전 답변 앞부분) {content[:HISTORY_COMPRESSED_MAX_CHARS]}…"
+
+
+class _Entry:
+    __slots__ = ("message", "tokens", "raw_tokens", "policy_refs")
+
+    def __init__(self, message, policy_refs: list = None):
+        self.message = message
+        self.tokens = self.raw_tokens = message_tokens(message.content)
+        self.policy_refs = policy_refs or []
+
+
+class TokenBudgetHistory(SessionStateMixin, BaseChatMessageHistory):
+    """토큰 예산 기준 대화 기록 (메시지별 토큰 수 캐시, deque 기반 O(1) 추가/제거)"""
+
+    def __init__(self, token_budget: int = HISTORY_TOKEN_BUDGET, max_messages: int = HISTORY_MAX_MESSAGES,
+                 compress_old_answers: bool = HISTORY_COMPRESS_OLD_ANSWERS, metrics: HistoryMetrics = None):
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.compress_old_answers = compress_old_answers
+        self.metrics = metrics or history_metrics
+        self._entries = deque()
+        self._total_tokens = 0
+        self._latest_answer = None  # 아직 줄이지 않은 최신 답변 entry
+        # 기존 방식(메시지 2*MEMORY_K개)이었다면 남아 있었을 메시지들의 원래 토큰 수 (비교용)
+        self._baseline = deque(maxlen=MEMORY_K * 2)
+        # 직전 답변에 사용한 문서와 필터 (후속 질문에서 검색을 다시 하지 않기 위해 보관)
+        self.last_documents = []
+        self.last_filters = {}
+        # 세션 사용자 프로필 (user_profile.py, 대화 기록 창과 무관하게 유지되며 프롬프트에는 들어가지 않음)
+        self.profile = {}
+
+    @property
+    def messages(self) -> list:
+        return [entry.message for entry in self._entries]
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    def add_messages(self, messages: list) -> None:
+        """메시지를 추가하고, 이전 답변을 줄인 뒤 토큰 예산/최대 메시지 수를 넘는 오래된 상호작용을 제거합니다."""
+        compressed = 0
+        for message in messages:
+            if message.type == "ai":
+                compressed += self._compress_latest_answer()
+                # 이번 답변에 쓴 문서 (retrieve_documents가 답변 생성 전에 last_documents를 갱신함)
+                refs = [(doc.metadata.get("plcyNo"), doc.metadata.get("plcyNm")) for doc in self.last_documents]
+                entry = _Entry(message, refs)
+                self._latest_answer = entry
+            else:
+                entry = _Entry(message)
+            self._entries.append(entry)
+            self._total_tokens += entry.tokens
+            self._baseline.append(entry.raw_tokens)
+
+        evicted = self._trim()
+        self.metrics.record(sum(self._baseline), self._total_tokens, compressed, evicted)
+
+    def _compress_latest_answer(self) -> int:
+        entry = self._latest_answer
+        self._latest_answer = None
+        if not self.compress_old_answers or entry is None or entry.tokens == 0:
+            return 0
+        content = compress_answer(entry.message.content, entry.policy_refs)
+        if content == entry.message.content:
+            return 0
+        tokens = message_tokens(content)
+        if tokens >= entry.tokens:
+            return 0
+        entry.message = AIMessage(content=content)
+        self._total_tokens += tokens - entry.tokens
+        entry.tokens = tokens
+        return 1
+
+    def _trim(self) -> int:
+        """
+        예산을 넘으면 가장 오래된 메시지부터 제거합니다. (마지막 상호작용은 예산을 넘어도 유지)
+        기록이 답변으로 시작하지 않도록 질문-답변 단위로 제거합니다.
+        """
+        evicted = 0
+        while len(self._entries) > 2 and (self._total_tokens > self.token_budget
+                                          or len(self._entries) > self.max_messages):
+            self._total_tokens -= self._entries.popleft().tokens
+            evicted += 1
+            while len(self._entries) > 2 and self._entries[0].message.type != "human":
+                self._total_tokens -= self._entries.popleft().tokens
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._baseline.clear()
+        self._total_tokens = 0
+        self._latest_answer = None
+
+
 store = {}
 
 
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    """세션 ID에 해당하는 Windowed Memory를 가져오거나 새로 생성합니다."""
+    """
+    세션 ID에 해당하는 대화 기록을 가져오거나 새로 생성합니다.
+    HISTORY_TOKEN_BUDGET이 0이면 기존 메시지 수 기준 창(WindowedInMemoryHistory)을 사용합니다.
+    """
     if session_id not in store:
-        store[session_id] = WindowedInMemoryHistory(k=MEMORY_K)
-    return store[session_id]
\ No newline at end of file
+        store[session_id] = TokenBudgetHistory() if HISTORY_TOKEN_BUDGET else WindowedInMemoryHistory(k=MEMORY_K)
+    return store[session_id]
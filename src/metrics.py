@@ -0,0 +1,141 @@
+"""
+체인 실행 지표 (프로세스 메모리)
+
+LLM 호출 단계(stage)별로 호출 수, 입력/캐시/출력 토큰 수를 모읍니다.
+- LangChain 모델 호출: UsageCallbackHandler가 응답의 usage_metadata에서 읽습니다.
+  (단계 이름은 model.with_config(tags=["stage:<이름>"])로 붙임)
+- OpenAI 클라이언트 직접 호출(create_filter_from_query): usage_metrics.record_openai_usage로 기록합니다.
+
+cached_tokens는 OpenAI가 프롬프트 접두사 캐시에서 읽은 입력 토큰 수입니다.
+(prompts.py 상단의 배치 원칙이 지켜지면 대화가 이어질수록 이 비율이 올라갑니다.)
+
+응답 체감 속도는 content_metrics에 모읍니다. (chat_events.stream_with_events가 기록)
+- TTFC: 요청 시작부터 화면에 처음 무언가(필터/후보 수/정책 카드/답변 토큰)가 나갈 때까지
+- 정책 카드: 요청 시작부터 정책 카드 이벤트까지
+- TTFT: 요청 시작부터 첫 답변 토큰까지 (중간 이벤트가 없던 이전 구조의 TTFC와 같음)
+
+사용법:
+    from metrics import usage_metrics
+    usage_metrics.summary()   # main.py의 GET /metrics
+"""
+import threading
+from collections import deque
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+
+STAGE_TAG_PREFIX = "stage:"
+
+
+class LLMUsageMetrics:
+    """단계별 LLM 토큰 사용량 누적 (여러 스레드에서 동시에 기록)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage: str, prompt_tokens: int = 0, cached_tokens: int = 0, completion_tokens: int = 0):
+        with self._lock:
+            entry = self._stages.setdefault(
+                stage, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+            )
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens or 0
+            entry["cached_tokens"] += cached_tokens or 0
+            entry["completion_tokens"] += completion_tokens or 0
+
+    def record_openai_usage(self, stage: str, usage):
+        """openai 응답 객체의 usage(CompletionUsage)를 기록합니다. usage가 없으면 무시합니다."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.record(
+            stage,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0),
+            cached_tokens=getattr(details, "cached_tokens", 0) if details else 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0),
+        )
+
+    def summary(self) -> dict:
+        """단계별 누적값과 캐시 적중 비율(cached_tokens / prompt_tokens)을 반환합니다."""
+        with self._lock:
+            stages = {stage: dict(entry) for stage, entry in self._stages.items()}
+        for entry in stages.values():
+            entry["cache_hit_ratio"] = round(entry["cached_tokens"] / entry["prompt_tokens"], 3) \
+                if entry["prompt_tokens"] else 0.0
+        return stages
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+usage_metrics = LLMUsageMetrics()
+
+
+class ContentLatencyMetrics:
+    """요청별 TTFC / 정책 카드 / TTFT 지연시간(초)의 최근 표본"""
+
+    FIELDS = ("ttfc", "policies", "ttft")
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._samples = {field: deque(maxlen=window) for field in self.FIELDS}
+
+    def record(self, **timings):
+        with self._lock:
+            for field, seconds in timings.items():
+                if seconds is not None:
+                    self._samples[field].append(seconds)
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {field: np.asarray(values, dtype=np.float64) for field, values in self._samples.items()}
+        result = {}
+        for field, values in samples.items():
+            if values.size:
+                p50, p95 = np.percentile(values, [50, 95])
+                result[field] = {"count": int(values.size), "p50_ms": round(p50 * 1000), "p95_ms": round(p95 * 1000)}
+        return result
+
+
+content_metrics = ContentLatencyMetrics()
+
+
+def _stage_from_tags(tags) -> str:
+    for tag in tags or []:
+        if tag.startswith(STAGE_TAG_PREFIX):
+            return tag[len(STAGE_TAG_PREFIX):]
+    return "unknown"
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """ChatOpenAI 응답의 토큰 사용량(캐시 토큰 포함)을 usage_metrics에 기록합니다."""
+
+    def __init__(self, metrics: LLMUsageMetrics = None):
+        self.metrics = metrics or usage_metrics
+
+    def on_llm_end(self, response, **kwargs):
+        stage = _stage_from_tags(kwargs.get("tags"))
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) if message is not None else None
+                if usage:
+                    self.metrics.record(
+                        stage,
+                        prompt_tokens=usage.get("input_tokens", 0),
+                        cached_tokens=(usage.get("input_token_details") or {}).get("cache_read", 0),
+                        completion_tokens=usage.get("output_tokens", 0),
+                    )
+                    return
+
+        # 스트리밍이 아니고 usage_metadata가 없는 경우 llm_output의 token_usage 사용
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if token_usage:
+            self.metrics.record(
+                stage,
+                prompt_tokens=token_usage.get("prompt_tokens", 0),
+                cached_tokens=(token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+                completion_tokens=token_usage.get("completion_tokens", 0),
+            )
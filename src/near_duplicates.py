@@ -0,0 +1,311 @@
+"""
+지역별 변형 정책(근사 중복) 묶기 - MinHash/LSH (색인 시점) + 검색 결과 대표 정책 선택 (검색 시점)
+
+같은 월세 지원 사업을 수십 개 시/군/구가 거의 같은 문구로 등록하기 때문에,
+semantic_search 상위 k개를 같은 사업의 변형들이 차지하고 format_docs의 context도 불필요하게 커집니다.
+
+색인 시점 (assign_duplicate_clusters / python near_duplicates.py --apply)
+1. pre_processing이 만든 document 텍스트에서 지역명(region_hierarchy의 시/도, 시/군/구)을 같은 기호로 바꾸고
+   공백을 없앤 뒤 글자 NEAR_DUP_SHINGLE개 단위 shingle을 numpy로 해싱 (지역명만 다른 변형이 같은 shingle을 갖도록)
+2. NEAR_DUP_NUM_PERM개의 해시 함수로 MinHash 서명 계산
+3. 서명을 NEAR_DUP_BANDS개 밴드로 나눈 LSH 버킷에서 후보 쌍을 찾고,
+   서명 일치 비율(추정 Jaccard)이 NEAR_DUP_THRESHOLD 이상인 쌍만 union-find로 묶음
+4. 묶음마다 지역 코드(zipCd)가 가장 많은 정책(같으면 plcyNo가 작은 정책)을 대표로 정하고,
+   묶인 정책의 metadata에 dupClusterId(대표 plcyNo)를 저장 (혼자인 정책은 저장하지 않음)
+
+검색 시점 (collapse_near_duplicates)
+- 같은 dupClusterId의 문서는 하나만 남깁니다. 사용자 지역 코드와 zipCd가 겹치는 변형이 있으면 그중 순위가 가장 높은 것,
+  없으면 순위가 가장 높은 것을 남기고, 묶음의 최고 순위 자리에 둡니다.
+
+사용법:
+    python near_duplicates.py --csv ../data/policies_with_documents_final2.csv   # 묶음 통계 + 처리량
+    python near_duplicates.py --apply                                          # 활성 컬렉션 metadata에 dupClusterId 기록
+    python near_duplicates.py --synthetic 20000                                # 정책 데이터로 만든 가상 변형 코퍼스 처리량
+"""
+import argparse
+import json
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from config import (VDB_DIRECTORY, NEAR_DUP_COLLAPSE, NEAR_DUP_THRESHOLD, NEAR_DUP_NUM_PERM, NEAR_DUP_BANDS,
+                    NEAR_DUP_SHINGLE)
+
+CLUSTER_FIELD = "dupClusterId"
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_ROLLING_BASE = np.uint64(1_000_003)
+_MASK_32 = np.uint64(0xFFFFFFFF)
+_REGION_SUFFIXES = ("특별자치시", "특별자치도", "특별시", "광역시")
+_region_pattern = None
+
+
+def _region_name_pattern():
+    """지역 계층 파일의 시/도(및 '서울' 같은 약칭), 시/군/구 이름 정규식. 파일이 없으면 None."""
+    global _region_pattern
+    if _region_pattern is None:
+        from region_loader import get_region_hierarchy
+
+        hierarchy = get_region_hierarchy()
+        if hierarchy is None:
+            _region_pattern = False
+        else:
+            names = set()
+            for _, sido, sigungu in hierarchy.rows:
+                names.add(sido)
+                for suffix in _REGION_SUFFIXES:
+                    if sido.endswith(suffix) and len(sido) - len(suffix) >= 2:
+                        names.add(sido[:-len(suffix)])
+                if sigungu:
+                    names.update(sigungu.split())
+            _region_pattern = re.compile("|".join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+    return _region_pattern or None
+
+
+def mask_regions(text: str) -> str:
+    pattern = _region_name_pattern()
+    return pattern.sub("◇", text) if pattern is not None else text
+
+
+class MinHasher:
+    """글자 shingle 집합의 MinHash 서명 계산기 (해시 함수: (a * x + b) mod (2^31 - 1))"""
+
+    def __init__(self, num_perm: int = NEAR_DUP_NUM_PERM, shingle_size: int = NEAR_DUP_SHINGLE, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """지역명을 가리고 공백을 없앤 텍스트의 연속 글자 shingle을 32비트 롤링 해시 배열(중복 제거)로 만듭니다."""
+        compact = "".join(mask_regions(str(text or "")).split())
+        codes = np.frombuffer(compact.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        size = self.shingle_size
+        if codes.size < size:
+            return np.unique(codes) if codes.size else np.zeros(1, dtype=np.uint64)
+        hashes = np.zeros(codes.size - size + 1, dtype=np.uint64)
+        for offset in range(size):
+            hashes = (hashes * _ROLLING_BASE + codes[offset:offset + hashes.size]) & _MASK_32
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingle_hashes(text) % _MERSENNE_PRIME
+        permuted = (self.a[:, None] * shingles[None, :] + self.b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: list) -> np.ndarray:
+        return np.stack([self.signature(text) for text in texts]) if texts else \
+            np.zeros((0, self.num_perm), dtype=np.uint32)
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands: int = NEAR_DUP_BANDS) -> set:
+    """
+    밴드별 서명 조각이 같은 문서 쌍 (i < j)을 반환합니다.
+    한 버킷에 변형이 수백 개 모여도 쌍이 제곱으로 늘지 않도록, 버킷 안에서는 (첫 문서, 각 문서)와
+    (바로 앞 문서, 각 문서) 쌍만 만듭니다. (union-find로 묶으므로 전이적으로 같은 묶음이 됨)
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        chunk = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i, key in enumerate(chunk.view(np.dtype((np.void, chunk.dtype.itemsize * rows))).ravel()):
+            buckets[key.tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(1, len(members)):
+                pairs.add((members[0], members[x]))
+                pairs.add((members[x - 1], members[x]))
+    return pairs
+
+
+def _find(parent: list, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _region_count(metadata: dict) -> int:
+    return len([code for code in str(metadata.get("zipCd") or "").split(",") if code.strip()])
+
+
+def cluster_near_duplicates(policy_ids: list, texts: list, metadatas: list = None,
+                            threshold: float = NEAR_DUP_THRESHOLD, hasher: MinHasher = None,
+                            bands: int = NEAR_DUP_BANDS) -> tuple:
+    """
+    근사 중복 묶음을 계산합니다.
+
+    Returns:
+        ({plcyNo: 대표 plcyNo} (2개 이상 묶인 정책만), 단계별 처리 시간/통계 dict)
+    """
+    hasher = hasher or MinHasher()
+    metadatas = metadatas or [{} for _ in policy_ids]
+    stats = {"documents": len(policy_ids)}
+
+    started = time.perf_counter()
+    signatures = hasher.signatures(texts)
+    stats["minhash_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pairs = lsh_candidate_pairs(signatures, bands)
+    stats["lsh_seconds"] = time.perf_counter() - started
+    stats["candidate_pairs"] = len(pairs)
+
+    started = time.perf_counter()
+    parent = list(range(len(policy_ids)))
+    verified = 0
+    for i, j in pairs:
+        if np.mean(signatures[i] == signatures[j]) >= threshold:
+            verified += 1
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if root_i != root_j:
+                parent[root_j] = root_i
+    stats["verified_pairs"] = verified
+
+    members = defaultdict(list)
+    for i in range(len(policy_ids)):
+        members[_find(parent, i)].append(i)
+    cluster_of = {}
+    sizes = []
+    for group in members.values():
+        if len(group) < 2:
+            continue
+        representative = min(group, key=lambda i: (-_region_count(metadatas[i]), str(policy_ids[i])))
+        for i in group:
+            cluster_of[str(policy_ids[i])] = str(policy_ids[representative])
+        sizes.append(len(group))
+    stats["cluster_seconds"] = time.perf_counter() - started
+    stats["clusters"] = len(sizes)
+    stats["clustered_documents"] = int(sum(sizes))
+    stats["largest_cluster"] = max(sizes) if sizes else 0
+    total = stats["minhash_seconds"] + stats["lsh_seconds"] + stats["cluster_seconds"]
+    stats["docs_per_second"] = round(len(policy_ids) / total) if total else 0
+    return cluster_of, stats
+
+
+def assign_duplicate_clusters(docs: list) -> dict:
+    """색인 직전 Document 리스트의 metadata에 dupClusterId를 기록하고 통계를 반환합니다."""
+    policy_ids = [doc.metadata.get("plcyNo") for doc in docs]
+    cluster_of, stats = cluster_near_duplicates(policy_ids, [doc.page_content for doc in docs],
+                                                [doc.metadata for doc in docs])
+    for doc in docs:
+        cluster_id = cluster_of.get(str(doc.metadata.get("plcyNo")))
+        if cluster_id is not None:
+            doc.metadata[CLUSTER_FIELD] = cluster_id
+    print_stats(stats)
+    return stats
+
+
+def collapse_near_duplicates(docs: list, region_codes: list = None) -> list:
+    """
+    검색 결과에서 같은 묶음의 변형을 하나만 남깁니다. (순서 유지, 묶음의 최고 순위 자리에 배치)
+    사용자 지역 코드와 zipCd가 겹치는 변형이 있으면 그 변형을 남깁니다.
+    """
+    if not NEAR_DUP_COLLAPSE or not docs:
+        return docs
+    wanted = {str(code) for code in region_codes or []}
+    order, groups = [], {}
+    for doc in docs:
+        key = doc.metadata.get(CLUSTER_FIELD) or doc.metadata.get("plcyNo")
+        if key not in groups:
+            order.append(key)
+            groups[key] = []
+        groups[key].append(doc)
+
+    collapsed = []
+    for key in order:
+        group = groups[key]
+        chosen = group[0]
+        if wanted and len(group) > 1:
+            for doc in group:
+                if wanted & {code.strip() for code in str(doc.metadata.get("zipCd") or "").split(",")}:
+                    chosen = doc
+                    break
+        collapsed.append(chosen)
+
+    if len(collapsed) < len(docs):
+        print(f"--- [Near Duplicates] 검색 결과 {len(docs)}건 -> {len(collapsed)}건 (지역 변형 {len(docs) - len(collapsed)}건 묶음) ---")
+    return collapsed
+
+
+def apply_to_collection(collection_name: str, persist_directory: str = VDB_DIRECTORY, page_size: int = 1000) -> dict:
+    """기존 컬렉션의 document로 묶음을 계산해 metadata의 dupClusterId를 갱신합니다. (임베딩 재계산 없음)"""
+    from langchain_chroma import Chroma
+
+    collection = Chroma(collection_name=collection_name, persist_directory=persist_directory)._collection
+    ids, texts, metadatas = [], [], []
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(offset=offset, limit=page_size, include=["documents", "metadatas"])
+        ids.extend(page["ids"])
+        texts.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+
+    policy_ids = [metadata.get("plcyNo") for metadata in metadatas]
+    cluster_of, stats = cluster_near_duplicates(policy_ids, texts, metadatas)
+    updated_ids, updated_metadatas = [], []
+    for chroma_id, policy_id, metadata in zip(ids, policy_ids, metadatas):
+        cluster_id = cluster_of.get(str(policy_id))
+        if metadata.get(CLUSTER_FIELD) == cluster_id:
+            continue
+        metadata = {key: value for key, value in metadata.items() if key != CLUSTER_FIELD}
+        if cluster_id is not None:
+            metadata[CLUSTER_FIELD] = cluster_id
+        updated_ids.append(chroma_id)
+        updated_metadatas.append(metadata)
+    for i in range(0, len(updated_ids), page_size):
+        collection.update(ids=updated_ids[i:i + page_size], metadatas=updated_metadatas[i:i + page_size])
+    stats["updated"] = len(updated_ids)
+    print_stats(stats)
+    return stats
+
+
+def synthetic_corpus(size: int, path: str = "../data/policy_data.json", seed: int = 0) -> tuple:
+    """정책 데이터 문구에 지역명을 바꿔 넣은 가상 변형 코퍼스 (처리량 측정용)"""
+    with open(path, encoding="utf-8") as f:
+        policies = json.load(f)["result"]["youthPolicyList"]
+    regions = ["서울특별시 종로구", "부산광역시 해운대구", "대구광역시 수성구", "인천광역시 남동구", "광주광역시 북구",
+               "대전광역시 유성구", "경기도 성남시", "강원특별자치도 춘천시", "충청북도 청주시", "전라남도 목포시"]
+    rng = np.random.default_rng(seed)
+    policy_ids, texts = [], []
+    for i in range(size):
+        policy = policies[int(rng.integers(len(policies)))]
+        region = regions[int(rng.integers(len(regions)))]
+        texts.append(f"정책명은 '{region} {policy.get('plcyNm', '')}'입니다. 주관 기관은 {region}입니다. "
+                     f"{policy.get('plcyExplnCn', '')} {policy.get('plcySprtCn', '')} 문의번호 {i}")
+        policy_ids.append(f"SYN{i:08d}")
+    return policy_ids, texts
+
+
+def print_stats(stats: dict):
+    print(f"--- [Near Duplicates] 문서 {stats['documents']}건 -> 묶음 {stats['clusters']}개 "
+          f"(묶인 문서 {stats['clustered_documents']}건, 최대 {stats['largest_cluster']}건) ---")
+    print(f"    MinHash {stats['minhash_seconds'] * 1000:.0f}ms, LSH {stats['lsh_seconds'] * 1000:.0f}ms "
+          f"(후보 쌍 {stats['candidate_pairs']}, 확인 {stats['verified_pairs']}), "
+          f"묶기 {stats['cluster_seconds'] * 1000:.0f}ms -> {stats['docs_per_second']} docs/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=None, help="pre_processing 결과 CSV (document 열)")
+    parser.add_argument("--apply", action="store_true", help="활성 컬렉션 metadata에 dupClusterId 기록")
+    parser.add_argument("--synthetic", type=int, default=0, help="가상 변형 코퍼스 크기")
+    args = parser.parse_args()
+
+    if args.csv:
+        from indexing import create_documents_from_csv
+
+        documents = create_documents_from_csv(args.csv)
+        _, result = cluster_near_duplicates([d.metadata.get("plcyNo") for d in documents],
+                                            [d.page_content for d in documents], [d.metadata for d in documents])
+        print_stats(result)
+    if args.apply:
+        from index_lifecycle import get_active_collection_name
+
+        apply_to_collection(get_active_collection_name())
+    if args.synthetic:
+        ids, corpus = synthetic_corpus(args.synthetic)
+        _, result = cluster_near_duplicates(ids, corpus)
+        print_stats(result)
@@ -0,0 +1,246 @@
+"""
+시/도 단위 분할 컬렉션
+
+대부분의 정책은 zipCd로 특정 시/도에 묶여 있으므로, 전체 컬렉션과 별도로
+시/도별 파티션 컬렉션 + '전국' 파티션을 만들어 두고, 질문에서 추출한 지역에 해당하는
+파티션만 검색한 뒤 결과를 합칩니다.
+
+- 파티션은 전체 컬렉션에 이미 저장된 임베딩을 그대로 복사하므로 임베딩 API를 다시 호출하지 않습니다.
+- 여러 시/도에 걸친 정책은 해당 시/도 파티션마다 들어가고,
+  NATIONWIDE_SIDO_THRESHOLD 이상이거나 zipCd가 없으면 '전국' 파티션에 들어갑니다.
+- 지역 조건이 없는 질문은 기존처럼 전체 컬렉션을 사용합니다.
+- policy_sync.py/index_lifecycle.build_version은 refresh_region_partitions로 파티션을 다시 만듭니다.
+  (다시 만드는 동안에는 manifest가 없으므로 검색은 전체 컬렉션을 사용)
+
+사용법:
+    python partitions.py            # 파티션 생성
+    python partitions.py --bench    # 전체 컬렉션 대비 지연시간/재현율 비교
+"""
+import argparse
+import json
+import os
+import time
+
+from langchain_chroma import Chroma
+
+from config import COLLECTION_NAME, VDB_DIRECTORY, NATIONWIDE_SIDO_THRESHOLD, PARTITIONED_SEARCH
+from index_lifecycle import get_active_collection_name
+
+NATIONWIDE = "nationwide"
+
+
+def partition_collection_name(partition: str, collection_name: str = COLLECTION_NAME) -> str:
+    return f"{collection_name}__{partition}"
+
+
+def manifest_path(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, f"partitions_{collection_name}.json")
+
+
+def policy_partitions(zip_cd) -> list:
+    """zipCd('11110,11140,...')를 파티션 이름 목록(시/도 코드 앞 2자리 또는 nationwide)으로 바꿉니다."""
+    if not isinstance(zip_cd, str):
+        return [NATIONWIDE]
+    sido_codes = sorted({code.strip()[:2] for code in zip_cd.split(',') if code.strip()[:2].isdigit()})
+    if not sido_codes or len(sido_codes) >= NATIONWIDE_SIDO_THRESHOLD:
+        return [NATIONWIDE]
+    return sido_codes
+
+
+def build_region_partitions(collection_name: str = COLLECTION_NAME, persist_directory: str = VDB_DIRECTORY,
+                            batch_size: int = 500) -> dict:
+    """
+    전체 컬렉션을 페이지 단위로 읽어 파티션 컬렉션에 임베딩을 그대로 복사하고,
+    파티션별 문서 수를 manifest 파일로 저장합니다.
+    """
+    source = Chroma(collection_name=collection_name, persist_directory=persist_directory)
+    total = source._collection.count()
+    counts = {}
+    stores = {}
+
+    for offset in range(0, total, batch_size):
+        page = source._collection.get(
+            offset=offset, limit=batch_size, include=["embeddings", "metadatas", "documents"]
+        )
+        grouped = {}
+        for record_id, embedding, metadata, document in zip(
+                page["ids"], page["embeddings"], page["metadatas"], page["documents"]):
+            for partition in policy_partitions(metadata.get("zipCd")):
+                group = grouped.setdefault(partition, ([], [], [], []))
+                group[0].append(record_id)
+                group[1].append(embedding)
+                group[2].append(metadata)
+                group[3].append(document)
+
+        for partition, (ids, embeddings, metadatas, documents) in grouped.items():
+            if partition not in stores:
+                stores[partition] = Chroma(
+                    collection_name=partition_collection_name(partition, collection_name),
+                    persist_directory=persist_directory,
+                    collection_metadata=source._collection.metadata
+                )
+            stores[partition]._collection.upsert(
+                ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents
+            )
+            counts[partition] = counts.get(partition, 0) + len(ids)
+        print(f"{min(offset + batch_size, total)}/{total}개 문서 분할 완료")
+
+    # 서버가 mtime으로 manifest 변경을 감지하므로, 다 쓴 파일로만 교체합니다.
+    path = manifest_path(collection_name, persist_directory)
+    tmp_path = path + f".tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"collection": collection_name, "partitions": counts}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"✅ 파티션 생성 완료: {counts}")
+    return counts
+
+
+def drop_region_partitions(collection_name: str = COLLECTION_NAME, persist_directory: str = VDB_DIRECTORY) -> list:
+    """이 컬렉션의 파티션 컬렉션({컬렉션}__{파티션})을 모두 삭제하고 이름 목록을 반환합니다."""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    dropped = []
+    for collection in client.list_collections():
+        name = collection if isinstance(collection, str) else collection.name
+        if name.startswith(f"{collection_name}__"):
+            client.delete_collection(name)
+            dropped.append(name)
+    return dropped
+
+
+def refresh_region_partitions(collection_name: str = COLLECTION_NAME, persist_directory: str = VDB_DIRECTORY) -> dict:
+    """
+    동기화/새 버전 색인용. manifest가 있거나 PARTITIONED_SEARCH가 켜져 있으면 파티션을 처음부터 다시 만듭니다.
+    manifest를 먼저 지워 그동안 검색이 전체 컬렉션을 쓰게 하고, 기존 파티션 컬렉션을 지운 뒤 다시 복사합니다.
+    (upsert만 하면 삭제/종료된 정책과 지역이 바뀐 정책이 이전 파티션에 남음) 중간에 실패하면 manifest 없이 남습니다.
+    """
+    path = manifest_path(collection_name, persist_directory)
+    had_manifest = os.path.exists(path)
+    if not (had_manifest or PARTITIONED_SEARCH):
+        return {}
+    if had_manifest:
+        os.remove(path)
+    dropped = drop_region_partitions(collection_name, persist_directory)
+    print(f"--- [Partition] 파티션 재생성: {collection_name} (기존 {len(dropped)}개 삭제) ---")
+    return build_region_partitions(collection_name, persist_directory)
+
+
+_manifest_cache = {}  # path -> (mtime, partitions)
+
+
+def clear_manifest_cache() -> int:
+    count = len(_manifest_cache)
+    _manifest_cache.clear()
+    return count
+
+
+def load_partition_manifest(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY) -> dict:
+    """
+    파티션 manifest를 읽어 mtime이 바뀔 때까지 캐시합니다. 없으면 빈 dict를 반환합니다.
+    (없는 경우는 캐시하지 않으므로, 서버 실행 중에 파티션을 만들어도 다음 요청부터 사용합니다.)
+    """
+    path = manifest_path(collection_name, vdb_directory)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        _manifest_cache.pop(path, None)
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, encoding="utf-8") as f:
+            cached = (mtime, json.load(f).get("partitions", {}))
+        _manifest_cache[path] = cached
+    return cached[1]
+
+
+def route_partitions(region_codes: list, manifest: dict) -> list:
+    """지역 코드 목록에 해당하는 시/도 파티션 + 전국 파티션 중 실제로 존재하는 것만 반환합니다."""
+    partitions = {code[:2] for code in region_codes if code}
+    partitions.add(NATIONWIDE)
+    return sorted(p for p in partitions if p in manifest)
+
+
+def partitioned_vector_search(query_embedding: list, partitions: list, k: int, candidate_ids: list,
+                              embedding_model=None, collection_name: str = COLLECTION_NAME,
+                              persist_directory: str = VDB_DIRECTORY, with_scores: bool = False) -> list:
+    """
+    한 번 계산한 질의 임베딩으로 각 파티션을 검색하고, 거리 기준으로 합쳐 상위 k개 Document를 반환합니다.
+    여러 파티션에 중복 저장된 정책은 한 번만 포함됩니다. with_scores=True이면 (Document, 거리) 목록을 반환합니다.
+    """
+    scored = {}
+    for partition in partitions:
+        store = Chroma(
+            collection_name=partition_collection_name(partition, collection_name),
+            embedding_function=embedding_model,
+            persist_directory=persist_directory
+        )
+        results = store.similarity_search_by_vector_with_relevance_scores(
+            query_embedding, k=k, filter={'plcyNo': {'$in': candidate_ids}}
+        )
+        for doc, distance in results:
+            policy_id = doc.metadata.get('plcyNo')
+            if policy_id not in scored or distance < scored[policy_id][1]:
+                scored[policy_id] = (doc, distance)
+    merged = sorted(scored.values(), key=lambda item: item[1])[:k]
+    return merged if with_scores else [doc for doc, _ in merged]
+
+
+def run_benchmark(questions: list, k: int = 20):
+    """전체 컬렉션 검색을 기준으로 분할 검색의 지연시간과 recall@k를 비교합니다."""
+    from dotenv import load_dotenv
+    from langchain_openai import OpenAIEmbeddings
+    from database import get_related_region_codes, get_rdb_candidate_ids, get_thread_connection
+
+    load_dotenv()
+    collection_name = get_active_collection_name()
+    embedding_model = OpenAIEmbeddings(model="text-embedding-3-large")
+    full_store = Chroma(collection_name=collection_name, embedding_function=embedding_model,
+                        persist_directory=VDB_DIRECTORY)
+    manifest = load_partition_manifest(collection_name)
+
+    single_ms, partitioned_ms, recalls = [], [], []
+    for question, regions in questions:
+        candidate_ids = get_rdb_candidate_ids(get_thread_connection(), {"regions": regions})
+        if not candidate_ids:
+            continue
+        query_embedding = embedding_model.embed_query(question)
+
+        t0 = time.perf_counter()
+        single = full_store.similarity_search_by_vector(
+            query_embedding, k=k, filter={'plcyNo': {'$in': candidate_ids}}
+        )
+        single_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        partitions = route_partitions(get_related_region_codes(regions), manifest)
+        routed = partitioned_vector_search(query_embedding, partitions, k, candidate_ids, embedding_model,
+                                           collection_name=collection_name)
+        partitioned_ms.append((time.perf_counter() - t0) * 1000)
+
+        expected = {d.metadata.get('plcyNo') for d in single}
+        found = {d.metadata.get('plcyNo') for d in routed}
+        recalls.append(len(expected & found) / max(len(expected), 1))
+        print(f"{question} | 파티션 {partitions} | recall@{k} {recalls[-1]:.2f}")
+
+    if recalls:
+        print(f"\n평균 지연: 전체 컬렉션 {sum(single_ms) / len(single_ms):.1f}ms / "
+              f"분할 {sum(partitioned_ms) / len(partitioned_ms):.1f}ms")
+        print(f"평균 recall@{k}: {sum(recalls) / len(recalls):.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark([
+            ("월세 지원 정책 알려줘", ["서울특별시"]),
+            ("청년 창업 지원금", ["경기도"]),
+            ("대학생 장학금", ["부산광역시"]),
+            ("주거 대출 정책", ["강원특별자치도", "춘천시"]),
+            ("취업 지원 프로그램", ["전라남도", "목포시"]),
+        ])
+    else:
+        build_region_partitions(get_active_collection_name())
@@ -0,0 +1,292 @@
+"""
+정책 레코드 -> policies / 매핑 테이블 증분 적재 스크립트
+
+notebooks/experimental/RDB setting.ipynb의 ETL(df.to_sql(if_exists='replace'))을 대체합니다.
+
+1. 정책 레코드를 CSV(DictReader) 또는 API 응답 형식 JSON(result.youthPolicyList)에서 순서대로 읽어
+   batch_size개씩 DataFrame으로 묶습니다.
+2. 적재에 쓰이는 원본 필드로 정책별 내용 해시(pandas.util.hash_pandas_object, uint64)를 계산하고,
+   policy_load_state에 저장된 해시와 같은 정책은 건너뜁니다. (--full이면 전부 다시 적재)
+3. 바뀐 정책만 쉼표로 구분된 zipCd, jobCd, schoolCd, plcyMajorCd, sbizCd, 키워드/분류를
+   str.split + explode로 한 번에 펼쳐 매핑 행을 만듭니다.
+4. 배치마다 한 트랜잭션으로 policies upsert -> 매핑 행 삭제 후 executemany 삽입 -> 해시 갱신을 수행합니다.
+
+사용법:
+    python policy_loader.py --source ../data/policies_with_documents_final2.csv
+    python policy_loader.py --source ../data/policy_data.json --full
+    python policy_loader.py --bench --database toyprj4_bench   # 전체/증분 적재 시간 비교
+"""
+import argparse
+import csv
+import json
+import random
+import time
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+from config import DB_CONNECTION_INFO
+
+# 원본 필드 -> policies 컬럼
+POLICY_COLUMNS = {
+    "plcyNo": "policy_id",
+    "plcyNm": "policy_name",
+    "plcyExplnCn": "policy_summary",
+    "refUrlAddr1": "source_url",
+    "sprtTrgtMinAge": "min_age",
+    "sprtTrgtMaxAge": "max_age",
+    "earnMinAmt": "income_min",
+    "earnMaxAmt": "income_max",
+    "bizPrdBgngYmd": "biz_start_date",
+    "bizPrdEndYmd": "biz_end_date",
+    "mrgSttsCd": "marriage_status",
+    "aplyPrdSeCd": "application_status",
+}
+# 매핑 테이블: (테이블, 값 컬럼, 원본 필드)
+MAPPING_TABLES = [
+    ("policy_regions", "region_code", "zipCd"),
+    ("policy_job_status", "job_status_code", "jobCd"),
+    ("policy_education_levels", "education_level_code", "schoolCd"),
+    ("policy_majors", "major_code", "plcyMajorCd"),
+    ("policy_specializations", "specialization_code", "sbizCd"),
+    ("policy_categories", "category_name", "lclsfNm"),
+    ("policy_subcategories", "subcategory_name", "mclsfNm"),
+    ("policy_keywords", "keyword_name", "plcyKywdNm"),
+]
+# 내용 해시 계산에 사용하는 원본 필드 (이 필드가 바뀌지 않으면 DB에 다시 쓰지 않음)
+HASH_FIELDS = sorted(set(POLICY_COLUMNS) | {"aplyYmd"} | {field for _, _, field in MAPPING_TABLES})
+
+# database.ACTIVE_POLICY_CONDITIONS가 비교하는 application_status 값
+APPLICATION_STATUS_NAMES = {"57001": "특정 기간", "57002": "상시", "57003": "마감"}
+MARRIAGE_STATUS_NAMES = {"55001": "기혼", "55002": "미혼", "55003": "제한없음"}
+
+
+def iter_policy_records(path: str):
+    """CSV는 한 줄씩, API 응답 JSON은 youthPolicyList를 순서대로 돌려줍니다."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data.get("result", {}).get("youthPolicyList", [])
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def iter_batches(records, batch_size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+
+def content_hashes(frame: pd.DataFrame) -> pd.Series:
+    """정책별 원본 필드 내용 해시 (uint64). 필드 순서를 고정해 실행마다 같은 값을 냅니다."""
+    source = frame.reindex(columns=HASH_FIELDS).fillna("").astype(str).apply(lambda column: column.str.strip())
+    hashes = pd.util.hash_pandas_object(source, index=False).to_numpy()
+    return pd.Series(hashes, index=frame["plcyNo"].astype(str).str.strip())
+
+
+def _code_name(series: pd.Series, names: dict) -> pd.Series:
+    """'0057002', '57002.0' 같은 코드를 5자리로 맞춘 뒤 이름으로 바꿉니다."""
+    codes = pd.to_numeric(series, errors="coerce").astype("Int64").astype(str).str[-5:]
+    return codes.map(names)
+
+
+def _to_date(series: pd.Series) -> pd.Series:
+    return pd.to_datetime(series.fillna("").astype(str).str.strip(), format="%Y%m%d", errors="coerce")
+
+
+def build_policy_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """원본 레코드 DataFrame을 policies 테이블 행으로 변환합니다. (노트북 ETL과 같은 규칙)"""
+    policies = frame.reindex(columns=list(POLICY_COLUMNS)).rename(columns=POLICY_COLUMNS)
+    policies["policy_id"] = policies["policy_id"].astype(str).str.strip()
+
+    for column in ("min_age", "max_age", "income_min", "income_max"):
+        policies[column] = pd.to_numeric(policies[column], errors="coerce").replace(0, np.nan)
+    policies["biz_start_date"] = _to_date(policies["biz_start_date"])
+    policies["biz_end_date"] = _to_date(policies["biz_end_date"])
+
+    period = frame.reindex(columns=["aplyYmd"])["aplyYmd"].fillna("").astype(str).str.split("~", n=1, expand=True)
+    period = period.reindex(columns=[0, 1])
+    policies["aply_start_date"] = _to_date(period[0])
+    policies["aply_end_date"] = _to_date(period[1])
+
+    policies["marriage_status"] = _code_name(policies["marriage_status"], MARRIAGE_STATUS_NAMES)
+    policies["application_status"] = _code_name(policies["application_status"], APPLICATION_STATUS_NAMES)
+    return policies
+
+
+def explode_mappings(frame: pd.DataFrame) -> dict:
+    """
+    쉼표로 구분된 다중 값 필드를 (policy_id, 값) 행으로 펼칩니다.
+    정책마다 반복문을 돌지 않고 컬럼 단위 str.split + explode로 처리합니다.
+    """
+    ids = frame["plcyNo"].astype(str).str.strip()
+    mappings = {}
+    for table, value_column, field in MAPPING_TABLES:
+        values = frame.reindex(columns=[field])[field].fillna("").astype(str)
+        exploded = pd.Series(values.str.split(",").to_numpy(), index=ids).explode().str.strip()
+        exploded = exploded[exploded.notna() & (exploded != "")]
+        rows = pd.DataFrame({"policy_id": exploded.index, value_column: exploded.to_numpy()}).drop_duplicates()
+        mappings[table] = rows
+    return mappings
+
+
+def _plain(value):
+    """mysql-connector가 변환할 수 있는 파이썬 기본 타입으로 바꿉니다. (NaN/NaT -> None)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _records(frame: pd.DataFrame) -> list:
+    """DataFrame을 파라미터 튜플 리스트로 바꿉니다."""
+    return [tuple(_plain(v) for v in row) for row in frame.itertuples(index=False, name=None)]
+
+
+def load_stored_hashes(cursor) -> dict:
+    cursor.execute("SELECT policy_id, content_hash FROM policy_load_state")
+    return {policy_id: int(content_hash) for policy_id, content_hash in cursor.fetchall()}
+
+
+def write_batch(connection, policies: pd.DataFrame, mappings: dict, hashes: pd.Series, chunk_size: int = 5000):
+    """한 배치(바뀐 정책들)를 하나의 트랜잭션으로 적재합니다."""
+    policy_ids = policies["policy_id"].tolist()
+    placeholders = ", ".join(["%s"] * len(policy_ids))
+    columns = list(policies.columns)
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(
+            f"INSERT INTO policies ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = VALUES({c})" for c in columns if c != "policy_id"),
+            _records(policies)
+        )
+        for table, rows in mappings.items():
+            cursor.execute(f"DELETE FROM {table} WHERE policy_id IN ({placeholders})", policy_ids)
+            value_column = rows.columns[1]
+            records = _records(rows)
+            for i in range(0, len(records), chunk_size):
+                cursor.executemany(
+                    f"INSERT IGNORE INTO {table} (policy_id, {value_column}) VALUES (%s, %s)",
+                    records[i:i + chunk_size]
+                )
+        cursor.executemany(
+            "INSERT INTO policy_load_state (policy_id, content_hash, loaded_at) VALUES (%s, %s, NOW()) "
+            "ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash), loaded_at = VALUES(loaded_at)",
+            [(policy_id, int(hashes[policy_id])) for policy_id in policy_ids]
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def load_policies(connection, records, full: bool = False, batch_size: int = 1000) -> dict:
+    """
+    정책 레코드를 배치 단위로 적재하고 통계를 반환합니다.
+    full=False면 내용 해시가 바뀐(또는 새로 생긴) 정책만 씁니다.
+    """
+    cursor = connection.cursor()
+    stored = {} if full else load_stored_hashes(cursor)
+    cursor.close()
+
+    stats = {"read": 0, "written": 0, "mapping_rows": 0, "seconds": 0.0}
+    started = time.perf_counter()
+    for frame in iter_batches(records, batch_size):
+        frame = frame[frame["plcyNo"].notna()].drop_duplicates(subset="plcyNo", keep="last")
+        stats["read"] += len(frame)
+        hashes = content_hashes(frame)
+        changed = np.array([stored.get(pid) != int(h) for pid, h in hashes.items()], dtype=bool)
+        if not changed.any():
+            continue
+
+        frame = frame[changed]
+        policies = build_policy_rows(frame)
+        mappings = explode_mappings(frame)
+        write_batch(connection, policies, mappings, hashes)
+        stats["written"] += len(policies)
+        stats["mapping_rows"] += sum(len(rows) for rows in mappings.values())
+        print(f"  배치 적재: 읽음 {stats['read']} / 변경 {stats['written']}")
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    if stats["written"]:
+        # 같은 프로세스의 후보 집합 캐시 비움 (API 서버는 POST /admin/candidate-cache/invalidate)
+        from candidate_cache import invalidate_candidate_cache
+        invalidate_candidate_cache(f"정책 {stats['written']}건 적재")
+    return stats
+
+
+def _create_bench_schema(cursor, database: str):
+    """벤치마크 DB에 '테이블 생성 스크립트.sql'의 테이블을 새로 만듭니다."""
+    cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    cursor.execute(f"CREATE DATABASE `{database}`")
+    cursor.execute(f"USE `{database}`")
+    with open("../data/테이블 생성 스크립트.sql", encoding="utf-8") as f:
+        script = "".join(line for line in f if not line.lstrip().startswith("--"))
+    statements = [s.strip() for s in script.split(";")]
+    for statement in statements:
+        if statement.upper().startswith("CREATE TABLE"):
+            cursor.execute(statement)
+
+
+def run_benchmark(source: str, database: str, changed_ratio: float = 0.02, seed: int = 42):
+    """
+    같은 코퍼스로 1) 빈 DB 전체 적재 2) 변경 없는 증분 적재 3) 일부(changed_ratio) 변경 후 증분 적재
+    4) 해시 무시 전체 재적재 시간을 비교합니다. 운영 DB가 아닌 별도 DB(database)를 사용합니다.
+    """
+    info = dict(DB_CONNECTION_INFO)
+    if info.pop("database", None) == database:
+        raise ValueError(f"벤치마크는 운영 DB({database})가 아닌 별도 DB에서 실행해야 합니다.")
+    connection = mysql.connector.connect(**info)
+    cursor = connection.cursor()
+    _create_bench_schema(cursor, database)
+    cursor.close()
+
+    records = list(iter_policy_records(source))
+    rng = random.Random(seed)
+    modified = [dict(r) for r in records]
+    for record in rng.sample(modified, max(1, int(len(modified) * changed_ratio))):
+        record["plcyKywdNm"] = (record.get("plcyKywdNm") or "") + ",벤치마크"
+
+    results = [
+        ("전체 적재 (빈 DB)", load_policies(connection, records)),
+        ("증분 적재 (변경 없음)", load_policies(connection, records)),
+        (f"증분 적재 ({changed_ratio:.0%} 변경)", load_policies(connection, modified)),
+        ("전체 재적재 (--full)", load_policies(connection, modified, full=True)),
+    ]
+    connection.close()
+
+    print(f"\n=== 정책 {len(records)}건 적재 벤치마크 ({database}) ===")
+    for label, stats in results:
+        print(f"  {label:<22} {stats['seconds'] * 1000:8.0f}ms | 변경 정책 {stats['written']:5d} | "
+              f"매핑 행 {stats['mapping_rows']:6d}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default="../data/policies_with_documents_final2.csv")
+    parser.add_argument("--full", action="store_true", help="내용 해시를 무시하고 전부 다시 적재")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--database", default="toyprj4_bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(args.source, args.database)
+    else:
+        conn = mysql.connector.connect(**DB_CONNECTION_INFO)
+        try:
+            result = load_policies(conn, iter_policy_records(args.source), full=args.full, batch_size=args.batch_size)
+            print(f"✅ 정책 적재 완료: {result}")
+        finally:
+            conn.close()
@@ -0,0 +1,169 @@
+"""
+정책 원본 레코드 사이드 스토어 (Arrow IPC, memory-map)
+
+Chroma metadata에는 ID와 필터/재정렬에 쓰는 짧은 필드(SLIM_METADATA_FIELDS)만 두고,
+plcySprtCn, sbmsnDcmntCn, addAplyQlfcCndCn 같은 긴 서술형 필드를 포함한 전체 레코드는
+벡터 스토어 디렉토리의 Arrow IPC 파일(records_<컬렉션>.arrow)에 plcyNo 기준으로 저장합니다.
+
+- 파일은 압축 없이 저장해 memory-map으로 열기 때문에, 프로세스가 여러 개여도 OS 페이지 캐시를 공유합니다.
+- format_docs는 최종 top-k 문서에 대해서만 take() 한 번으로 레코드를 가져와 metadata를 채웁니다.
+- 사이드 스토어가 없으면(기존 컬렉션) 문서의 metadata를 그대로 사용합니다.
+
+사용법:
+    python policy_store.py --export   # 기존(전체 metadata) 컬렉션에서 사이드 스토어만 생성
+"""
+import argparse
+import json
+import os
+
+import pyarrow as pa
+from langchain_core.documents import Document
+
+from config import VDB_DIRECTORY, COLLECTION_NAME
+
+# Chroma metadata에 남기는 필드
+# - plcyNo, plcyNm: 식별/정책명 정확 일치/후속 질문 판별
+# - zipCd: 지역 파티션, frstRegDt/lastMdfcnDt: 신규/변경 정책 조회
+# - dupClusterId: 지역별 변형 정책 묶음 (near_duplicates.py)
+# - 나머지: eligibility.py 자격 요건 재정렬
+SLIM_METADATA_FIELDS = (
+    "plcyNo", "plcyNm", "zipCd", "aplyPrdSeCd", "frstRegDt", "lastMdfcnDt", "dupClusterId",
+    "sprtTrgtAgeLmtYn", "sprtTrgtMinAge", "sprtTrgtMaxAge", "earnMinAmt", "earnMaxAmt",
+    "mrgSttsCd", "jobCd", "schoolCd", "plcyMajorCd", "sbizCd",
+)
+# CSV에 값이 없을 때 들어가던 자리표시 값 (저장하지 않음)
+MISSING_VALUES = {"", "정보 없음", "nan", "None"}
+
+
+def policy_store_path(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, f"records_{collection_name}.arrow")
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value)
+    return None if value.strip() in MISSING_VALUES else value
+
+
+def slim_metadata(metadata: dict) -> dict:
+    """필터/재정렬용 필드만 남기고 빈 값은 뺍니다. (Chroma metadata 값은 None을 허용하지 않음)"""
+    slim = {}
+    for field in SLIM_METADATA_FIELDS:
+        value = _clean(metadata.get(field))
+        if value is not None:
+            slim[field] = value
+    return slim
+
+
+def split_policy_documents(docs: list) -> tuple:
+    """
+    전체 metadata를 가진 Document 리스트를
+    (slim metadata Document 리스트, 사이드 스토어에 저장할 전체 레코드 리스트)로 나눕니다.
+    """
+    slim_docs, records = [], []
+    for doc in docs:
+        slim_docs.append(Document(page_content=doc.page_content, metadata=slim_metadata(doc.metadata)))
+        records.append({key: _clean(value) for key, value in doc.metadata.items()})
+    return slim_docs, records
+
+
+def write_policy_store(records: list, path: str):
+    """레코드 리스트를 문자열 컬럼으로 된 Arrow IPC 파일로 저장합니다. (plcyNo 중복은 마지막 값 사용)"""
+    by_id = {str(record.get("plcyNo")): record for record in records if record.get("plcyNo")}
+    columns = sorted({key for record in by_id.values() for key in record})
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    table = pa.Table.from_pylist(list(by_id.values()), schema=schema)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    full_bytes = sum(len(json.dumps(r, ensure_ascii=False).encode()) for r in records)
+    slim_bytes = sum(len(json.dumps(slim_metadata(r), ensure_ascii=False).encode()) for r in records)
+    print(f"✅ 정책 레코드 저장 완료: {path} ({table.num_rows}건, {len(columns)}개 컬럼, "
+          f"{os.path.getsize(path) / 1024:.0f}KB)")
+    print(f"   레코드당 Chroma metadata: {full_bytes / max(len(records), 1):.0f}B -> "
+          f"{slim_bytes / max(len(records), 1):.0f}B")
+
+
+class PolicyStore:
+    """memory-map으로 연 Arrow 테이블 + plcyNo -> 행 번호 색인"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        self.row_of = {pid: i for i, pid in enumerate(self.table.column("plcyNo").to_pylist())}
+
+    def get_many(self, policy_ids: list) -> dict:
+        """plcyNo 목록에 해당하는 레코드를 take() 한 번으로 읽어 {plcyNo: 레코드}로 반환합니다. 빈 값은 제외합니다."""
+        rows = [self.row_of[str(p)] for p in policy_ids if str(p) in self.row_of]
+        if not rows:
+            return {}
+        records = self.table.take(pa.array(rows, type=pa.int32())).to_pylist()
+        return {
+            record["plcyNo"]: {key: value for key, value in record.items() if value is not None}
+            for record in records
+        }
+
+
+_loaded_stores = {}
+
+
+def clear_loaded_stores() -> int:
+    """열어 둔 사이드 스토어를 버립니다. 다음 조회 때 파일을 다시 엽니다. (버린 개수 반환)"""
+    count = len(_loaded_stores)
+    _loaded_stores.clear()
+    return count
+
+
+def get_policy_store(path: str = None):
+    """프로세스당 한 번만 사이드 스토어를 엽니다. 파일이 없으면 None을 반환합니다."""
+    if path is None:
+        from index_lifecycle import get_active_collection_name
+        path = policy_store_path(get_active_collection_name())
+    if path not in _loaded_stores:
+        _loaded_stores[path] = PolicyStore(path) if os.path.exists(path) else None
+    return _loaded_stores[path]
+
+
+def hydrate_documents(docs: list, store: PolicyStore = None) -> list:
+    """
+    slim metadata만 가진 Document에 사이드 스토어의 전체 레코드를 합쳐 새 Document 리스트로 반환합니다.
+    사이드 스토어가 없거나 레코드가 없는 문서는 그대로 둡니다.
+    """
+    store = store or get_policy_store()
+    if store is None or not docs:
+        return docs
+    records = store.get_many([doc.metadata.get('plcyNo') for doc in docs])
+    return [
+        Document(page_content=doc.page_content, metadata={**records.get(doc.metadata.get('plcyNo'), {}), **doc.metadata})
+        for doc in docs
+    ]
+
+
+def export_from_collection(collection_name: str, persist_directory: str = VDB_DIRECTORY, page_size: int = 1000):
+    """전체 metadata가 들어 있는 기존 컬렉션에서 사이드 스토어 파일만 만듭니다. (임베딩 API 호출 없음)"""
+    from langchain_chroma import Chroma
+
+    collection = Chroma(collection_name=collection_name, persist_directory=persist_directory)._collection
+    records = []
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(offset=offset, limit=page_size, include=["metadatas"])
+        records.extend({key: _clean(value) for key, value in metadata.items()} for metadata in page["metadatas"])
+    write_policy_store(records, policy_store_path(collection_name, persist_directory))
+
+
+if __name__ == '__main__':
+    from index_lifecycle import get_active_collection_name
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export", action="store_true")
+    args = parser.parse_args()
+
+    if args.export:
+        export_from_collection(get_active_collection_name())
+    else:
+        parser.print_help()
@@ -0,0 +1,459 @@
+"""
+정책 API 증분 동기화 (lastMdfcnDt 기준 delta + 종료 정책 정리)
+
+data/policy_data.json은 한 시점의 스냅샷(totCount 3867)이고, 끝난 정책은 get_rdb_candidate_ids가
+질의 때마다 다시 걸러냈습니다. 이 작업은 주기적으로 실행되어 다음을 수행합니다.
+
+1. API 응답 형식(result.youthPolicyList + result.pagging)으로 페이지를 넘기며 정책을 읽고,
+   동기화 상태 파일(벡터 스토어 디렉토리의 policy_sync_state.json)에 저장된 워터마크보다
+   lastMdfcnDt가 최신인 정책만 골라냅니다. (목록은 등록일 순이라 중간에 멈추지 않고 끝까지 읽음)
+2. 이미 끝난 정책(is_expired)은 적재하지 않고, 나머지는
+   - RDB: policy_loader.load_policies로 policies/매핑 테이블 upsert (내용 해시가 같으면 건너뜀)
+   - 벡터 스토어: document 문장이 그대로면 metadata만 갱신, 바뀌었거나 새 정책이면 다시 임베딩
+   - 사이드 스토어(records_<컬렉션>.arrow): 전체 레코드 갱신
+3. 사업 기간이 끝났거나, 신청 기간이 끝났거나, 마감된 정책을 RDB(SQL), 사이드 스토어, 이번 delta에서 모아
+   RDB 행/매핑 행/적재 해시와 벡터 스토어 문서를 삭제합니다. (질의 시 후보 조회/벡터 검색 대상에서 아예 빠짐)
+4. 바뀐 것이 있으면 벡터 스토어에서 다시 만들 수 있는 색인(근사 중복 묶음, BM25, 유사도 그래프, 축소 차원,
+   지역 분할 컬렉션)을 임베딩 API 호출 없이 다시 만들고, 후보 집합 캐시를 비웁니다.
+   --server를 주면 API 서버의 POST /admin/reload를 호출해 서버가 읽어 둔 색인/캐시도 새 파일로 바꿉니다.
+5. 읽은 정책의 최대 lastMdfcnDt를 새 워터마크로 저장합니다. (실패하면 저장하지 않아 다음 실행이 다시 시도)
+
+활성 컬렉션을 제자리에서 갱신하므로, 바뀐 것이 있으면 같은 이름으로 alias 파일을 다시 써서(index_lifecycle.mark_updated_in_place)
+실행 중인 서버의 모든 워커가 파생 색인/캐시를 버리고 다시 읽게 합니다. (--server는 그 워커 하나에 즉시 /admin/reload 호출)
+
+사용법:
+    python policy_sync.py --fixture ../data/policy_data.json --today 2025-07-20 --dry-run   # API 대신 로컬 파일
+    python policy_sync.py --since "2025-07-18 00:00:00"                                  # API (YOUTH_POLICY_API_KEY)
+    python policy_sync.py --every 60 --server http://localhost:8000                      # 60분마다 실행
+    (--server로 알릴 때 서버에 ADMIN_TOKEN이 설정되어 있으면 같은 ADMIN_TOKEN 환경 변수가 필요)
+"""
+import argparse
+import json
+import os
+import re
+import time
+import urllib.parse
+import urllib.request
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from config import (VDB_DIRECTORY, CODE_TABLE_FILE, POLICY_API_URL, POLICY_SYNC_PAGE_SIZE, POLICY_SYNC_STATE_FILE,
+                    POLICY_SYNC_PRUNE_EXPIRED, ADMIN_TOKEN_ENV, ADMIN_TOKEN_HEADER)
+
+# 끝난 정책 조건 (database.ACTIVE_POLICY_CONDITIONS 중 '이미 지난' 경우만, 시작 전인 정책은 남김)
+EXPIRED_POLICY_CONDITION = (
+    "(p.biz_end_day < %s OR p.application_status = '마감' "
+    "OR (p.application_status = '특정 기간' AND p.aply_end_day < %s))"
+)
+# document 문장 생성에 쓰는 코드 필드 (pre_processing.create_final_document)
+DOCUMENT_CODE_FIELDS = ("mrgSttsCd", "jobCd", "schoolCd", "plcyMajorCd")
+_DATE_PATTERN = re.compile(r"\d{8}")
+
+
+class FixturePolicySource:
+    """API 응답 형식 JSON 파일을 API처럼 페이지 단위로 돌려줍니다. (로컬 확인/테스트용)"""
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self.records = json.load(f).get("result", {}).get("youthPolicyList", [])
+
+    def fetch_page(self, page_num: int, page_size: int) -> tuple:
+        start = (page_num - 1) * page_size
+        return self.records[start:start + page_size], len(self.records)
+
+
+class ApiPolicySource:
+    """온통청년 청년정책 API. (정책 목록, 전체 건수)를 반환합니다."""
+
+    def __init__(self, api_key: str, url: str = POLICY_API_URL, timeout: float = 30.0):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+
+    def fetch_page(self, page_num: int, page_size: int) -> tuple:
+        query = urllib.parse.urlencode({"apiKeyNm": self.api_key, "pageNum": page_num,
+                                        "pageSize": page_size, "rtnType": "json"})
+        with urllib.request.urlopen(f"{self.url}?{query}", timeout=self.timeout) as response:
+            result = json.load(response).get("result", {})
+        return result.get("youthPolicyList", []), int(result.get("pagging", {}).get("totCount", 0))
+
+
+def iter_pages(source, page_size: int = POLICY_SYNC_PAGE_SIZE, max_pages: int = None):
+    """전체 건수(totCount)만큼 페이지를 넘기며 페이지별 정책 리스트를 돌려줍니다."""
+    page_num, total = 1, None
+    while total is None or (page_num - 1) * page_size < total:
+        if max_pages is not None and page_num > max_pages:
+            break
+        records, total = source.fetch_page(page_num, page_size)
+        if not records:
+            break
+        yield records
+        page_num += 1
+
+
+def sync_state_path(vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, POLICY_SYNC_STATE_FILE)
+
+
+def read_sync_state(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"watermark": None}
+
+
+def write_sync_state(path: str, state: dict):
+    """임시 파일에 쓴 뒤 os.replace로 교체합니다. (index_lifecycle.activate_version과 같은 방식)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _parse_ymd(value) -> date:
+    try:
+        return datetime.strptime(str(value).strip(), "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def is_expired(record: dict, today: date) -> bool:
+    """
+    사업 기간 종료일이 지났거나, 마감(57003)이거나, 특정 기간(57001) 정책의 신청 종료일이 지났으면 True.
+    신청 기간(aplyYmd)에 기간이 여러 개 적혀 있으면 가장 늦은 날짜를 종료일로 봅니다.
+    """
+    status = str(record.get("aplyPrdSeCd") or "").strip()[-5:]
+    if status == "57003":
+        return True
+    biz_end = _parse_ymd(record.get("bizPrdEndYmd"))
+    if biz_end is not None and biz_end < today:
+        return True
+    if status == "57001":
+        dates = [_parse_ymd(value) for value in _DATE_PATTERN.findall(str(record.get("aplyYmd") or ""))]
+        dates = [d for d in dates if d is not None]
+        if dates and max(dates) < today:
+            return True
+    return False
+
+
+def collect_delta(source, watermark: str = None, page_size: int = POLICY_SYNC_PAGE_SIZE,
+                  max_pages: int = None) -> tuple:
+    """워터마크보다 lastMdfcnDt가 최신인 정책 리스트와 (읽은 건수, 페이지 수, 최대 lastMdfcnDt)를 반환합니다."""
+    delta, latest = {}, watermark
+    read, pages = 0, 0
+    for records in iter_pages(source, page_size, max_pages):
+        pages += 1
+        for record in records:
+            read += 1
+            modified = str(record.get("lastMdfcnDt") or record.get("frstRegDt") or "")
+            if latest is None or modified > latest:
+                latest = modified
+            if watermark is None or modified > watermark:
+                delta[str(record.get("plcyNo")).strip()] = record
+    return list(delta.values()), {"read": read, "pages": pages, "latest": latest}
+
+
+def build_documents(records: list, code_maps: dict) -> list:
+    """
+    API 레코드로 색인 Document를 만듭니다. (pre_processing.create_final_document + indexing.create_metadata)
+    CSV로 읽었을 때와 같도록 빈 문자열은 NaN, 나이는 숫자, 코드는 앞자리 0을 뺀 형태로 맞춥니다.
+    """
+    from langchain_core.documents import Document
+    from indexing import create_metadata
+    from pre_processing import create_final_document
+    from utils import normalize_code
+
+    frame = pd.DataFrame(records).replace(r"^\s*$", np.nan, regex=True)
+    frame["plcySprtCn"] = frame.reindex(columns=["plcySprtCn"])["plcySprtCn"].fillna("")
+    for column in ("sprtTrgtMinAge", "sprtTrgtMaxAge"):
+        frame[column] = pd.to_numeric(frame.reindex(columns=[column])[column], errors="coerce")
+    for column in DOCUMENT_CODE_FIELDS:
+        if column in frame:
+            frame[column] = frame[column].map(
+                lambda codes: ",".join(normalize_code(code) for code in str(codes).split(",")) if pd.notna(codes) else codes
+            )
+    return [
+        Document(page_content=create_final_document(row, code_maps).strip(), metadata=create_metadata(record))
+        for (_, row), record in zip(frame.iterrows(), records)
+    ]
+
+
+def upsert_vector_documents(store, docs: list, batch_size: int = 200) -> dict:
+    """
+    문장이 그대로인 정책은 metadata만 갱신하고(임베딩 없음), 바뀌었거나 새 정책은 기존 문서를 지우고 다시 임베딩합니다.
+    새로 넣는 문서의 id는 plcyNo입니다.
+    """
+    from near_duplicates import CLUSTER_FIELD
+    from policy_store import split_policy_documents
+
+    collection = store._collection
+    slim_docs, _ = split_policy_documents(docs)
+    policy_ids = [doc.metadata["plcyNo"] for doc in slim_docs]
+    stored = {}
+    for i in range(0, len(policy_ids), batch_size):
+        existing = collection.get(where={"plcyNo": {"$in": policy_ids[i:i + batch_size]}},
+                                  include=["documents", "metadatas"])
+        for chroma_id, text, metadata in zip(existing["ids"], existing["documents"], existing["metadatas"]):
+            stored.setdefault(str(metadata.get("plcyNo")), []).append((chroma_id, text, metadata))
+
+    same_ids, same_metadatas, changed = [], [], []
+    for doc in slim_docs:
+        entries = stored.get(doc.metadata["plcyNo"], [])
+        if len(entries) == 1 and entries[0][1] == doc.page_content:
+            # 근사 중복 묶음은 rebuild_derived_indexes가 다시 계산할 때까지 기존 값 유지
+            cluster_id = entries[0][2].get(CLUSTER_FIELD)
+            same_ids.append(entries[0][0])
+            same_metadatas.append({**doc.metadata, CLUSTER_FIELD: cluster_id} if cluster_id else doc.metadata)
+        else:
+            changed.append(doc)
+
+    for i in range(0, len(same_ids), batch_size):
+        collection.update(ids=same_ids[i:i + batch_size], metadatas=same_metadatas[i:i + batch_size])
+    stale_ids = [entry[0] for doc in changed for entry in stored.get(doc.metadata["plcyNo"], [])]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    for i in range(0, len(changed), batch_size):
+        batch = changed[i:i + batch_size]
+        store.add_documents(documents=batch, ids=[doc.metadata["plcyNo"] for doc in batch])
+    return {"metadata_only": len(same_ids), "embedded": len(changed)}
+
+
+def delete_vector_documents(store, policy_ids: list) -> int:
+    if not policy_ids:
+        return 0
+    collection = store._collection
+    ids = collection.get(where={"plcyNo": {"$in": list(policy_ids)}}, include=[])["ids"]
+    if ids:
+        collection.delete(ids=ids)
+    return len(ids)
+
+
+def expired_rdb_policy_ids(connection, today: date) -> list:
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT p.policy_id FROM policies p WHERE {EXPIRED_POLICY_CONDITION}", (today, today))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def delete_rdb_policies(connection, policy_ids: list, chunk_size: int = 1000) -> int:
+    """정책 행, 매핑 행, 적재 해시를 한 트랜잭션으로 삭제합니다."""
+    from policy_loader import MAPPING_TABLES
+
+    if not policy_ids:
+        return 0
+    cursor = connection.cursor()
+    deleted = 0
+    try:
+        for i in range(0, len(policy_ids), chunk_size):
+            chunk = list(policy_ids[i:i + chunk_size])
+            placeholders = ", ".join(["%s"] * len(chunk))
+            for table, _, _ in MAPPING_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE policy_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM policy_load_state WHERE policy_id IN ({placeholders})", chunk)
+            cursor.execute(f"DELETE FROM policies WHERE policy_id IN ({placeholders})", chunk)
+            deleted += cursor.rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return deleted
+
+
+def update_policy_store(path: str, upserted: list, removed: set, today: date, prune: bool = True) -> set:
+    """
+    사이드 스토어 레코드를 갱신(upserted)/삭제(removed)하고 다시 씁니다.
+    prune이면 기존 레코드 중 이미 끝난 정책도 지우고 그 plcyNo 집합을 반환합니다. (벡터 스토어 정리 대상)
+    """
+    import pyarrow as pa
+    from policy_store import write_policy_store, _clean
+
+    records = {}
+    if os.path.exists(path):
+        for record in pa.ipc.open_file(pa.memory_map(path, "r")).read_all().to_pylist():
+            records[record["plcyNo"]] = {key: value for key, value in record.items() if value is not None}
+    expired = {policy_id for policy_id, record in records.items() if is_expired(record, today)} if prune else set()
+    for metadata in upserted:
+        records[str(metadata["plcyNo"])] = {key: _clean(value) for key, value in metadata.items()}
+    for policy_id in removed | expired:
+        records.pop(policy_id, None)
+    if records and (upserted or removed or expired):
+        write_policy_store(list(records.values()), path)
+    return expired
+
+
+def rebuild_derived_indexes(collection_name: str, vdb_directory: str = VDB_DIRECTORY, page_size: int = 1000):
+    """
+    벡터 스토어에 저장된 문서/임베딩으로 근사 중복 묶음, BM25 색인, 유사도 그래프, 축소 차원 색인(TWO_STAGE_SEARCH일 때),
+    지역 분할 컬렉션(manifest가 있거나 PARTITIONED_SEARCH일 때)을 다시 만듭니다.
+    """
+    from langchain_chroma import Chroma
+    from lexical_index import BM25Index, lexical_index_path
+    from near_duplicates import apply_to_collection
+    from similarity_graph import build_similarity_graph
+    from reduced_index import build_reduced_index_if_enabled
+    from partitions import refresh_region_partitions
+
+    apply_to_collection(collection_name, vdb_directory)
+    collection = Chroma(collection_name=collection_name, persist_directory=vdb_directory)._collection
+    records = []
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(offset=offset, limit=page_size, include=["documents", "metadatas"])
+        records.extend((metadata.get("plcyNo"), text, metadata.get("plcyNm"))
+                       for text, metadata in zip(page["documents"], page["metadatas"]))
+    BM25Index.build(records).save(lexical_index_path(collection_name, vdb_directory))
+    build_similarity_graph(collection_name, vdb_directory)
+    build_reduced_index_if_enabled(collection_name, vdb_directory)
+    refresh_region_partitions(collection_name, vdb_directory)
+
+
+def notify_server(server_url: str):
+    """
+    API 서버가 읽어 둔 파생 색인과 캐시(후보 캐시 포함)를 다시 읽게 합니다. (POST /admin/reload)
+    ADMIN_TOKEN 환경 변수가 있으면 X-Admin-Token 헤더로 함께 보냅니다.
+    """
+    token = os.environ.get(ADMIN_TOKEN_ENV)
+    request = urllib.request.Request(f"{server_url.rstrip('/')}/admin/reload", method="POST",
+                                     headers={ADMIN_TOKEN_HEADER: token} if token else {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            print(f"--- [Policy Sync] 서버 색인/캐시 다시 읽기: {response.status} ---")
+    except Exception as e:
+        print(f"⚠️ 서버 색인/캐시 다시 읽기 실패: {e}")
+
+
+def sync_policies(source, connection, store, collection_name: str, today: date = None,
+                  vdb_directory: str = VDB_DIRECTORY, prune: bool = POLICY_SYNC_PRUNE_EXPIRED,
+                  dry_run: bool = False, rebuild: bool = True, max_pages: int = None, since: str = None) -> dict:
+    """
+    증분 동기화를 한 번 실행하고 통계를 반환합니다.
+    dry_run이면 delta/정리 대상만 계산하고 RDB, 벡터 스토어, 상태 파일은 건드리지 않습니다. (connection/store는 None 가능)
+    상태 파일이 없으면 since(lastMdfcnDt 형식)를 워터마크로 쓰고, 그것도 없으면 전체를 delta로 봅니다.
+    (전체 delta여도 RDB는 내용 해시, 벡터 스토어는 문장 비교로 바뀐 정책만 다시 씀)
+    """
+    today = today or date.today()
+    state_path = sync_state_path(vdb_directory)
+    state = read_sync_state(state_path)
+    if state.get("watermark") is None and since:
+        state["watermark"] = since
+    started = time.perf_counter()
+
+    delta, fetched = collect_delta(source, state.get("watermark"), max_pages=max_pages)
+    expired_delta = [record for record in delta if is_expired(record, today)]
+    live = [record for record in delta if not is_expired(record, today)]
+    stats = {
+        "watermark": state.get("watermark"), "new_watermark": fetched["latest"], "pages": fetched["pages"],
+        "read": fetched["read"], "delta": len(delta), "live": len(live), "expired_in_delta": len(expired_delta),
+        "rdb_written": 0, "embedded": 0, "metadata_only": 0, "pruned_rdb": 0, "pruned_vectors": 0,
+    }
+    print(f"--- [Policy Sync] {fetched['pages']}페이지 {fetched['read']}건 읽음, "
+          f"워터마크({state.get('watermark')}) 이후 변경 {len(delta)}건 (종료 {len(expired_delta)}건) ---")
+    if dry_run:
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    from candidate_cache import invalidate_candidate_cache
+    from policy_loader import load_policies
+    from policy_store import policy_store_path
+
+    # 1) RDB: 적재 후 끝난 정책 삭제
+    removed = {str(record.get("plcyNo")).strip() for record in expired_delta}
+    if live:
+        stats["rdb_written"] = load_policies(connection, live)["written"]
+    if prune:
+        removed |= set(expired_rdb_policy_ids(connection, today))
+    stats["pruned_rdb"] = delete_rdb_policies(connection, sorted(removed))
+    if stats["pruned_rdb"] and not stats["rdb_written"]:
+        # load_policies는 적재한 행이 있을 때만 캐시를 비우므로 삭제만 있었던 경우 따로 비움
+        invalidate_candidate_cache(f"종료 정책 {stats['pruned_rdb']}건 삭제")
+
+    # 2) 벡터 스토어 + 사이드 스토어
+    docs = []
+    if live:
+        from pre_processing import load_maps_from_excel
+        docs = build_documents(live, load_maps_from_excel(CODE_TABLE_FILE) or {})
+        stats.update(upsert_vector_documents(store, docs))
+    removed |= update_policy_store(policy_store_path(collection_name, vdb_directory),
+                                   [doc.metadata for doc in docs], removed, today, prune)
+    stats["pruned_vectors"] = delete_vector_documents(store, sorted(removed))
+
+    if rebuild and (stats["embedded"] or stats["metadata_only"] or stats["pruned_vectors"]):
+        rebuild_derived_indexes(collection_name, vdb_directory)
+    if any(stats[key] for key in ("rdb_written", "pruned_rdb", "embedded", "metadata_only", "pruned_vectors")):
+        # 같은 이름으로 alias 파일을 다시 써서 실행 중인 서버의 모든 워커가 색인/캐시를 다시 읽게 함
+        from index_lifecycle import mark_updated_in_place
+        mark_updated_in_place(collection_name, vdb_directory, note="policy_sync 증분 동기화")
+
+    write_sync_state(state_path, {
+        "watermark": fetched["latest"],
+        "synced_at": datetime.now().isoformat(timespec="seconds"),
+        "last_run": {key: value for key, value in stats.items() if key not in ("watermark", "new_watermark")},
+    })
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def print_stats(stats: dict):
+    print(f"--- [Policy Sync] 변경 {stats['delta']}건 (적재 대상 {stats['live']}, 종료 {stats['expired_in_delta']}) | "
+          f"RDB 적재 {stats['rdb_written']} / 삭제 {stats['pruned_rdb']} | "
+          f"임베딩 {stats['embedded']} / metadata만 {stats['metadata_only']} / 벡터 삭제 {stats['pruned_vectors']} | "
+          f"{stats['seconds'] * 1000:.0f}ms ---")
+    print(f"    워터마크: {stats['watermark']} -> {stats['new_watermark']}")
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", help="API 대신 사용할 API 응답 형식 JSON 파일")
+    parser.add_argument("--today", type=date.fromisoformat, help="종료 판단 기준일 (기본: 오늘)")
+    parser.add_argument("--dry-run", action="store_true", help="delta와 종료 정책만 계산하고 쓰지 않음")
+    parser.add_argument("--no-prune", action="store_true")
+    parser.add_argument("--no-rebuild", action="store_true", help="근사 중복 묶음/BM25/유사도 그래프/축소 차원 색인 재생성 생략")
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--since", help="상태 파일이 없을 때의 워터마크 (예: '2025-07-17 12:00:00', 색인한 스냅샷 시점)")
+    parser.add_argument("--every", type=float, help="분 단위 반복 실행 간격 (없으면 한 번만 실행)")
+    parser.add_argument("--server", help="동기화 후 색인/캐시를 다시 읽게 할 API 서버 주소 (예: http://localhost:8000)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.fixture:
+        policy_source = FixturePolicySource(args.fixture)
+    else:
+        policy_source = ApiPolicySource(os.environ["YOUTH_POLICY_API_KEY"])
+
+    while True:
+        if args.dry_run:
+            result = sync_policies(policy_source, None, None, None, today=args.today, dry_run=True,
+                                   max_pages=args.max_pages, since=args.since)
+        else:
+            import mysql.connector
+            from langchain_chroma import Chroma
+            from langchain_openai import OpenAIEmbeddings
+            from config import DB_CONNECTION_INFO
+            from index_lifecycle import get_active_collection_name
+
+            name = get_active_collection_name()
+            vectorstore = Chroma(collection_name=name, persist_directory=VDB_DIRECTORY,
+                                 embedding_function=OpenAIEmbeddings(model="text-embedding-3-large"))
+            conn = mysql.connector.connect(**DB_CONNECTION_INFO)
+            try:
+                result = sync_policies(policy_source, conn, vectorstore, name, today=args.today,
+                                       prune=not args.no_prune, rebuild=not args.no_rebuild,
+                                       max_pages=args.max_pages, since=args.since)
+            finally:
+                conn.close()
+            if args.server and (result["rdb_written"] or result["pruned_rdb"] or result["embedded"]
+                                or result["metadata_only"] or result["pruned_vectors"]):
+                notify_server(args.server)
+        print_stats(result)
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
@@ -1,5 +1,11 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+# [프롬프트 배치 원칙 - 프롬프트 접두사(prefix) 캐싱]
+# OpenAI는 요청 앞부분이 이전 요청과 바이트 단위로 같으면(1024 토큰 이상) 그 부분을 캐시에서 읽습니다.
+# 따라서 모든 프롬프트는 [고정 system 프롬프트] -> [대화 기록] -> [이번 턴의 문서/질문] 순서로 두고,
+# system 프롬프트에는 {context}, {question} 같은 변수나 날짜/세션 값을 절대 넣지 않습니다.
+# 접두사가 유지되는지는 bench_prompt_prefix.py로 확인할 수 있습니다.
+
 SYSTEM_PROMPT = '''
 # ROLE
 당신은 제공된 [CONTEXT]문서와 [CHAT HISTORY]를 비판적으로 분석하여 사용자의 [USER'S QUERY]에 가장 정확하고 도움이 되는 답변을 생성하는 '정책 분석 전문 AI'입니다. 당신의 가장 중요한 임무는 관련 없는 정보를 걸러내는 '최종 품질 필터'역할을 수행하는 것입니다.
@@ -47,21 +53,197 @@ SYSTEM_PROMPT = '''
 # 2. **친절한 정책 비서처럼 자연스럽게 답변을 시작하세요.**
 # 3.위에서 지시된 '답변 형식'을 철저히 따라서,찾아낸 정책 정보를 명확하게 전달하는 데에만 집중하세요.
 # 4. **지역 관련 불확실성이 있는 경우 반드시 안내문을 포함하세요.**
+'''
 
-# CONTEXT
-{context}
+# 필터 허용 값 (필드 -> 값 목록). 프롬프트의 ALLOWED VALUES 절과 filter_validation의 검증이 모두 이 값을 사용합니다.
+FILTER_ALLOWED_VALUE_LISTS = {
+    "job_status": ["재직자", "자영업자", "미취업자", "프리랜서", "일용근로자", "(예비)창업자", "단기근로자",
+                   "영농종사자", "기타", "제한없음"],
+    "marriage_status": ["기혼", "미혼", "제한없음"],
+    "education_levels": ["고졸 미만", "고교 재학", "고졸 예정", "고교 졸업", "대학 재학", "대졸 예정", "대학 졸업",
+                         "석·박사", "기타", "제한없음"],
+    "majors": ["인문계열", "사회계열", "상경계열", "이학계열", "공학계열", "예체능계열", "농산업계열", "기타", "제한없음"],
+    "categories": ["일자리", "주거", "교육", "복지문화", "참여권리"],
+    "subcategories": ["취업", "재직자", "창업", "주택 및 거주지", "기숙사", "전월세 및 주거급여 지원", "미래역량강화",
+                      "교육비지원", "온라인교육", "취약계층 및 금융지원", "건강", "예술인지원", "문화활동", "청년참여",
+                      "정책인프라구축", "청년국제교류", "권익보호"],
+    "specializations": ["중소기업", "여성", "기초생활수급자", "한부모가정", "장애인", "농업인", "군인", "지역인재",
+                        "기타", "제한없음"],
+    "keywords": ["대출", "보조금", "바우처", "금리혜택", "교육지원", "맞춤형상담서비스", "인턴", "벤처", "중소기업",
+                 "청년가장", "장기미취업청년", "공공임대주택", "신용회복", "육아", "출산", "해외진출", "주거지원"],
+}
 
-# USER'S QUERY
-{question}
+# 필터 추출 프롬프트와 질의 이해 프롬프트(QUERY_UNDERSTANDING_SYSTEM_PROMPT)가 함께 쓰는 허용 값 / 필터 스키마
+# (모듈 로드 시 한 번만 만들어지는 고정 문자열이므로 프롬프트 캐시에 영향 없음)
+FILTER_ALLOWED_VALUES = "# ALLOWED VALUES\n" + "\n".join(
+    f"- '{field}': " + ", ".join(f'"{value}"' for value in values).join("[]")
+    for field, values in FILTER_ALLOWED_VALUE_LISTS.items()
+)
 
-# RESPONSE
-'''
+FILTER_JSON_SCHEMA = """{
+  "age": "number | null",
+  "income": "number | null",
+  "regions": ["string"],
+  "job_status": ["string"],
+  "marriage_status": "string | null",
+  "education_levels": ["string"],
+  "majors": ["string"],
+  "categories": ["string"],
+  "subcategories": ["string"],
+  "specializations": ["string"],
+  "keywords": ["string"]
+}"""
+
+# 필터 추출(create_filter_from_query) system 프롬프트. 호출마다 같은 문자열을 그대로 보내야 캐시됩니다.
+FILTER_EXTRACTION_SYSTEM_PROMPT = """
+# ROLE
+You are an expert at extracting key information for filtering South Korean youth policies from a user's query.
+
+# INSTRUCTION
+- Analyze the user's query and generate a JSON object that strictly follows the provided `JSON SCHEMA`.
+- CRITICAL: When extracting regions, you MUST normalize them to their full official administrative names. (e.g., "서울", "서울시" -> "서울특별시" / "경기" -> "경기도" / "부산" -> "부산광역시" / "성남" -> "성남시" / "종로" -> "종로구")
+- For fields with `ALLOWED VALUES`, you MUST choose from the provided list. If a user's term is a synonym, map it to the correct value (e.g., "실업자" -> "미취업").
+- If a value is not mentioned, use `null` for single values or an empty list `[]` for array values.
+- Do NOT make up values that are not in the `ALLOWED VALUES` list.
+- Output ONLY the JSON object.
+
+""" + FILTER_ALLOWED_VALUES + """
+
+
+# JSON SCHEMA
+""" + FILTER_JSON_SCHEMA + """
+
+# EXAMPLES
+---
+user_query: "서울 사는 25세 미취업자인데, 창업 지원금 좀 알아봐줘"
+{
+  "age": 25,
+  "income": null,
+  "regions": ["서울특별시"],
+  "job_status": ["미취업자", "(예비)창업자"],
+  "marriage_status": null,
+  "education_levels": [],
+  "majors": [],
+  "categories": ["일자리"],
+  "subcategories": ["창업"],
+  "specializations": [],
+  "keywords": ["보조금", "벤처"]
+}
+---
+user_query: "강원 춘천에 거주하는 고졸 학력으로 지원 가능한 주거 대출 정책 있어?"
+{
+  "age": null,
+  "income": null,
+  "regions": ["강원특별자치도", "춘천시"],
+  "job_status": [],
+  "marriage_status": null,
+  "education_levels": ["고교 졸업"],
+  "majors": [],
+  "categories": ["주거"],
+  "subcategories": ["주택 및 거주지", "기숙사", "전월세 및 주거급여 지원"],
+  "specializations": [],
+  "keywords": ["대출"]
+}
+---
+user_query: "목포에 사는 사람인데 석사 지원 정책같은거 있냐"
+{
+  "age": null,
+  "income": null,
+  "regions": ["전라남도", "목포시"],
+  "job_status": [],
+  "marriage_status": null,
+  "education_levels": ["석·박사"],
+  "majors": [],
+  "categories": [],
+  "subcategories": [],
+  "specializations": [],
+  "keywords": []
+}
+
+---
+user_query: "전국 단위로 지원해주는 청년 창업 정책 알려줘"
+{
+  "age": null,
+  "income": null,
+  "regions": [],
+  "job_status": ["(예비)창업자"],
+  "marriage_status": null,
+  "education_levels": [],
+  "majors": [],
+  "categories": ["일자리"],
+  "subcategories": ["창업"],
+  "specializations": [],
+  "keywords": []
+}
+"""
 
 contextualize_q_system_prompt = """Given a chat history and the latest user question \
 which might reference context in the chat history, formulate a standalone question \
 which can be understood without the chat history. Do NOT answer the question, \
 just reformulate it if needed and otherwise return it as is."""
 
+# 질의 이해(query_understanding.understand_query) system 프롬프트.
+# 질문 재작성(contextualize_q_system_prompt)과 필터 추출(FILTER_EXTRACTION_SYSTEM_PROMPT)을 한 번의 호출로 합친 것으로,
+# 같은 허용 값/스키마를 쓰고 변수 없이 고정되어 있어 대화 기록 앞까지 접두사 캐시가 적용됩니다.
+QUERY_UNDERSTANDING_SYSTEM_PROMPT = """
+# ROLE
+You are an expert at understanding questions about South Korean youth policies in a conversation.
+For the latest user message you produce (1) a standalone question and (2) the search filters for it.
+
+# INSTRUCTION
+## standalone_question
+- Given the chat history and the latest user question which might reference context in the chat history, \
+formulate a standalone question which can be understood without the chat history.
+- Do NOT answer the question, just reformulate it if needed and otherwise return it as is.
+- Keep every condition the user stated (region, age, job, marriage, education, income, topic) in the user's language.
+
+## filters
+- Extract the filters from the `standalone_question` (not from the latest message alone).
+- CRITICAL: When extracting regions, you MUST normalize them to their full official administrative names. (e.g., "서울", "서울시" -> "서울특별시" / "경기" -> "경기도" / "부산" -> "부산광역시" / "성남" -> "성남시" / "종로" -> "종로구")
+- For fields with `ALLOWED VALUES`, you MUST choose from the provided list. If a user's term is a synonym, map it to the correct value (e.g., "실업자" -> "미취업자").
+- If a value is not mentioned, use `null` for single values or an empty list `[]` for array values.
+- Do NOT make up values that are not in the `ALLOWED VALUES` list.
+
+## output
+- Output ONLY one JSON object that strictly follows the provided `JSON SCHEMA`.
+
+""" + FILTER_ALLOWED_VALUES + """
+
+
+# JSON SCHEMA
+{
+  "standalone_question": "string",
+  "filters": """ + FILTER_JSON_SCHEMA + """
+}
+
+# EXAMPLES
+---
+chat_history: []
+user_question: "서울 사는 25세 미취업자인데, 창업 지원금 좀 알아봐줘"
+{
+  "standalone_question": "서울 사는 25세 미취업자인데, 창업 지원금 좀 알아봐줘",
+  "filters": {
+    "age": 25, "income": null, "regions": ["서울특별시"], "job_status": ["미취업자", "(예비)창업자"],
+    "marriage_status": null, "education_levels": [], "majors": [], "categories": ["일자리"],
+    "subcategories": ["창업"], "specializations": [], "keywords": ["보조금", "벤처"]
+  }
+}
+---
+chat_history:
+  human: "강원 춘천에 사는 고졸인데 주거 지원 정책 알려줘"
+  ai: "춘천시 청년 월세 지원 사업을 추천드립니다. ..."
+user_question: "대출 상품도 있어?"
+{
+  "standalone_question": "강원 춘천에 사는 고졸 학력으로 지원 가능한 주거 대출 정책 있어?",
+  "filters": {
+    "age": null, "income": null, "regions": ["강원특별자치도", "춘천시"], "job_status": [],
+    "marriage_status": null, "education_levels": ["고교 졸업"], "majors": [], "categories": ["주거"],
+    "subcategories": ["주택 및 거주지", "기숙사", "전월세 및 주거급여 지원"], "specializations": [],
+    "keywords": ["대출"]
+  }
+}
+"""
+
 
 TEMPLATE_WITH_HISTORY = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT),
@@ -72,6 +254,8 @@ TEMPLATE_WITH_HISTORY = ChatPromptTemplate.from_messages([
 
 # [USER'S QUERY]
 {question}
+
+# RESPONSE
 """),
 ])
 
@@ -0,0 +1,91 @@
+"""
+질의 이해 단계 (질문 재작성 + 필터 추출을 한 번의 호출로)
+
+기존에는 검색 전에 모델을 두 번 호출했습니다.
+1. TEMPLATE_WITH_HISTORY_FOR_R로 대화 기록을 반영한 독립 질문 생성
+2. create_filter_from_query가 큰 필터 추출 system 프롬프트를 다시 보내 독립 질문에서 필터 JSON 추출
+understand_query는 QUERY_UNDERSTANDING_SYSTEM_PROMPT(같은 허용 값/스키마)로 한 번만 호출해
+{"standalone_question", "filters"}를 JSON으로 받고, 필터는 filter_validation.validate_filters로 로컬에서 정규화합니다.
+
+- 호출 정책: call_policy의 "query_understanding" 단계 (실패 시 원문 질문 + 빈 필터)
+- 모델: STAGE_MODEL_TIERS["query_understanding"]
+- 토큰 사용량: usage_metrics의 "query_understanding" 단계
+- 두 방식의 지연시간/토큰 비교: bench_query_understanding.py
+- config.QUERY_UNDERSTANDING_SINGLE_CALL로 chains.py에서 사용할 방식을 고릅니다.
+
+사용법:
+    result = understand_query(openai_client, chat_history, "대출 상품도 있어?")
+    result["standalone_question"], result["filters"]
+"""
+import json
+
+from openai import OpenAI
+
+from prompts import QUERY_UNDERSTANDING_SYSTEM_PROMPT
+from filter_validation import validate_filters
+from metrics import usage_metrics
+from call_policy import get_call_policy
+from llm_utils import stage_model
+
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+def history_to_openai_messages(chat_history: list) -> list:
+    """LangChain 메시지 리스트를 OpenAI chat.completions 형식으로 바꿉니다."""
+    return [{"role": _ROLES.get(message.type, "user"), "content": message.content} for message in chat_history or []]
+
+
+def parse_understanding(content: str, question: str) -> dict:
+    """
+    모델 응답 JSON을 {"standalone_question", "filters"}로 정리합니다.
+    독립 질문이 비어 있으면 원문 질문을, 필터는 검증/정규화한 값을 사용합니다.
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError) as e:
+        print(f"⚠️ 질의 이해 JSON 파싱 실패: {e} -> 원문 질문, 필터 없이 검색")
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    standalone_question = data.get("standalone_question")
+    if not isinstance(standalone_question, str) or not standalone_question.strip():
+        standalone_question = question
+    return {"standalone_question": standalone_question.strip(), "filters": validate_filters(data.get("filters"))}
+
+
+def understand_query(client: OpenAI, chat_history: list, question: str, model: str = None) -> dict:
+    """
+    대화 기록과 이번 질문으로 독립 질문과 필터를 한 번에 만듭니다.
+
+    Args:
+        client: 초기화된 OpenAI 클라이언트 객체
+        chat_history: 이전 대화 메시지 (LangChain BaseMessage 리스트)
+        question: 사용자의 이번 질문
+        model: 사용할 모델명. 없으면 STAGE_MODEL_TIERS["query_understanding"] 등급의 모델
+
+    Returns:
+        {"standalone_question": str, "filters": dict}
+        제한 시간 초과/서킷 열림/호출 오류 시에는 원문 질문과 빈 필터를 반환합니다.
+    """
+    policy = get_call_policy("query_understanding")
+
+    def request():
+        # 고정 system 프롬프트 -> 대화 기록 -> 이번 질문 순서 (prompts.py 배치 원칙)
+        return client.chat.completions.create(
+            model=model or stage_model("query_understanding"),
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": QUERY_UNDERSTANDING_SYSTEM_PROMPT},
+                *history_to_openai_messages(chat_history),
+                {"role": "user", "content": question},
+            ],
+            timeout=policy.deadline
+        )
+
+    response = policy.call(request, fallback=lambda: None, degraded="원문 질문, 필터 없이 검색")
+    if response is None:
+        return {"standalone_question": question, "filters": {}}
+
+    usage_metrics.record_openai_usage("query_understanding", getattr(response, "usage", None))
+    return parse_understanding(response.choices[0].message.content, question)
@@ -0,0 +1,360 @@
+"""
+축소 차원 임베딩 2단계 벡터 검색 (앞 차원 잘라 1차 검색 -> 전체 차원으로 재계산)
+
+text-embedding-3-large는 3072차원이라 벡터마다 12KB를 차지하고 거리 계산도 그만큼 무겁습니다.
+이 모델은 앞쪽 차원만 잘라 다시 정규화해도 쓸 수 있도록 학습되어 있으므로(dimensions 파라미터와 같은 방식),
+컬렉션에 이미 저장된 임베딩으로 다음 두 파일을 만듭니다. (임베딩 API 호출 없음)
+- vectors_<컬렉션>.npy: 전체 차원 float32 행렬. 조회 시 memory-map으로 열어 재계산할 행만 디스크에서 읽습니다.
+- reduced_<컬렉션>_<차원>[_int8].npz: 앞 REDUCED_DIMENSIONS 차원을 L2 정규화한 행렬
+  (REDUCED_QUANTIZE이면 행마다 최대 절댓값으로 나눈 int8 + 행별 scale)
+
+검색 순서 (retriever._vector_search / _scored_vector_search, 파티션 검색이 아닐 때)
+1. 질의 임베딩(전체 차원, 기존과 같은 한 번의 호출)의 앞 차원만 잘라 RDB 후보 행과 내적을 계산하고
+   상위 k * TWO_STAGE_OVERSAMPLE개를 고릅니다. (int8은 float32로 바꿔 계산, 질의는 양자화하지 않음)
+2. 고른 행만 전체 차원 벡터로 컬렉션과 같은 거리(hnsw:space, 기본 l2)를 다시 계산해 상위 k개를 반환합니다.
+   거리 단위가 Chroma 검색과 같으므로 retrieval_depth의 거리 기준(ADAPTIVE_SCORE_DROP 등)을 그대로 씁니다.
+3. Document는 plcyNo로 Chroma에서 가져옵니다. (HNSW 검색 없음)
+
+디스크 사용량은 줄지 않고 늘어납니다. Chroma는 전체 차원 벡터를 그대로 갖고 있고(임베딩 + HNSW 색인),
+vectors_<컬렉션>.npy가 같은 float32 사본을 하나 더 두므로 정책당 약 12KB + 축소 차원 행이 추가됩니다.
+줄어드는 것은 1차 검색의 계산량과 상주 메모리(축소 차원 행렬만 메모리에 올림)입니다. --bench 표에서 함께 비교합니다.
+
+파일이 없으면 기존 Chroma 검색을 사용합니다. TWO_STAGE_SEARCH가 켜져 있으면 색인/동기화(indexing.py, index_lifecycle.py,
+policy_sync.py) 때 함께 다시 만들고, 꺼져 있으면 만들지 않습니다. (이 스크립트로 직접 만드는 것은 설정과 무관)
+
+사용법:
+    python reduced_index.py --dims 256 --int8                       # 활성 컬렉션으로 생성
+    python reduced_index.py --bench --dims 128 256 512 1024         # recall@k / 지연시간 / 메모리 / 디스크 비교
+    python reduced_index.py --bench --synthetic 20000               # 컬렉션 없이 가상 벡터로 지연시간/메모리만 비교
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from config import (VDB_DIRECTORY, COLLECTION_NAME, REDUCED_DIMENSIONS, REDUCED_QUANTIZE, TWO_STAGE_OVERSAMPLE,
+                    TWO_STAGE_SEARCH)
+
+
+def full_vectors_path(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, f"vectors_{collection_name}.npy")
+
+
+def reduced_index_path(collection_name: str = COLLECTION_NAME, dims: int = REDUCED_DIMENSIONS,
+                       quantize: bool = REDUCED_QUANTIZE, vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, f"reduced_{collection_name}_{dims}{'_int8' if quantize else ''}.npz")
+
+
+def truncate(matrix: np.ndarray, dims: int) -> np.ndarray:
+    """앞 dims 차원만 남기고 행마다 다시 L2 정규화합니다."""
+    reduced = np.asarray(matrix, dtype=np.float32)[..., :dims]
+    norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+    return reduced / np.where(norms == 0, 1.0, norms)
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple:
+    """행마다 최대 절댓값을 127로 맞춘 int8 행렬과 행별 scale(float32)을 반환합니다."""
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales
+
+
+def distances(query: np.ndarray, vectors: np.ndarray, space: str = "l2") -> np.ndarray:
+    """Chroma와 같은 정의의 거리 (l2: 제곱 거리, cosine: 1 - 코사인, ip: 1 - 내적)"""
+    dots = vectors @ query
+    if space == "ip":
+        return 1.0 - dots
+    if space == "cosine":
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        return 1.0 - dots / np.where(norms == 0, 1.0, norms)
+    return (vectors * vectors).sum(axis=1) + float(query @ query) - 2.0 * dots
+
+
+class ReducedIndex:
+    """축소 차원 행렬(메모리) + 전체 차원 행렬(memory-map) + plcyNo -> 행 번호 색인"""
+
+    def __init__(self, policy_ids: np.ndarray, reduced: np.ndarray, scales: np.ndarray, full: np.ndarray,
+                 space: str = "l2"):
+        self.policy_ids = policy_ids
+        self.reduced = reduced          # (정책 수, 축소 차원) float32 또는 int8
+        self.scales = scales            # int8일 때 행별 scale, 아니면 None
+        self.full = full                # (정책 수, 전체 차원) float32, 보통 np.memmap
+        self.space = space
+        self.dims = reduced.shape[1]
+        self.row_of = {pid: i for i, pid in enumerate(policy_ids.tolist())}
+
+    @classmethod
+    def build(cls, policy_ids: list, embeddings: np.ndarray, dims: int = REDUCED_DIMENSIONS,
+              quantize: bool = REDUCED_QUANTIZE, space: str = "l2") -> "ReducedIndex":
+        full = np.asarray(embeddings, dtype=np.float32)
+        reduced = truncate(full, dims)
+        scales = None
+        if quantize:
+            reduced, scales = quantize_int8(reduced)
+        return cls(np.array(policy_ids, dtype=str), reduced, scales, full, space)
+
+    def index_arrays(self) -> dict:
+        """축소 차원 색인 파일(.npz)에 저장하는 배열"""
+        arrays = {"policy_ids": self.policy_ids, "reduced": self.reduced, "space": np.array(self.space)}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        return arrays
+
+    def save(self, path: str, full_path: str):
+        """
+        두 파일을 임시 파일에 다 쓴 뒤 os.replace로 교체합니다. (policy_store.write_policy_store와 같은 방식)
+        전체 차원 파일 -> 축소 차원 색인 순서로 교체하고, load는 두 파일의 행 수가 다르면 사용하지 않습니다.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = self.index_arrays()
+        full_tmp, tmp = f"{full_path}.tmp{os.getpid()}", f"{path}.tmp{os.getpid()}"
+        # 파일 객체로 쓰면 np.save/np.savez가 확장자를 덧붙이지 않음
+        with open(full_tmp, "wb") as f:
+            np.save(f, np.asarray(self.full, dtype=np.float32))
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(full_tmp, full_path)
+        os.replace(tmp, path)
+        print(f"✅ 축소 차원 색인 저장: {path} ({len(self.policy_ids)}건, {self.dims}차원 {self.reduced.dtype}, "
+              f"{self.memory_bytes() / 1024:.0f}KB / 전체 차원 {os.path.getsize(full_path) / 1024 / 1024:.1f}MB)")
+
+    @classmethod
+    def load(cls, path: str, full_path: str):
+        """두 파일을 읽습니다. 교체 도중이라 행 수가 서로 다르면 None을 반환합니다."""
+        data = np.load(path)
+        full = np.load(full_path, mmap_mode="r")
+        if full.shape[0] != len(data["policy_ids"]):
+            print(f"⚠️ 축소 차원 색인과 전체 차원 파일의 행 수가 달라 사용하지 않습니다: {path}")
+            return None
+        scales = data["scales"] if "scales" in data.files else None
+        return cls(data["policy_ids"], data["reduced"], scales, full, str(data["space"]))
+
+    def memory_bytes(self) -> int:
+        """프로세스 메모리에 올라가는 크기 (전체 차원 행렬은 memory-map이라 제외)"""
+        return int(self.reduced.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def _rows(self, candidate_ids) -> np.ndarray:
+        if candidate_ids is None:
+            return np.arange(len(self.policy_ids))
+        return np.fromiter((self.row_of[p] for p in candidate_ids if p in self.row_of), dtype=np.int64)
+
+    def first_stage(self, query: np.ndarray, rows: np.ndarray, n: int) -> np.ndarray:
+        """축소 차원 내적 상위 n개 행 번호 (순서 없음)"""
+        query = truncate(query, self.dims)
+        scores = self.reduced[rows].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        if n >= len(rows):
+            return rows
+        return rows[np.argpartition(-scores, n - 1)[:n]]
+
+    def search(self, query_embedding, candidate_ids: list = None, k: int = 5,
+               oversample: int = TWO_STAGE_OVERSAMPLE) -> list:
+        """후보 안에서 (plcyNo, 거리) 상위 k개를 거리 오름차순으로 반환합니다."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        rows = self._rows(candidate_ids)
+        if len(rows) == 0:
+            return []
+        shortlist = np.sort(self.first_stage(query, rows, max(k * oversample, k)))
+        rescored = distances(query, np.asarray(self.full[shortlist], dtype=np.float32), self.space)
+        order = np.argsort(rescored, kind="stable")[:k]
+        return [(str(self.policy_ids[shortlist[i]]), float(rescored[i])) for i in order]
+
+
+def read_collection_embeddings(collection_name: str, persist_directory: str = VDB_DIRECTORY,
+                               page_size: int = 1000) -> tuple:
+    """컬렉션의 (plcyNo 리스트, 임베딩 행렬, 거리 공간)을 읽습니다. 같은 plcyNo는 처음 것만 사용합니다."""
+    from langchain_chroma import Chroma
+
+    collection = Chroma(collection_name=collection_name, persist_directory=persist_directory)._collection
+    policy_ids, embeddings, seen = [], [], set()
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(offset=offset, limit=page_size, include=["embeddings", "metadatas"])
+        for embedding, metadata in zip(page["embeddings"], page["metadatas"]):
+            policy_id = str(metadata.get("plcyNo"))
+            if policy_id in seen:
+                continue
+            seen.add(policy_id)
+            policy_ids.append(policy_id)
+            embeddings.append(embedding)
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    return policy_ids, np.asarray(embeddings, dtype=np.float32), space
+
+
+def build_reduced_index(collection_name: str = COLLECTION_NAME, persist_directory: str = VDB_DIRECTORY,
+                        dims: int = REDUCED_DIMENSIONS, quantize: bool = REDUCED_QUANTIZE) -> ReducedIndex:
+    """
+    컬렉션에 저장된 임베딩으로 전체 차원 파일과 축소 차원 색인을 만들어 저장합니다.
+    Chroma의 전체 차원 벡터는 그대로 두므로 디스크에는 전체 차원 float32 사본이 하나 더 생깁니다.
+    """
+    policy_ids, embeddings, space = read_collection_embeddings(collection_name, persist_directory)
+    index = ReducedIndex.build(policy_ids, embeddings, dims, quantize, space)
+    index.save(reduced_index_path(collection_name, dims, quantize, persist_directory),
+               full_vectors_path(collection_name, persist_directory))
+    return index
+
+
+def build_reduced_index_if_enabled(collection_name: str = COLLECTION_NAME, persist_directory: str = VDB_DIRECTORY):
+    """
+    색인/동기화 스크립트용. TWO_STAGE_SEARCH가 켜져 있을 때만 색인을 만들고,
+    꺼져 있으면 이 컬렉션의 이전 색인 파일을 지워 나중에 켰을 때 오래된 색인이 쓰이지 않게 합니다.
+    """
+    if TWO_STAGE_SEARCH:
+        return build_reduced_index(collection_name, persist_directory)
+    stale = glob.glob(os.path.join(glob.escape(persist_directory), f"reduced_{glob.escape(collection_name)}_*.npz"))
+    stale.append(full_vectors_path(collection_name, persist_directory))
+    for path in stale:
+        if os.path.exists(path):
+            os.remove(path)
+    print("--- [Two-Stage] TWO_STAGE_SEARCH가 꺼져 있어 축소 차원 색인을 만들지 않습니다. ---")
+    return None
+
+
+_loaded_indexes = {}
+
+
+def clear_loaded_indexes() -> int:
+    """읽어 둔 색인을 버립니다. 다음 조회 때 파일을 다시 읽습니다. (버린 개수 반환)"""
+    count = len(_loaded_indexes)
+    _loaded_indexes.clear()
+    return count
+
+
+def get_reduced_index(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY):
+    """프로세스당 한 번만 색인 파일을 읽습니다. 파일이 없으면 None을 반환합니다."""
+    path = reduced_index_path(collection_name, vdb_directory=vdb_directory)
+    if path not in _loaded_indexes:
+        full_path = full_vectors_path(collection_name, vdb_directory)
+        if not (os.path.exists(path) and os.path.exists(full_path)):
+            print(f"⚠️ 축소 차원 색인 파일이 없어 Chroma 검색을 사용합니다: {path}")
+            _loaded_indexes[path] = None
+        else:
+            _loaded_indexes[path] = ReducedIndex.load(path, full_path)
+    return _loaded_indexes[path]
+
+
+def synthetic_embeddings(size: int, full_dims: int = 3072, topics: int = 200, seed: int = 0) -> np.ndarray:
+    """
+    앞 차원에 분산이 몰린 가상 임베딩 (주제 중심 + 잡음, 차원별 표준편차 ~ (i+1)^-0.25).
+    지연시간/메모리 비교용이며, recall 수치는 실제 임베딩과 다를 수 있습니다.
+    """
+    rng = np.random.default_rng(seed)
+    decay = (np.arange(1, full_dims + 1) ** -0.25).astype(np.float32)
+    centers = rng.standard_normal((topics, full_dims), dtype=np.float32) * decay
+    vectors = centers[rng.integers(0, topics, size)] + 1.0 * rng.standard_normal((size, full_dims),
+                                                                                  dtype=np.float32) * decay
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def directory_bytes(path: str) -> int:
+    """디렉토리 아래 파일 크기 합계"""
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def chroma_bytes(vdb_directory: str = VDB_DIRECTORY) -> int:
+    """Chroma가 쓰는 파일(chroma.sqlite3 + 세그먼트 디렉토리)의 크기 합계. 같은 디렉토리의 다른 컬렉션도 포함됩니다."""
+    total = 0
+    for entry in os.scandir(vdb_directory):
+        if entry.is_dir():
+            total += directory_bytes(entry.path)
+        elif entry.name.startswith("chroma.sqlite3"):
+            total += entry.stat().st_size
+    return total
+
+
+def run_benchmark(policy_ids: list, embeddings: np.ndarray, dims_list: list, k: int = 10, queries: int = 200,
+                  candidate_ratio: float = 1.0, oversample: int = TWO_STAGE_OVERSAMPLE, space: str = "l2",
+                  seed: int = 0, chroma_disk_bytes: int = None):
+    """
+    저장된 정책 임베딩 일부를 질의로 써서(자기 자신 제외) 전체 차원 정확 검색 대비
+    차원/양자화 설정별 recall@k, 질의당 지연시간, 상주 메모리, 디스크 사용량을 비교합니다.
+    디스크: '추가'는 이 설정에서 새로 생기는 vectors .npy + reduced .npz, '합계'는 여기에 Chroma 파일 크기(chroma_disk_bytes,
+    가상 벡터면 없음)를 더한 값입니다. Chroma의 전체 차원 벡터는 그대로 남으므로 디스크는 늘기만 합니다.
+    candidate_ratio < 1이면 질의마다 그 비율만큼 무작위 후보(RDB 후보 집합 역할) 안에서 검색합니다.
+    """
+    import tempfile
+
+    rng = np.random.default_rng(seed)
+    full = np.asarray(embeddings, dtype=np.float32)
+    ids = np.array(policy_ids, dtype=str)
+    query_rows = rng.choice(len(ids), size=min(queries, len(ids)), replace=False)
+    candidate_sets = []
+    for row in query_rows:
+        mask = rng.random(len(ids)) < candidate_ratio
+        mask[row] = False
+        candidate_sets.append(ids[mask].tolist())
+
+    def exact(row, candidates):
+        rows = np.fromiter((row_of[p] for p in candidates), dtype=np.int64)
+        d = distances(full[row], full[rows], space)
+        return {str(ids[rows[i]]) for i in np.argsort(d, kind="stable")[:k]}
+
+    row_of = {pid: i for i, pid in enumerate(ids.tolist())}
+    started = time.perf_counter()
+    truth = [exact(row, candidates) for row, candidates in zip(query_rows, candidate_sets)]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(query_rows)
+
+    workdir = tempfile.mkdtemp()
+    full_path = os.path.join(workdir, "vectors.npy")
+    np.save(full_path, full)
+    print(f"\n=== 2단계 검색 벤치마크: 정책 {len(ids)}건, 질의 {len(query_rows)}건, "
+          f"후보 비율 {candidate_ratio:.0%}, k={k}, 1단계 {k * oversample}건 재계산 ===")
+    def mb(size) -> str:
+        return "-" if size is None else f"{size / 1024 / 1024:.1f}MB"
+
+    full_disk = os.path.getsize(full_path)
+    base_disk = chroma_disk_bytes
+    print(f"{'설정':<16} {'recall@k':>9} {'ms/질의':>9} {'상주 메모리':>12} {'디스크 추가':>12} {'디스크 합계':>12}")
+    print(f"{'전체 ' + str(full.shape[1]) + ' float32':<16} {1.0:>9.3f} {exact_ms:>9.2f} "
+          f"{mb(full.nbytes):>12} {mb(0):>12} {mb(base_disk):>12}  (Chroma만)")
+
+    for dims in dims_list:
+        for quantize in (False, True):
+            built = ReducedIndex.build(ids.tolist(), full, dims, quantize, space)
+            index = ReducedIndex(built.policy_ids, built.reduced, built.scales, np.load(full_path, mmap_mode="r"),
+                                 space)
+            recalls = []
+            started = time.perf_counter()
+            results = [index.search(full[row], candidates, k, oversample)
+                       for row, candidates in zip(query_rows, candidate_sets)]
+            elapsed_ms = (time.perf_counter() - started) * 1000 / len(query_rows)
+            for expected, found in zip(truth, results):
+                recalls.append(len(expected & {p for p, _ in found}) / max(len(expected), 1))
+            index_path = os.path.join(workdir, f"reduced_{dims}_{quantize}.npz")
+            with open(index_path, "wb") as f:
+                np.savez(f, **index.index_arrays())
+            added = full_disk + os.path.getsize(index_path)
+            label = f"{dims} {'int8' if quantize else 'float32'}"
+            print(f"{label:<16} {np.mean(recalls):>9.3f} {elapsed_ms:>9.2f} "
+                  f"{mb(index.memory_bytes()):>12} {mb(added):>12} "
+                  f"{mb(None if base_disk is None else base_disk + added):>12}")
+
+
+if __name__ == '__main__':
+    from index_lifecycle import get_active_collection_name
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", type=int, nargs="+", default=[REDUCED_DIMENSIONS])
+    parser.add_argument("--int8", action="store_true", default=REDUCED_QUANTIZE)
+    parser.add_argument("--float32", dest="int8", action="store_false")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--synthetic", type=int, help="컬렉션 대신 가상 벡터 N개로 벤치마크")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidate-ratio", type=float, default=1.0)
+    parser.add_argument("--oversample", type=int, default=TWO_STAGE_OVERSAMPLE)
+    args = parser.parse_args()
+
+    if args.bench:
+        if args.synthetic:
+            vectors = synthetic_embeddings(args.synthetic)
+            ids_, space_ = [str(i) for i in range(len(vectors))], "l2"
+        else:
+            ids_, vectors, space_ = read_collection_embeddings(get_active_collection_name())
+        run_benchmark(ids_, vectors, args.dims, args.k, args.queries, args.candidate_ratio, args.oversample, space_,
+                      chroma_disk_bytes=None if args.synthetic else chroma_bytes())
+    else:
+        for dims_ in args.dims:
+            build_reduced_index(get_active_collection_name(), dims=dims_, quantize=args.int8)
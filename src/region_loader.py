@@ -0,0 +1,232 @@
+"""
+법정동 코드 파일 -> region_codes 적재 스크립트
+
+notebooks/util/시군구코드추출기.ipynb로 INSERT 문을 만들어 손으로 실행하던 과정을 대체합니다.
+
+1. data/법정동코드전체자료.txt(EUC-KR/CP949, 탭 구분)를 바이너리 청크 단위로 읽으면서
+   증분 디코더로 한 줄씩 풀어냅니다. (파일 전체를 메모리에 올리지 않음)
+2. '폐지' 코드는 건너뛰고, 앞 5자리(시/도 + 시/군/구) 단위로 처음 나온 행만 사용해
+   (code, sido, sigungu)를 만듭니다. (노트북과 같은 규칙)
+3. 임시 테이블에 executemany 배치로 넣은 뒤, 한 트랜잭션에서
+   region_codes에 upsert하고 새 파일에 없는 코드는 삭제합니다.
+   파싱 결과가 비었거나 기존 행 수보다 크게 줄었으면(REGION_MIN_ROW_RATIO) 잘못된 파일로 보고 적재하지 않습니다.
+   같은 파일로 몇 번을 실행해도 결과가 같고, 정부 파일이 갱신되면 그대로 다시 실행하면 됩니다.
+4. DB 적재가 성공한 뒤에만 시/도 -> 시/군/구 계층을 JSON(REGION_HIERARCHY_FILE)으로 저장합니다.
+   database.get_related_region_codes는 이 파일이 있으면 DB 조회 없이 메모리에서 지역 코드를 찾습니다.
+   DB 적재 전에 기존 계층 파일의 코드 수로도 같은 감소 검사를 하므로, 거부된 목록이 파일에만 반영되는 일이 없습니다.
+
+사용법:
+    python region_loader.py                # DB 적재 + 계층 파일 저장
+    python region_loader.py --dry-run      # 파싱 결과만 확인 (DB와 계층 파일은 그대로)
+    python region_loader.py --force        # 지역 코드 수가 크게 줄어도 적재 (행정구역 통폐합 확인 후)
+"""
+import argparse
+import codecs
+import json
+import os
+import re
+import time
+
+from config import REGION_CODE_FILE, REGION_HIERARCHY_FILE, REGION_MIN_ROW_RATIO
+
+EXISTING_STATUS = "존재"
+
+
+def iter_decoded_lines(path: str, encoding: str = "cp949", chunk_size: int = 64 * 1024):
+    """파일을 chunk_size 바이트씩 읽어 증분 디코딩하고, 줄 단위로 돌려줍니다. (CRLF 제거)"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            pending += decoder.decode(chunk, final=not chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line.rstrip("\r")
+            if not chunk:
+                break
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def parse_region_codes(lines) -> list:
+    """
+    법정동 코드 행에서 존재하는 시/도, 시/군/구 단위 (code, sido, sigungu) 목록을 만듭니다.
+    첫 줄(헤더)과 형식이 맞지 않는 줄은 건너뜁니다.
+    """
+    rows, seen = [], set()
+    for line in lines:
+        parts = line.split("\t")
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue
+        code_full, full_name, status = (part.strip() for part in parts)
+        if status != EXISTING_STATUS:
+            continue
+        code_prefix = code_full[:5]
+        if code_prefix in seen:
+            continue
+        name_parts = full_name.split()
+        rows.append((code_prefix, name_parts[0], name_parts[1] if len(name_parts) > 1 else None))
+        seen.add(code_prefix)
+    return rows
+
+
+class RegionHierarchy:
+    """시/도 -> 시/군/구 -> 지역 코드 계층 (검색 경로에서 DB 조회 없이 사용)"""
+
+    def __init__(self, rows: list):
+        self.rows = [tuple(row) for row in rows]
+        self.tree = {}
+        for code, sido, sigungu in self.rows:
+            node = self.tree.setdefault(sido, {"codes": [], "sigungu": {}})
+            if sigungu:
+                node["sigungu"].setdefault(sigungu, []).append(code)
+            else:
+                node["codes"].append(code)
+
+    def codes_for(self, region_names: list) -> list:
+        """
+        지역명 목록과 관련된 코드(시/도 및 하위 시/군/구)를 정렬해 반환합니다.
+        DB 조회(sido REGEXP OR sigungu REGEXP)와 같은 규칙으로 매칭합니다.
+        """
+        if not region_names:
+            return []
+        try:
+            pattern = re.compile("|".join(region_names))
+        except re.error:
+            pattern = re.compile("|".join(re.escape(name) for name in region_names))
+        return sorted({
+            code for code, sido, sigungu in self.rows
+            if pattern.search(sido) or (sigungu and pattern.search(sigungu))
+        })
+
+    def save(self, path: str = REGION_HIERARCHY_FILE):
+        # 임시 파일에 쓴 뒤 교체 (중간에 실패해도 기존 계층 파일 유지)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rows": self.rows, "tree": self.tree}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        print(f"✅ 지역 계층 저장 완료: {path} (시/도 {len(self.tree)}개, 코드 {len(self.rows)}개)")
+
+    @classmethod
+    def load(cls, path: str = REGION_HIERARCHY_FILE) -> "RegionHierarchy":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["rows"])
+
+
+_hierarchy = None
+
+
+def get_region_hierarchy(path: str = REGION_HIERARCHY_FILE):
+    """계층 파일을 프로세스당 한 번 읽습니다. 파일이 없으면 None을 반환합니다."""
+    global _hierarchy
+    if _hierarchy is None and os.path.exists(path):
+        _hierarchy = RegionHierarchy.load(path)
+    return _hierarchy
+
+
+def check_row_count(current: int, new: int, force: bool = False, source: str = "region_codes"):
+    """새 지역 코드 수가 기존(current) * REGION_MIN_ROW_RATIO보다 적으면 ValueError (force=True면 통과)"""
+    if not force and new < current * REGION_MIN_ROW_RATIO:
+        raise ValueError(
+            f"{source}의 지역 코드 수가 {current}개 -> {new}개로 크게 줄었습니다. "
+            f"파일을 확인한 뒤 --force로 다시 실행하세요."
+        )
+
+
+def load_region_codes(connection, rows: list, batch_size: int = 500, force: bool = False) -> dict:
+    """
+    임시 테이블에 배치로 넣은 뒤 region_codes에 upsert하고, 새 목록에 없는 코드는 삭제합니다.
+    한 트랜잭션으로 처리하므로 중간에 실패하면 기존 데이터가 그대로 유지됩니다.
+    rows가 비었거나 기존 행 수 * REGION_MIN_ROW_RATIO보다 적으면 삭제 단계가 region_codes를 비우지 않도록
+    ValueError로 중단합니다. (force=True면 줄어든 경우만 허용, 빈 목록은 항상 중단)
+    """
+    if not rows:
+        raise ValueError("파싱된 지역 코드가 없습니다. region_codes를 갱신하지 않습니다.")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM region_codes")
+        check_row_count(cursor.fetchone()[0], len(rows), force=force)
+
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS region_codes_staging")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE region_codes_staging ("
+            "code varchar(10) NOT NULL PRIMARY KEY, sido varchar(100) NOT NULL, sigungu varchar(100) DEFAULT NULL)"
+        )
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(
+                "INSERT INTO region_codes_staging (code, sido, sigungu) VALUES (%s, %s, %s)", rows[i:i + batch_size]
+            )
+
+        connection.commit()
+
+        # 여기부터 commit까지가 region_codes를 바꾸는 하나의 트랜잭션 (값이 같은 행은 변경 없음으로 처리)
+        cursor.execute(
+            "INSERT INTO region_codes (code, sido, sigungu) "
+            "SELECT code, sido, sigungu FROM region_codes_staging s "
+            "ON DUPLICATE KEY UPDATE sido = s.sido, sigungu = s.sigungu"
+        )
+        upserted = cursor.rowcount
+        cursor.execute(
+            "DELETE r FROM region_codes r LEFT JOIN region_codes_staging s ON r.code = s.code WHERE s.code IS NULL"
+        )
+        deleted = cursor.rowcount
+        connection.commit()
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS region_codes_staging")
+        return {"rows": len(rows), "upsert_rowcount": upserted, "deleted": deleted}
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def refresh_region_codes(path: str = REGION_CODE_FILE, dry_run: bool = False, force: bool = False) -> RegionHierarchy:
+    """
+    파일을 파싱해 region_codes를 갱신한 뒤 계층 파일을 저장합니다.
+    적재가 거부되면(빈 목록/크게 줄어든 목록) 계층 파일과 메모리의 계층은 바꾸지 않습니다.
+    dry_run이면 파싱 결과와 감소 검사 결과만 출력합니다.
+    """
+    global _hierarchy
+    started = time.perf_counter()
+    rows = parse_region_codes(iter_decoded_lines(path))
+    parsed_ms = (time.perf_counter() - started) * 1000
+    print(f"--- 법정동 코드 파싱: 시/도·시/군/구 {len(rows)}개 ({parsed_ms:.0f}ms) ---")
+    if not rows:
+        # 인코딩/형식이 바뀐 파일로 계층 파일까지 비우지 않도록 여기서 중단
+        raise ValueError(f"{path}에서 지역 코드를 찾지 못했습니다. 파일 형식을 확인하세요.")
+
+    hierarchy = RegionHierarchy(rows)
+    if os.path.exists(REGION_HIERARCHY_FILE):
+        # DB에 닿기 전에 기존 계층 파일 기준으로도 감소 검사
+        check_row_count(len(RegionHierarchy.load(REGION_HIERARCHY_FILE).rows), len(rows), force=force,
+                        source=REGION_HIERARCHY_FILE)
+    if dry_run:
+        print(f"--- [Dry Run] 시/도 {len(hierarchy.tree)}개, 코드 {len(rows)}개 (DB와 계층 파일은 변경하지 않음) ---")
+        return hierarchy
+
+    from database import get_db_connection, clear_region_code_cache
+
+    connection = get_db_connection()
+    try:
+        started = time.perf_counter()
+        result = load_region_codes(connection, rows, force=force)
+        print(f"✅ region_codes 갱신 완료: {result} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+    finally:
+        connection.close()
+
+    hierarchy.save()
+    _hierarchy = hierarchy
+    clear_region_code_cache()
+    return hierarchy
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=REGION_CODE_FILE)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--force", action="store_true", help="지역 코드 수가 크게 줄어도 적재")
+    args = parser.parse_args()
+
+    refresh_region_codes(args.file, dry_run=args.dry_run, force=args.force)
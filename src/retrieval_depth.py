@@ -0,0 +1,68 @@
+"""
+적응형 검색 깊이 (후보 수/점수 분포에 따라 k, fetch_k 조정)
+
+RDB 후보가 3건이든 3,000건이든 같은 k/fetch_k로 임베딩 + 벡터 검색을 하던 것을 다음 규칙으로 바꿉니다.
+
+1. 후보 수 <= k: 후보 전체가 어차피 결과이므로 임베딩/벡터 검색 없이 ID로 바로 가져옵니다.
+   (BM25 색인이 있으면 그 점수로만 순서를 정함)
+2. fetch_k = min(후보 수, max(요청 fetch_k, k, sqrt(후보 수) * ADAPTIVE_FETCH_SQRT_FACTOR), ADAPTIVE_FETCH_K_MAX)
+3. 반환 개수(깊이)는 점수 분포로 정합니다.
+   - 상위 k개 안에서 연속한 두 결과의 거리 차가 ADAPTIVE_SCORE_DROP보다 크면 거기서 자름 (ADAPTIVE_MIN_K개는 유지)
+   - 급락이 없고 k번째 뒤에도 거리 차가 ADAPTIVE_TIE_SPREAD 이내인 문서가 있으면 최대 k * 2개까지 함께 반환
+     (순위를 가를 근거가 없는 문서는 자격 요건 재정렬에서 판단)
+   - 그 동점 구간이 fetch_k 끝까지 이어지면, 같은 질의 임베딩으로 fetch_k를 넓혀 한 번 더 검색
+4. 하이브리드 검색(BM25 + 벡터)에서도 벡터 결과의 거리 분포로 3.의 깊이를 정하고, RRF로 합친 결과를 그 개수만큼 반환합니다.
+   (fetch_k 확장 재검색은 하지 않음, 결정은 "hybrid_" 접두사로 기록)
+
+모든 결정은 "--- [Adaptive Retrieval] {...} ---" 한 줄(JSON)로 출력하므로 로그를 모아 임계값을 조정하면 됩니다.
+"""
+import json
+import math
+
+from config import (ADAPTIVE_FETCH_K_MAX, ADAPTIVE_FETCH_SQRT_FACTOR, ADAPTIVE_TIE_SPREAD, ADAPTIVE_SCORE_DROP,
+                    ADAPTIVE_MIN_K)
+
+
+def log_decision(decision: str, **details):
+    print(f"--- [Adaptive Retrieval] {json.dumps({'decision': decision, **details}, ensure_ascii=False)} ---")
+
+
+def should_bypass(candidate_count: int, k: int) -> bool:
+    """후보 전체를 돌려줘도 k개를 넘지 않으면 벡터 검색이 필요 없습니다."""
+    return 0 < candidate_count <= k
+
+
+def scaled_fetch_k(candidate_count: int, k: int, fetch_k: int) -> int:
+    """후보 수에 맞춰 fetch_k를 정합니다. (k 이상, 후보 수와 ADAPTIVE_FETCH_K_MAX 이하)"""
+    scaled = max(fetch_k, k, math.ceil(math.sqrt(candidate_count) * ADAPTIVE_FETCH_SQRT_FACTOR))
+    return max(min(scaled, candidate_count, ADAPTIVE_FETCH_K_MAX), 1)
+
+
+def widened_fetch_k(fetch_k: int, candidate_count: int) -> int:
+    return min(fetch_k * 2, candidate_count, ADAPTIVE_FETCH_K_MAX)
+
+
+def choose_depth(distances: list, k: int, min_k: int = ADAPTIVE_MIN_K) -> tuple:
+    """
+    거리 오름차순 목록에서 반환할 문서 수와 그 근거를 정합니다.
+
+    Returns:
+        (문서 수, "score_drop" | "tie_extend" | "k")
+    """
+    limit = min(k, len(distances))
+    for i in range(max(min_k, 1), limit):
+        if distances[i] - distances[i - 1] > ADAPTIVE_SCORE_DROP:
+            return i, "score_drop"
+
+    if limit == 0:
+        return 0, "k"
+    boundary = distances[limit - 1]
+    depth = limit
+    while depth < min(len(distances), k * 2) and distances[depth] - boundary < ADAPTIVE_TIE_SPREAD:
+        depth += 1
+    return depth, ("tie_extend" if depth > limit else "k")
+
+
+def needs_wider_fetch(distances: list, k: int, fetch_k: int, depth: int) -> bool:
+    """동점 구간이 가져온 결과 끝까지 이어졌다면 fetch_k 밖에도 같은 점수대 문서가 남아 있을 수 있습니다."""
+    return len(distances) >= fetch_k and min(k, len(distances)) < depth == len(distances) < k * 2
@@ -1,7 +1,49 @@
-
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
-from config import COLLECTION_NAME, VDB_DIRECTORY
+from langchain_core.documents import Document
+
+from config import (VDB_DIRECTORY, HYBRID_SEARCH, RRF_K, PARTITIONED_SEARCH, ADAPTIVE_RETRIEVAL, CALL_POLICIES,
+                    TWO_STAGE_SEARCH)
+from lexical_index import get_lexical_index, lexical_index_path, reciprocal_rank_fusion
+from index_lifecycle import get_active_collection_name
+from partitions import load_partition_manifest, route_partitions, partitioned_vector_search
+from database import get_related_region_codes, get_rdb_candidate_ids, get_thread_connection
+from similarity_graph import get_similarity_graph, similarity_graph_path
+from reduced_index import get_reduced_index
+from singleflight import CoalescedEmbeddings
+from call_policy import PolicyEmbeddings, StageUnavailable
+from retrieval_depth import (log_decision, should_bypass, scaled_fetch_k, widened_fetch_k, choose_depth,
+                             needs_wider_fetch)
+
+
+def get_documents_by_ids(vectorstore: Chroma, policy_ids: list) -> list:
+    """plcyNo 목록에 해당하는 Document를 임베딩 호출 없이 가져와, 전달받은 순서대로 반환합니다."""
+    if not policy_ids:
+        return []
+    result = vectorstore.get(where={'plcyNo': {'$in': policy_ids}}, include=["documents", "metadatas"])
+    by_id = {
+        metadata.get('plcyNo'): Document(page_content=document, metadata=metadata)
+        for document, metadata in zip(result["documents"], result["metadatas"])
+    }
+    return [by_id[p] for p in policy_ids if p in by_id]
+
+
+def similar_policy_search(seed_ids: list, filters: dict, k: int = 5) -> list:
+    """
+    이전 답변의 정책(seed_ids)과 가까운 정책을 유사도 그래프에서 찾아 Document로 반환합니다.
+    신청 기간/지역 조건은 이전 턴의 필터로 RDB 후보를 다시 조회해 그대로 적용합니다.
+    그래프 파일이 없거나 결과가 없으면 빈 리스트를 반환하므로 호출하는 쪽에서 일반 검색으로 넘어가면 됩니다.
+    """
+    collection_name = get_active_collection_name()
+    graph = get_similarity_graph(similarity_graph_path(collection_name))
+    if graph is None or not seed_ids:
+        return []
+
+    candidate_ids = set(get_rdb_candidate_ids(get_thread_connection(), filters or {}))
+    neighbors = graph.similar(seed_ids, n=k, allowed_ids=candidate_ids)
+    vectorstore = Chroma(collection_name=collection_name, persist_directory=VDB_DIRECTORY)
+    return get_documents_by_ids(vectorstore, [policy_id for policy_id, _ in neighbors])
+
 
 def semantic_search(
         candidate_ids: list,
@@ -10,7 +52,9 @@ def semantic_search(
         vdb_directory: str,
         k: int = 5,
         fetch_k: int = 20,
-        lambda_mult: float = 1.0
+        lambda_mult: float = 1.0,
+        hybrid: bool = HYBRID_SEARCH,
+        with_path: bool = False
 ) -> list:
     '''
     전달받은 필터를 통해 사용자의 질문을 증강하고, 후보 인덱스 내에서만 R을 수행하여 검색 정확도를 높여 시멘틱 서칭을 수행하는 함수입니다.
@@ -22,9 +66,30 @@ def semantic_search(
         k (int, optional): 반환할 상위 검색 결과의 개수입니다. 기본값은 5입니다.
         fetch_k (int, optional): 유사도 검색을 위해 가져올 초기 결과의 개수입니다. 기본값은 20입니다.
         lambda_mult (float, optional): 재정렬(reranking) 시 사용되는 람다 값입니다. 기본값은 0.7입니다.
+        hybrid (bool, optional): BM25 색인이 있으면 벡터 결과와 RRF로 합칩니다. 기본값은 config.HYBRID_SEARCH입니다.
+        with_path (bool, optional): True이면 (문서 목록, 검색 경로)를 반환합니다. 검색 경로는 SEARCH_PATHS 중 하나입니다.
+
+    config.ADAPTIVE_RETRIEVAL이 켜져 있으면 후보 수와 점수 분포에 따라 k/fetch_k를 조정합니다. (retrieval_depth.py)
     '''
+    docs, path = _semantic_search(candidate_ids, original_query, extracted_filters, k, fetch_k, lambda_mult, hybrid)
+    return (docs, path) if with_path else docs
+
+
+# 검색 경로 -> 벡터 검색 실행 여부 (chains.report_stages에서 턴마다 실행/생략된 단계를 보고할 때 사용)
+SEARCH_PATHS = {
+    "vector": True,          # 벡터 검색 (MMR/적응형/파티션)
+    "hybrid": True,          # BM25 + 벡터 RRF
+    "no_candidates": False,  # RDB 후보 없음
+    "bypass": False,         # 후보가 k개 이하라 ID로 바로 조회 (ADAPTIVE_RETRIEVAL)
+    "exact_match": False,    # 정책명 정확 일치 (하이브리드)
+    "degraded": False,       # 질의 임베딩 실패 -> BM25/RDB 후보 순서
+}
+
+
+def _semantic_search(candidate_ids, original_query, extracted_filters, k, fetch_k, lambda_mult, hybrid) -> tuple:
+    """semantic_search 본문. (문서 목록, 검색 경로)를 반환합니다."""
     if not candidate_ids:
-        return []
+        return [], "no_candidates"
 
     # 1. 보강된 검색어 생성
     boost_keywords = []
@@ -37,26 +102,190 @@ def semantic_search(
     synthetic_query = original_query + " " + " ".join(list(set(boost_keywords)))
     print(f"\n--- Generated Vector Search Query ---\n{synthetic_query}\n")
 
-    # 2. 임베딩 모델 및 ChromaDB 로드
-    embedding_model = OpenAIEmbeddings(model="text-embedding-3-large")
+    # 2. 임베딩 모델 및 ChromaDB 로드 (alias 파일이 가리키는 활성 컬렉션)
+    collection_name = get_active_collection_name()
+    # 동시에 들어온 같은 질의의 임베딩 호출은 하나만 실행 (singleflight.py), 제한 시간/헤지 적용 (call_policy.py)
+    embedding_model = CoalescedEmbeddings(PolicyEmbeddings(OpenAIEmbeddings(
+        model="text-embedding-3-large", timeout=CALL_POLICIES["query_embedding"]["deadline"], max_retries=0)))
     vectorstore = Chroma(
-        collection_name=COLLECTION_NAME,
+        collection_name=collection_name,
         embedding_function=embedding_model,
         persist_directory=VDB_DIRECTORY
     )
 
-    # 3. 필터가 적용된 Retriever 생성
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",
-        search_kwargs={
-            "k": k,
-            "fetch_k": fetch_k,
-            "lambda_mult": lambda_mult,
-            "filter": {'plcyNo': {'$in': candidate_ids}}
-        }
+    lexical_index = get_lexical_index(lexical_index_path(collection_name)) if hybrid else None
+
+    if ADAPTIVE_RETRIEVAL:
+        # 후보가 k개 이하면 임베딩/벡터 검색 없이 후보 전체를 반환
+        if should_bypass(len(candidate_ids), k):
+            return _fetch_all_candidates(vectorstore, lexical_index, candidate_ids, synthetic_query, k), "bypass"
+        requested_fetch_k, fetch_k = fetch_k, scaled_fetch_k(len(candidate_ids), k, fetch_k)
+        log_decision("fetch_k", candidates=len(candidate_ids), k=k, requested_fetch_k=requested_fetch_k,
+                     fetch_k=fetch_k)
+
+    # 지역 조건이 있으면 해당 시/도 + 전국 파티션만 검색
+    partitions = _route_partitions(extracted_filters, collection_name) if PARTITIONED_SEARCH else []
+
+    try:
+        if lexical_index is not None:
+            return _hybrid_search(vectorstore, embedding_model, lexical_index, candidate_ids,
+                                  original_query, synthetic_query, k, fetch_k, partitions)
+
+        if ADAPTIVE_RETRIEVAL and lambda_mult == 1.0:
+            return _adaptive_vector_search(vectorstore, embedding_model, synthetic_query, k, fetch_k, candidate_ids,
+                                           partitions), "vector"
+
+        if partitions:
+            # lambda_mult=1.0인 MMR은 유사도 순 정렬과 같으므로, 파티션 병합 결과의 상위 k개를 사용
+            return _vector_search(vectorstore, embedding_model, synthetic_query, fetch_k, candidate_ids,
+                                  partitions)[:k], "vector"
+
+        # 3. 필터가 적용된 Retriever 생성
+        retriever = vectorstore.as_retriever(
+            search_type="mmr",
+            search_kwargs={
+                "k": k,
+                "fetch_k": fetch_k,
+                "lambda_mult": lambda_mult,
+                "filter": {'plcyNo': {'$in': candidate_ids}}
+            }
+        )
+
+        # 4. Retriever 실행 및 Document 리스트 반환
+        docs = retriever.invoke(synthetic_query)
+
+        return docs, "vector"
+    except StageUnavailable as e:
+        # 질의 임베딩을 얻지 못하면(제한 시간 초과/서킷 열림) 임베딩 없이 검색
+        return _degraded_search(vectorstore, lexical_index, candidate_ids, synthetic_query, k, e.reason), "degraded"
+
+
+def _route_partitions(extracted_filters: dict, collection_name: str) -> list:
+    """추출된 지역명으로 검색할 파티션 목록을 정합니다. 지역 조건이 없으면 전체 컬렉션을 사용합니다."""
+    regions = extracted_filters.get("regions") if extracted_filters else None
+    manifest = load_partition_manifest(collection_name)
+    if not regions or not manifest:
+        return []
+    return route_partitions(get_related_region_codes(regions), manifest)
+
+
+def _degraded_search(vectorstore, lexical_index, candidate_ids: list, query: str, k: int, reason: str) -> list:
+    """임베딩 없이 BM25 점수 순(색인이 없으면 RDB 후보 순서)으로 상위 k개를 반환합니다."""
+    if lexical_index is not None:
+        ranked = [p for p, _ in lexical_index.search(query, candidate_ids, k=k)]
+        ordered = list(dict.fromkeys(ranked + list(candidate_ids)))[:k]
+    else:
+        ordered = list(candidate_ids)[:k]
+    print(f"⚠️ 질의 임베딩 실패({reason}): {'BM25' if lexical_index is not None else 'RDB 후보 순서'}로 {len(ordered)}건 검색")
+    return get_documents_by_ids(vectorstore, ordered)
+
+
+def _fetch_all_candidates(vectorstore, lexical_index, candidate_ids: list, query: str, k: int) -> list:
+    """후보 전체를 ID로 가져옵니다. BM25 색인이 있으면 BM25 점수 순, 없으면 RDB 후보 순서를 유지합니다."""
+    ordered = list(candidate_ids)
+    if lexical_index is not None:
+        ranked = [p for p, _ in lexical_index.search(query, candidate_ids, k=len(candidate_ids))]
+        ordered = list(dict.fromkeys(ranked + ordered))
+    log_decision("bypass", candidates=len(candidate_ids), k=k, order="bm25" if lexical_index is not None else "rdb")
+    return get_documents_by_ids(vectorstore, ordered)
+
+
+def _scored_vector_search(vectorstore, embedding_model, query_embedding, fetch_k, candidate_ids, partitions) -> list:
+    """이미 계산한 질의 임베딩으로 검색해 (Document, 거리) 목록을 거리 오름차순으로 반환합니다."""
+    if partitions:
+        return partitioned_vector_search(query_embedding, partitions, fetch_k, candidate_ids, embedding_model,
+                                         collection_name=vectorstore._collection.name, with_scores=True)
+    index = _two_stage_index(vectorstore)
+    if index is not None:
+        return _two_stage_search(vectorstore, index, query_embedding, fetch_k, candidate_ids)
+    return vectorstore.similarity_search_by_vector_with_relevance_scores(
+        query_embedding, k=fetch_k, filter={'plcyNo': {'$in': candidate_ids}}
     )
 
-    # 4. Retriever 실행 및 Document 리스트 반환
-    docs = retriever.invoke(synthetic_query)
 
-    return docs
\ No newline at end of file
+def _two_stage_index(vectorstore):
+    """TWO_STAGE_SEARCH가 켜져 있고 색인 파일이 있으면 축소 차원 색인을, 아니면 None을 반환합니다."""
+    return get_reduced_index(vectorstore._collection.name) if TWO_STAGE_SEARCH else None
+
+
+def _two_stage_search(vectorstore, index, query_embedding, k, candidate_ids) -> list:
+    """
+    축소 차원으로 k * TWO_STAGE_OVERSAMPLE개를 고른 뒤 전체 차원 거리로 다시 정렬해 상위 k개를 (Document, 거리)로 반환합니다.
+    (reduced_index.py, Chroma 검색과 같은 거리 단위)
+    """
+    scored = index.search(query_embedding, candidate_ids, k)
+    distance_of = dict(scored)
+    docs = get_documents_by_ids(vectorstore, [policy_id for policy_id, _ in scored])
+    return [(doc, distance_of[doc.metadata.get('plcyNo')]) for doc in docs]
+
+
+def _adaptive_vector_search(vectorstore, embedding_model, query, k, fetch_k, candidate_ids, partitions) -> list:
+    """질의 임베딩을 한 번만 계산하고, 거리 분포로 반환 개수를 정합니다. (동점 구간이 길면 fetch_k를 넓혀 재검색)"""
+    query_embedding = embedding_model.embed_query(query)
+    scored = _scored_vector_search(vectorstore, embedding_model, query_embedding, fetch_k, candidate_ids, partitions)
+    distances = [distance for _, distance in scored]
+    depth, reason = choose_depth(distances, k)
+
+    if needs_wider_fetch(distances, k, fetch_k, depth):
+        wider = widened_fetch_k(fetch_k, len(candidate_ids))
+        if wider > fetch_k:
+            log_decision("widen_fetch_k", fetch_k=fetch_k, widened_fetch_k=wider,
+                         spread=round(distances[-1] - distances[0], 4))
+            scored = _scored_vector_search(vectorstore, embedding_model, query_embedding, wider, candidate_ids,
+                                           partitions)
+            distances = [distance for _, distance in scored]
+            depth, reason = choose_depth(distances, k)
+
+    log_decision(reason, k=k, returned=depth, fetched=len(scored),
+                 distances=[round(distance, 4) for distance in distances[:k * 2]])
+    return [doc for doc, _ in scored[:depth]]
+
+
+def _vector_search(vectorstore, embedding_model, query, fetch_k, candidate_ids, partitions) -> list:
+    """파티션이 지정되면 파티션별 검색 결과를 병합하고, 아니면 전체 컬렉션(축소 차원 색인이 있으면 2단계)에서 검색합니다."""
+    if partitions:
+        query_embedding = embedding_model.embed_query(query)
+        return partitioned_vector_search(query_embedding, partitions, fetch_k, candidate_ids, embedding_model,
+                                         collection_name=vectorstore._collection.name)
+    index = _two_stage_index(vectorstore)
+    if index is not None:
+        return [doc for doc, _ in _two_stage_search(vectorstore, index, embedding_model.embed_query(query), fetch_k,
+                                                    candidate_ids)]
+    return vectorstore.similarity_search(query, k=fetch_k, filter={'plcyNo': {'$in': candidate_ids}})
+
+
+def _hybrid_search(vectorstore, embedding_model, lexical_index, candidate_ids, original_query, synthetic_query,
+                   k, fetch_k, partitions=None) -> list:
+    """
+    정확 일치 -> (BM25 + 벡터) RRF 순서로 후보 집합 안에서 검색합니다.
+    ADAPTIVE_RETRIEVAL이 켜져 있으면 벡터 결과의 거리 분포로 정한 개수(choose_depth)만큼 합친 결과를 반환합니다.
+    (문서 목록, 검색 경로)를 반환합니다. (정확 일치면 "exact_match", 아니면 "hybrid")
+    """
+    # 1. 질문에 정책명이 그대로 있으면 임베딩 호출 없이 반환
+    exact_ids = lexical_index.exact_matches(original_query, candidate_ids)
+    if exact_ids:
+        return get_documents_by_ids(vectorstore, exact_ids[:k]), "exact_match"
+
+    # 2. 후보 집합 안에서 BM25, 벡터 검색을 각각 fetch_k개씩 수행
+    lexical_ranking = [p for p, _ in lexical_index.search(synthetic_query, candidate_ids, k=fetch_k)]
+    depth = k
+    if ADAPTIVE_RETRIEVAL:
+        query_embedding = embedding_model.embed_query(synthetic_query)
+        scored = _scored_vector_search(vectorstore, embedding_model, query_embedding, fetch_k, candidate_ids,
+                                       partitions)
+        vector_docs = [doc for doc, _ in scored]
+        distances = [distance for _, distance in scored]
+        depth, reason = choose_depth(distances, k)
+        log_decision(f"hybrid_{reason}", k=k, returned=depth, fetched=len(scored),
+                     distances=[round(distance, 4) for distance in distances[:k * 2]])
+    else:
+        vector_docs = _vector_search(vectorstore, embedding_model, synthetic_query, fetch_k, candidate_ids,
+                                     partitions)
+    vector_ranking = [doc.metadata.get('plcyNo') for doc in vector_docs]
+
+    # 3. RRF로 합친 뒤, 벡터 결과에 없던 문서만 ID로 추가 조회
+    fused_ids = reciprocal_rank_fusion([vector_ranking, lexical_ranking], k=RRF_K)[:depth or k]
+    by_id = {doc.metadata.get('plcyNo'): doc for doc in vector_docs}
+    missing = get_documents_by_ids(vectorstore, [p for p in fused_ids if p not in by_id])
+    by_id.update({doc.metadata.get('plcyNo'): doc for doc in missing})
+    return [by_id[p] for p in fused_ids if p in by_id], "hybrid"
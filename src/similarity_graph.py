@@ -0,0 +1,181 @@
+"""
+정책 간 유사도 그래프 (오프라인 계산)
+
+"비슷한 정책 더 알려줘" 같은 후속 질문은 이전 답변의 정책과 가까운 정책만 찾으면 되므로,
+질문 재작성 -> 필터 추출 -> SQL -> 임베딩 -> 벡터 검색을 다시 돌릴 필요가 없습니다.
+
+- 컬렉션에 저장된 임베딩 전체를 L2 정규화한 뒤, 블록 단위 행렬곱 한 번으로
+  정책마다 코사인 유사도 상위 N개 이웃을 구합니다. (임베딩 API 호출 없음)
+- 결과는 plcyNo 배열 + int32 이웃 번호 배열 + float16 점수 배열로 npz 파일에 저장합니다.
+- 조회 시점에는 이전 답변의 정책들의 이웃을 합쳐 점수순으로 정렬하고,
+  RDB 후보(신청 기간/지역 조건)에 포함된 정책만 남깁니다.
+
+사용법:
+    python similarity_graph.py --top-n 20
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from config import VDB_DIRECTORY, COLLECTION_NAME, SIMILARITY_GRAPH_TOP_N
+
+# 이전 답변과 '비슷한' 정책을 더 달라는 후속 질문
+# - "비슷한 정책", "유사한 거", "같은 종류의 지원": 유사 표현 바로 뒤에 정책을 가리키는 말
+# - "이런 정책 더 있어?": '이런 정책'은 '더/또'와 요청 동사가 함께 있을 때만 (새 조건 질문과 구분)
+_SIMILAR_REQUEST_PATTERN = re.compile(
+    r"(비슷한|유사한|같은\s*종류의?|이런\s*종류의?)\s*(정책|거|것|지원|사업)|"
+    r"(이런|이와\s*같은)\s*(정책|거|것|지원|사업)\S*\s*(더|또)\s*(있|없|알려|추천|보여)"
+)
+
+
+def similarity_graph_path(collection_name: str = COLLECTION_NAME, vdb_directory: str = VDB_DIRECTORY) -> str:
+    return os.path.join(vdb_directory, f"neighbors_{collection_name}.npz")
+
+
+def is_similar_request(question: str) -> bool:
+    """
+    이전 답변과 비슷한 정책을 더 요청하는 질문인지 규칙 기반으로 판별합니다.
+    새 지역/대상/조건을 함께 말하면("서울에도 비슷한 정책 있어?") 후보군이 달라지므로 다시 검색합니다.
+    """
+    from followup import mentions_new_condition
+
+    question = str(question)
+    return bool(_SIMILAR_REQUEST_PATTERN.search(question)) and not mentions_new_condition(question)
+
+
+class PolicySimilarityGraph:
+    """plcyNo 단위 top-N 최근접 이웃 그래프"""
+
+    def __init__(self, policy_ids: np.ndarray, neighbors: np.ndarray, scores: np.ndarray):
+        self.policy_ids = policy_ids      # 내부 번호 -> plcyNo (유니코드 배열)
+        self.neighbors = neighbors        # (정책 수, N) int32, 유사도 내림차순
+        self.scores = scores              # (정책 수, N) float16 코사인 유사도
+        self.row_of = {pid: i for i, pid in enumerate(policy_ids.tolist())}
+
+    @classmethod
+    def build(cls, policy_ids: list, embeddings: np.ndarray, top_n: int = SIMILARITY_GRAPH_TOP_N,
+              block_size: int = 1024) -> "PolicySimilarityGraph":
+        """
+        embeddings: (정책 수, 차원) 행렬. 정규화 후 블록 단위로 (블록 x 전체) 유사도를 계산해
+        메모리를 block_size x 정책 수 만큼만 사용합니다.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+
+        count = len(matrix)
+        top_n = max(min(top_n, count - 1), 0)
+        neighbors = np.zeros((count, top_n), dtype=np.int32)
+        scores = np.zeros((count, top_n), dtype=np.float16)
+
+        for start in range(0, count if top_n > 0 else 0, block_size):
+            end = min(start + block_size, count)
+            block = matrix[start:end] @ matrix.T
+            rows = np.arange(end - start)
+            block[rows, rows + start] = -np.inf  # 자기 자신 제외
+
+            top = np.argpartition(-block, top_n - 1, axis=1)[:, :top_n]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            neighbors[start:end] = np.take_along_axis(top, order, axis=1)
+            scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+        return cls(np.asarray(policy_ids, dtype=str), neighbors, scores)
+
+    def save(self, path: str):
+        np.savez(path, policy_ids=self.policy_ids, neighbors=self.neighbors, scores=self.scores)
+        size_kb = (self.neighbors.nbytes + self.scores.nbytes) / 1024
+        print(f"✅ 유사도 그래프 저장 완료: {path} ({len(self.policy_ids)}개 정책 x {self.neighbors.shape[1]}개 이웃, "
+              f"{size_kb:.0f}KB)")
+
+    @classmethod
+    def load(cls, path: str) -> "PolicySimilarityGraph":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["policy_ids"], data["neighbors"], data["scores"])
+
+    def similar(self, seed_ids: list, n: int = 10, allowed_ids=None) -> list:
+        """
+        seed_ids의 이웃을 합쳐 (plcyNo, 유사도) 목록을 유사도 내림차순으로 반환합니다.
+        여러 seed에 공통으로 가까운 정책은 가장 높은 유사도를 사용하고, seed 자신은 제외합니다.
+        allowed_ids가 주어지면 그 안에 있는 정책만 남깁니다.
+        """
+        seed_rows = [self.row_of[str(p)] for p in seed_ids if str(p) in self.row_of]
+        if not seed_rows:
+            return []
+
+        rows = self.neighbors[seed_rows].ravel()
+        row_scores = self.scores[seed_rows].ravel().astype(np.float32)
+        order = np.argsort(-row_scores, kind="stable")
+        _, first = np.unique(rows[order], return_index=True)
+        best = order[np.sort(first)]
+
+        seeds = set(seed_rows)
+        results = []
+        for row, score in zip(rows[best].tolist(), row_scores[best].tolist()):
+            policy_id = str(self.policy_ids[row])
+            if row in seeds or (allowed_ids is not None and policy_id not in allowed_ids):
+                continue
+            results.append((policy_id, score))
+            if len(results) >= n:
+                break
+        return results
+
+
+def build_similarity_graph(collection_name: str = COLLECTION_NAME, persist_directory: str = VDB_DIRECTORY,
+                           top_n: int = SIMILARITY_GRAPH_TOP_N, page_size: int = 1000) -> PolicySimilarityGraph:
+    """컬렉션에 저장된 임베딩을 페이지 단위로 읽어 유사도 그래프를 만들고 npz 파일로 저장합니다."""
+    collection = Chroma(collection_name=collection_name, persist_directory=persist_directory)._collection
+    total = collection.count()
+
+    policy_ids, embeddings, seen = [], [], set()
+    for offset in range(0, total, page_size):
+        page = collection.get(offset=offset, limit=page_size, include=["embeddings", "metadatas"])
+        for embedding, metadata in zip(page["embeddings"], page["metadatas"]):
+            policy_id = str(metadata.get("plcyNo"))
+            if policy_id in seen:
+                continue
+            seen.add(policy_id)
+            policy_ids.append(policy_id)
+            embeddings.append(embedding)
+
+    started = time.perf_counter()
+    graph = PolicySimilarityGraph.build(policy_ids, np.asarray(embeddings, dtype=np.float32), top_n=top_n)
+    print(f"--- 유사도 그래프 계산: {len(policy_ids)}개 정책, {(time.perf_counter() - started) * 1000:.0f}ms ---")
+    graph.save(similarity_graph_path(collection_name, persist_directory))
+    return graph
+
+
+_loaded_graphs = {}
+
+
+def clear_loaded_graphs() -> int:
+    """읽어 둔 그래프를 버립니다. 다음 조회 때 파일을 다시 읽습니다. (버린 개수 반환)"""
+    count = len(_loaded_graphs)
+    _loaded_graphs.clear()
+    return count
+
+
+def get_similarity_graph(path: str = None):
+    """프로세스당 한 번만 그래프 파일을 읽습니다. 파일이 없으면 None을 반환합니다."""
+    path = path or similarity_graph_path()
+    if path not in _loaded_graphs:
+        if not os.path.exists(path):
+            print(f"⚠️ 유사도 그래프 파일이 없어 일반 검색을 사용합니다: {path}")
+            _loaded_graphs[path] = None
+        else:
+            _loaded_graphs[path] = PolicySimilarityGraph.load(path)
+    return _loaded_graphs[path]
+
+
+if __name__ == '__main__':
+    from index_lifecycle import get_active_collection_name
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-n", type=int, default=SIMILARITY_GRAPH_TOP_N)
+    args = parser.parse_args()
+
+    build_similarity_graph(get_active_collection_name(), top_n=args.top_n)
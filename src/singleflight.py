@@ -0,0 +1,145 @@
+"""
+진행 중인 동일 요청 병합 (single-flight)
+
+정책 발표 직후처럼 여러 세션이 거의 같은 첫 질문을 동시에 보내면, 세션마다 필터 추출(LLM),
+후보 조회(SQL), 질의 임베딩, 벡터 검색을 똑같이 반복합니다. 이 단계들은 입력이 같으면 결과도 같으므로,
+같은 키의 요청이 이미 실행 중이면 새로 실행하지 않고 그 결과를 기다렸다가 함께 받습니다.
+
+- 결과를 저장해 두는 캐시가 아니라 '실행 중인' 요청만 공유합니다. 실행이 끝나면 키는 바로 지워집니다.
+- 스레드(Streamlit 세션, FastAPI 실행기의 동기 체인)는 do(), asyncio 코루틴은 ado()를 사용하며,
+  두 방식이 같은 키를 함께 기다릴 수 있습니다. (concurrent.futures.Future 공유)
+- 먼저 실행한 요청이 실패하면 기다리던 요청도 같은 예외를 받습니다.
+- 단계별 병합 비율(shared / calls)은 coalescing_summary()로 확인합니다. (main.py의 GET /metrics)
+
+사용법:
+    from singleflight import get_flight, request_key
+    get_flight("filter_extraction").do(request_key(query), create_filter_from_query, client, query)
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+from config import SINGLE_FLIGHT
+
+
+def request_key(*parts) -> str:
+    """입력값을 정렬된 JSON으로 직렬화해 짧은 키로 만듭니다. (문자열은 앞뒤/연속 공백 정규화)"""
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.split())
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    serialized = json.dumps([normalize(part) for part in parts], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """키별로 실행 중인 호출을 하나만 두고, 같은 키의 다른 호출은 그 결과를 공유합니다."""
+
+    def __init__(self, name: str, share=copy.copy):
+        self.name = name
+        self.share = share  # 기다린 쪽에 돌려줄 때 적용 (호출한 쪽마다 결과를 수정해도 서로 영향이 없도록)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _join(self, key: str) -> tuple:
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _finish(self, key: str, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """스레드에서 호출합니다. 같은 키가 실행 중이면 끝날 때까지 기다렸다가 그 결과를 반환합니다."""
+        if not SINGLE_FLIGHT or key is None:
+            return fn(*args, **kwargs)
+        future, leader = self._join(key)
+        if not leader:
+            print(f"--- [Single Flight] {self.name}: 실행 중인 동일 요청 결과 공유 ---")
+            return self.share(future.result())
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ado(self, key, afn, *args, **kwargs):
+        """코루틴에서 호출합니다. 기다리는 동안 이벤트 루프를 막지 않습니다."""
+        if not SINGLE_FLIGHT or key is None:
+            return await afn(*args, **kwargs)
+        future, leader = self._join(key)
+        if not leader:
+            print(f"--- [Single Flight] {self.name}: 실행 중인 동일 요청 결과 공유 ---")
+            return self.share(await asyncio.wrap_future(future))
+        try:
+            result = await afn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls, shared = self.calls, self.shared
+        return {"calls": calls, "shared": shared, "coalescing_ratio": round(shared / calls, 3) if calls else 0.0}
+
+
+# 병합 대상 단계 (필터 dict는 호출한 쪽에서 수정할 수 있으므로 깊은 복사로 공유)
+_flights = {
+    "filter_extraction": SingleFlight("filter_extraction", share=copy.deepcopy),
+    "query_understanding": SingleFlight("query_understanding", share=copy.deepcopy),
+    "rdb_candidates": SingleFlight("rdb_candidates"),
+    "query_embedding": SingleFlight("query_embedding"),
+    "vector_search": SingleFlight("vector_search"),
+}
+
+
+def get_flight(stage: str) -> SingleFlight:
+    return _flights[stage]
+
+
+def coalescing_summary() -> dict:
+    """단계별 호출 수, 공유된 호출 수, 병합 비율"""
+    return {stage: flight.stats() for stage, flight in _flights.items()}
+
+
+class CoalescedEmbeddings(Embeddings):
+    """질의 임베딩(embed_query/aembed_query)만 병합하는 임베딩 래퍼. 문서 임베딩은 그대로 위임합니다."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: list) -> list:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return get_flight("query_embedding").do(request_key(text), self.embeddings.embed_query, text)
+
+    async def aembed_query(self, text: str) -> list:
+        return await get_flight("query_embedding").ado(request_key(text), self.embeddings.aembed_query, text)
@@ -0,0 +1,65 @@
+"""
+세션별 사용자 프로필 (나이/지역/직업 상태 등 한 번 말한 조건을 대화 내내 유지)
+
+MEMORY_K = 2 때문에 "서울 사는 25세 미취업자" 같은 조건을 말한 턴이 대화 기록에서 빠지면,
+이후 턴은 필터를 처음부터 다시 추출해 지역 조건을 잃고 RDB 후보가 수천 건으로 늘어납니다.
+프로필은 WindowedInMemoryHistory.profile(세션별 dict)에 저장되고, 프롬프트에는 들어가지 않습니다.
+
+- update_profile: 이번 턴에 추출된 필터 중 사용자 자신에 대한 필드(PROFILE_FIELDS)에 값이 있으면 덮어씁니다.
+  (이사/취업처럼 조건이 바뀌면 마지막 값을 따름. 값이 없는 필드는 기존 값 유지)
+- merge_profile: 이번 턴 필터에 비어 있는 프로필 필드를 프로필 값으로 채운 새 dict를 반환합니다.
+  질문에 "전국", "지역 상관없이" 같은 표현이 있으면 지역은 채우지 않습니다.
+분야/키워드(categories, subcategories, keywords)는 질문마다 바뀌므로 프로필에 넣지 않습니다.
+
+사용법:
+    history = get_session_history(session_id)
+    update_profile(history.profile, filters)
+    filters = merge_profile(filters, history.profile, question)
+"""
+from config import PROFILE_FIELDS, PROFILE_NATIONWIDE_CUES
+
+
+def _has_value(value) -> bool:
+    return value not in (None, "", [], {})
+
+
+def update_profile(profile: dict, filters: dict) -> list:
+    """이번 턴 필터의 프로필 필드 값으로 profile을 갱신하고, 바뀐 필드 이름 리스트를 반환합니다."""
+    changed = []
+    for field in PROFILE_FIELDS:
+        value = (filters or {}).get(field)
+        if _has_value(value) and profile.get(field) != value:
+            profile[field] = list(value) if isinstance(value, list) else value
+            changed.append(field)
+    return changed
+
+
+def wants_nationwide(question: str) -> bool:
+    compact = "".join(str(question or "").split())
+    return any(cue in compact for cue in PROFILE_NATIONWIDE_CUES)
+
+
+def merge_profile(filters: dict, profile: dict, question: str = "") -> dict:
+    """비어 있는 프로필 필드를 프로필 값으로 채운 새 필터 dict를 반환합니다. (이번 턴에 말한 값이 우선)"""
+    merged = dict(filters or {})
+    filled = []
+    for field in PROFILE_FIELDS:
+        if _has_value(merged.get(field)) or not _has_value(profile.get(field)):
+            continue
+        if field == "regions" and wants_nationwide(question):
+            continue
+        value = profile[field]
+        merged[field] = list(value) if isinstance(value, list) else value
+        filled.append(field)
+    if filled:
+        print(f"--- [User Profile] 프로필에서 채운 조건: "
+              f"{', '.join(f'{field}={merged[field]}' for field in filled)} ---")
+    return merged
+
+
+def apply_profile(profile: dict, filters: dict, question: str = "") -> dict:
+    """update_profile 후 merge_profile을 실행합니다. (체인에서 필터 추출 직후 호출)"""
+    changed = update_profile(profile, filters)
+    if changed:
+        print(f"--- [User Profile] 갱신: {', '.join(f'{field}={profile[field]}' for field in changed)} ---")
+    return merge_profile(filters, profile, question)
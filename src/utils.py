@@ -7,6 +7,17 @@ def count_tokens(text):
     encoding = tiktoken.get_encoding("cl100k_base")
     return len(encoding.encode(text))
 
+def normalize_code(code) -> str:
+    """
+    API 원본 코드('0013010'), 엑셀 코드(13010), float 변환값('13010.0')을
+    하나의 형태('13010')로 맞춥니다.
+    """
+    code_str = str(code).strip()
+    if code_str.endswith('.0'):
+        code_str = code_str[:-2]
+    return code_str.lstrip('0')
+
+
 def load_code_table() -> dict[str, dict[str, str]]:
     try:
         df_codes = pd.read_excel(CODE_TABLE_FILE, sheet_name='코드정보')